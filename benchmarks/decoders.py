@@ -0,0 +1,81 @@
+"""
+Compare the JSON decoders available for reading lines of input.
+
+Reports records per second for each decoder on its own and together with
+building the schema, and checks every decoder gives the same schema. The
+events mode, which builds the schema from tokens without decoding, is
+included for comparison.
+
+Run with: python -m benchmarks.decoders [FILE ...]
+"""
+import argparse
+import os
+import time
+
+from json_schema_generator import process_lines_to_schema, process_to_schema
+from json_schema_generator.decoders import EVENTS
+from json_schema_generator.decoders import available_decoders, get_decoder
+from json_schema_generator.events import iter_events
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "sample.jsonl")
+
+
+def read_lines(filenames):
+    lines = []
+    for filename in filenames:
+        with open(filename, "rb") as infile:
+            lines.extend(infile)
+    return lines
+
+
+def best_time(function, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", nargs="*", default=[SAMPLE],
+                        help="JSON lines files, defaults to a bundled sample")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of times to repeat each measurement")
+    args = parser.parse_args()
+
+    lines = read_lines(args.input)
+    print("{} records".format(len(lines)))
+    print("{:>12} {:>16} {:>16}".format(
+        "decoder", "decode rec/s", "schema rec/s"))
+
+    schemas = {}
+    for name in available_decoders():
+        decoder = get_decoder(name)
+        decode_time, _ = best_time(
+            lambda: list(map(decoder, lines)), args.repeat)
+        schema_time, schema = best_time(
+            lambda: process_to_schema(map(decoder, lines)), args.repeat)
+        schemas[name] = schema.to_json()
+        print("{:>12} {:>16.0f} {:>16.0f}".format(
+            name, len(lines) / decode_time, len(lines) / schema_time))
+
+    decode_time, _ = best_time(
+        lambda: [list(iter_events(x)) for x in lines], args.repeat)
+    schema_time, schema = best_time(
+        lambda: process_lines_to_schema(lines, EVENTS), args.repeat)
+    schemas[EVENTS] = schema.to_json()
+    print("{:>12} {:>16.0f} {:>16.0f}".format(
+        EVENTS, len(lines) / decode_time, len(lines) / schema_time))
+
+    reference = next(iter(schemas.values()))
+    for name, schema in schemas.items():
+        assert schema == reference, "{} gave a different schema".format(name)
+    print("schemas identical")
+
+
+if __name__ == "__main__":
+    main()
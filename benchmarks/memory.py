@@ -0,0 +1,61 @@
+"""
+Measure the memory used by each node of a schema.
+
+Builds schemas of the synthetic workloads, and reports the bytes
+allocated per node by the mutable tree of the accumulator, and by the
+frozen schema made from it, as measured by tracemalloc.
+
+Run with: python -m benchmarks.memory
+"""
+import argparse
+import tracemalloc
+
+from json_schema_generator import SchemaAccumulator
+
+from .suite import COUNTS
+from .workloads import WORKLOADS, generate
+
+
+def measure(records):
+    """
+    Returns the node count, and the bytes per node of the accumulator and
+    of the frozen schema of records.
+    """
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        accumulator = SchemaAccumulator(shape_cache_size=0)
+        accumulator.update(records)
+        # only count the tree, not the log of changes to it
+        accumulator.changes.clear()
+        accumulated = tracemalloc.get_traced_memory()[0] - start
+        nodes = accumulator.node_count()
+
+        start = tracemalloc.get_traced_memory()[0]
+        schema = accumulator.freeze()
+        frozen = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return nodes, accumulated / nodes, frozen / len(schema.root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workload", action="append",
+                        choices=sorted(WORKLOADS),
+                        help="workload to run, may be repeated, default all")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="random seed for the workloads")
+    args = parser.parse_args()
+
+    print("{:>18} {:>8} {:>18} {:>14}".format(
+        "workload", "nodes", "accumulator B/node", "schema B/node"))
+    for name in args.workload or sorted(WORKLOADS):
+        records = list(generate(name, COUNTS[name], args.seed))
+        nodes, accumulated, frozen = measure(records)
+        print("{:>18} {:>8} {:>18.0f} {:>14.0f}".format(
+            name, nodes, accumulated, frozen))
+
+
+if __name__ == "__main__":
+    main()
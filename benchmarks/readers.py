@@ -0,0 +1,68 @@
+"""
+Compare reading lines with fileinput against the block reader.
+
+Reports lines and megabytes per second for reading alone, for plain and
+gzip compressed copies of the input repeated to make it large enough.
+
+Run with: python -m benchmarks.readers [FILE ...]
+"""
+import argparse
+import fileinput
+import gzip
+import os
+import shutil
+import tempfile
+
+from json_schema_generator.readers import read_lines
+
+from .decoders import SAMPLE, best_time
+
+
+def fileinput_lines(filenames):
+    with fileinput.input(files=filenames) as lines:
+        for line in lines:
+            yield line
+
+
+def count(lines):
+    total = 0
+    for line in lines:
+        total += 1
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", nargs="*", default=[SAMPLE],
+                        help="JSON lines files, defaults to a bundled sample")
+    parser.add_argument("--copies", type=int, default=200,
+                        help="number of times to repeat the input")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of times to repeat each measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        plain = os.path.join(tmpdir, "input.jsonl")
+        with open(plain, "wb") as outfile:
+            for i in range(args.copies):
+                for filename in args.input:
+                    with open(filename, "rb") as infile:
+                        shutil.copyfileobj(infile, outfile)
+        compressed = plain + ".gz"
+        with open(plain, "rb") as infile, gzip.open(compressed, "wb") as outf:
+            shutil.copyfileobj(infile, outf)
+        megabytes = os.path.getsize(plain) / 1e6
+
+        print("{:>20} {:>12} {:>12}".format("reader", "lines/s", "MB/s"))
+        for name, function, filename in (
+                ("fileinput", fileinput_lines, plain),
+                ("read_lines", read_lines, plain),
+                ("read_lines gzip", read_lines, compressed)):
+            elapsed, lines = best_time(
+                lambda: count(function([filename])), args.repeat)
+            print("{:>20} {:>12.0f} {:>12.1f}".format(
+                name, lines / elapsed, megabytes / elapsed))
+
+
+if __name__ == "__main__":
+    main()
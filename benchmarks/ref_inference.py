@@ -0,0 +1,105 @@
+"""
+Compare reference inference against the previous pairwise approach.
+
+Builds synthetic schemas with many objects drawn from a few shapes and
+times how long it takes to find the groups of nodes that could share a
+reference, and to run the whole of Schema.infer_references.
+
+Run with: python -m benchmarks.ref_inference
+"""
+import argparse
+import random
+import time
+
+from json_schema_generator import Schema, SchemaAccumulator
+from json_schema_generator import SchemaNodeArray, SchemaNodeDict
+
+
+def synthetic_schema(n_objects, n_shapes, seed=42):
+    rng = random.Random(seed)
+    shapes = [
+        {"field_{}_{}".format(i, j): j for j in range(rng.randint(2, 6))}
+        for i in range(n_shapes)]
+    record = {}
+    for i in range(n_objects):
+        shape = rng.choice(shapes)
+        record["object_{}".format(i)] = {
+            "inner": dict(shape),
+            "values": [dict(shape)],
+        }
+    return SchemaAccumulator().update([record]).freeze()
+
+
+def pairwise_components(schema):
+    """
+    The previous approach, comparing every pair of nodes and then scanning
+    every set for each matching pair.
+    """
+    nodes = list(schema.generate_all_nodes())
+    node_sets = set(frozenset((x,)) for x in nodes)
+    for i in range(len(nodes)):
+        node_a = nodes[i]
+        for j in range(i+1, len(nodes)):
+            node_b = nodes[j]
+            if isinstance(node_a, SchemaNodeArray) and \
+                    isinstance(node_b, SchemaNodeArray):
+                if node_a.children != node_b.children:
+                    continue
+            elif isinstance(node_a, SchemaNodeDict) and \
+                    isinstance(node_b, SchemaNodeDict):
+                if node_a.required != node_b.required or \
+                        node_a.children != node_b.children:
+                    continue
+            else:
+                continue
+            node_set_a = [x for x in node_sets if node_a in x][0]
+            node_set_b = [x for x in node_sets if node_b in x][0]
+            if node_set_a is not node_set_b:
+                node_sets.remove(node_set_a)
+                node_sets.remove(node_set_b)
+                node_sets.add(node_set_a.union(node_set_b))
+    return frozenset(node_sets)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", type=int,
+                        default=[100, 300, 1000, 3000, 10000],
+                        help="numbers of objects in each schema")
+    parser.add_argument("--shapes", type=int, default=10,
+                        help="number of distinct object shapes")
+    parser.add_argument("--pairwise-limit", type=int, default=300,
+                        help="largest size to time the pairwise approach")
+    args = parser.parse_args()
+
+    print("{:>8} {:>8} {:>12} {:>12} {:>12}".format(
+        "objects", "nodes", "pairwise s", "grouped s", "infer s"))
+    for size in args.sizes:
+        schema = synthetic_schema(size, args.shapes)
+        n_nodes = len(set(schema.generate_all_nodes()))
+
+        if size <= args.pairwise_limit:
+            pairwise_time, pairwise = timed(pairwise_components, schema)
+            pairwise_time = "{:12.4f}".format(pairwise_time)
+        else:
+            pairwise = None
+            pairwise_time = "{:>12}".format("-")
+        grouped_time, grouped = timed(schema._ref_components)
+        if pairwise is not None:
+            assert pairwise == grouped
+
+        infer_schema = Schema(schema.root)
+        infer_time, _ = timed(infer_schema.infer_references)
+
+        print("{:>8} {:>8} {} {:12.4f} {:12.4f}".format(
+            size, n_nodes, pairwise_time, grouped_time, infer_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare the binary schema format with pickle for size and speed.
+
+Builds a wide schema from generated records and reports the encoded size
+and the time to encode and decode it with each.
+
+Run with: python -m benchmarks.serialization
+"""
+import argparse
+import pickle
+import random
+
+from json_schema_generator import Schema, SchemaAccumulator
+
+from .decoders import best_time
+
+
+def wide_records(count, keys, seed=42):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "key_{}".format(rng.randrange(keys)): rng.choice((
+                rng.random(), rng.randrange(1000), "text {}".format(i),
+                None, {"nested": rng.random()}, [rng.random()]))
+            for j in range(20)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=5000,
+                        help="number of records to build the schema from")
+    parser.add_argument("--keys", type=int, default=2000,
+                        help="number of distinct keys in the records")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of times to repeat each measurement")
+    args = parser.parse_args()
+
+    schema = SchemaAccumulator()\
+        .update(wide_records(args.records, args.keys)).freeze()
+
+    print("{:>8} {:>12} {:>12} {:>12}".format(
+        "format", "bytes", "encode ms", "decode ms"))
+    for name, dumps, loads in (
+            ("pickle", pickle.dumps, pickle.loads),
+            ("binary", Schema.to_bytes, Schema.from_bytes)):
+        encode_time, data = best_time(lambda: dumps(schema), args.repeat)
+        decode_time, decoded = best_time(lambda: loads(data), args.repeat)
+        assert decoded.root == schema.root
+        print("{:>8} {:>12} {:>12.1f} {:>12.1f}".format(
+            name, len(data), encode_time * 1000, decode_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Benchmark every engine against every synthetic workload.
+
+Each workload is written to a JSON lines file, then each engine builds a
+schema of it, including merging and inferring references. Reports
+records per second, and the peak memory allocated by Python in this
+process, which for the parallel engines leaves out their workers.
+
+Results can be saved, and compared against saved results to catch
+regressions.
+
+Run with: python -m benchmarks.suite [--save FILE] [--compare FILE]
+"""
+import argparse
+import functools
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import dask
+import dask.bag
+
+from json_schema_generator import process_lines_to_schema
+from json_schema_generator import process_to_schema_dask
+from json_schema_generator.processes import process_files_to_schema
+from json_schema_generator.readers import read_lines
+
+from .workloads import WORKLOADS, generate
+
+# default records of each workload, chosen to take about a second
+COUNTS = {
+    "wide": 2000,
+    "deep": 1000,
+    "long_arrays": 200,
+    "high_cardinality": 10000,
+    "polymorphic": 10000,
+    "repeated": 1000,
+}
+
+
+def run_serial(filename, workers):
+    return process_lines_to_schema(read_lines([filename]))
+
+
+def run_processes(filename, workers):
+    return process_files_to_schema([filename], workers,
+                                   range_size=os.path.getsize(filename)
+                                   // (workers * 4) + 1)
+
+
+def run_dask(filename, workers):
+    lines = dask.bag.read_text(filename, blocksize="1MiB")
+    with dask.config.set(scheduler="processes", num_workers=workers):
+        return process_to_schema_dask(lines, None, decoder="auto")
+
+
+ENGINES = {
+    "serial": run_serial,
+    "processes": run_processes,
+    "dask": run_dask,
+}
+
+
+def measure(function, repeat):
+    """
+    Returns the best time of repeat runs of function, and the peak memory
+    of one more run.
+    """
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    # memory is measured separately as tracing slows everything down
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(workloads, engines, scale=1.0, workers=2, repeat=3, seed=42):
+    """
+    Returns a dict of results keyed by "workload/engine".
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for workload in workloads:
+            count = max(1, int(COUNTS[workload] * scale))
+            filename = os.path.join(tmpdir, workload + ".jsonl")
+            with open(filename, "w") as outfile:
+                for record in generate(workload, count, seed):
+                    outfile.write(json.dumps(record))
+                    outfile.write("\n")
+            for engine in engines:
+                elapsed, peak = measure(
+                    functools.partial(ENGINES[engine], filename, workers),
+                    repeat)
+                results["{}/{}".format(workload, engine)] = {
+                    "records": count,
+                    "seconds": elapsed,
+                    "records_per_second": count / elapsed,
+                    "peak_mb": peak / 1e6,
+                }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the names of results more than tolerance slower than baseline.
+    """
+    slower = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]["records_per_second"]
+        if result["records_per_second"] < expected * (1 - tolerance):
+            slower.append(name)
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workload", action="append",
+                        choices=sorted(WORKLOADS),
+                        help="workload to run, may be repeated, default all")
+    parser.add_argument("--engine", action="append", choices=sorted(ENGINES),
+                        help="engine to run, may be repeated, default all")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply the number of records by this")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="number of workers for the parallel engines")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of times to repeat each measurement")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="random seed for the workloads")
+    parser.add_argument("--save", help="save the results to this file")
+    parser.add_argument("--compare",
+                        help="compare the results with this saved file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="fraction slower than compared to allow")
+    args = parser.parse_args()
+
+    results = run(args.workload or sorted(WORKLOADS),
+                  args.engine or sorted(ENGINES), args.scale, args.workers,
+                  args.repeat, args.seed)
+
+    print("{:>30} {:>10} {:>12} {:>10}".format(
+        "benchmark", "records", "records/s", "peak MB"))
+    for name, result in results.items():
+        print("{:>30} {:>10} {:>12.0f} {:>10.1f}".format(
+            name, result["records"], result["records_per_second"],
+            result["peak_mb"]))
+
+    if args.save:
+        with open(args.save, "w") as outfile:
+            json.dump(results, outfile, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as infile:
+            baseline = json.load(infile)
+        slower = compare(results, baseline, args.tolerance)
+        for name in slower:
+            print("slower than {}: {}".format(args.compare, name))
+        if slower:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Seeded generators of synthetic records, each stressing one part of
+building a schema. Every generator takes the number of records and a
+random.Random, so the same seed always gives the same records.
+"""
+import random
+import string
+
+
+def wide(count, rng, keys=2000, per_record=50):
+    """
+    Flat objects, each with some of many different keys.
+    """
+    names = ["field_{}".format(i) for i in range(keys)]
+    for i in range(count):
+        yield {name: rng.random() for name in rng.sample(names, per_record)}
+
+
+def deep(count, rng, depth=40):
+    """
+    Objects nested inside each other, some levels missing optional keys.
+    """
+    for i in range(count):
+        record = {"leaf": rng.randrange(100)}
+        for level in range(depth):
+            record = {"level": level, "child": record}
+            if rng.random() < 0.5:
+                record["optional"] = rng.choice("abc")
+        yield record
+
+
+def long_arrays(count, rng, length=500):
+    """
+    Objects holding long arrays of numbers and of small objects.
+    """
+    for i in range(count):
+        yield {
+            "values": [rng.random() for j in range(length)],
+            "points": [{"x": rng.randrange(1000), "y": rng.randrange(1000)}
+                       for j in range(length // 10)],
+        }
+
+
+def high_cardinality(count, rng, length=32):
+    """
+    Strings that are almost never repeated, so are never enums.
+    """
+    alphabet = string.ascii_letters + string.digits
+    for i in range(count):
+        yield {
+            "id": "".join(rng.choice(alphabet) for j in range(length)),
+            "email": "user{}@example.com".format(rng.randrange(10 ** 9)),
+            "text": " ".join(rng.choice(("lorem", "ipsum", "dolor", "sit"))
+                             for j in range(rng.randrange(5, 50))),
+        }
+
+
+def polymorphic(count, rng):
+    """
+    Fields whose type, or kind of value, changes between records.
+    """
+    choices = (
+        lambda: rng.randrange(100),
+        lambda: rng.random(),
+        lambda: "text",
+        lambda: None,
+        lambda: rng.random() < 0.5,
+        lambda: [rng.randrange(10)],
+        lambda: {"nested": rng.randrange(10)},
+    )
+    for i in range(count):
+        yield {"field_{}".format(j): rng.choice(choices)() for j in range(10)}
+
+
+def repeated(count, rng, kinds=20):
+    """
+    The same few substructures under many different names, for reference
+    inference to find.
+    """
+    shapes = [
+        {"street": str, "city": str, "postcode": str},
+        {"amount": float, "currency": ("GBP", "USD", "EUR")},
+        {"first": str, "last": str, "age": int},
+    ]
+
+    def make(shape):
+        value = {}
+        for key, kind in shape.items():
+            if isinstance(kind, tuple):
+                value[key] = rng.choice(kind)
+            elif kind is str:
+                value[key] = "".join(rng.choice(string.ascii_lowercase)
+                                     for j in range(8))
+            elif kind is int:
+                value[key] = rng.randrange(100)
+            else:
+                value[key] = rng.random()
+        return value
+
+    for i in range(count):
+        yield {"{}_{}".format(j, k): make(shape)
+               for k, shape in enumerate(shapes) for j in range(kinds)}
+
+
+WORKLOADS = {
+    "wide": wide,
+    "deep": deep,
+    "long_arrays": long_arrays,
+    "high_cardinality": high_cardinality,
+    "polymorphic": polymorphic,
+    "repeated": repeated,
+}
+
+
+def generate(name, count, seed=42):
+    """
+    Generates count records of the named workload.
+    """
+    return WORKLOADS[name](count, random.Random(seed))
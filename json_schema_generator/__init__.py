@@ -1,88 +1,89 @@
-import argparse
-import functools
-import fileinput
-
-import simplejson as json
-import dask
-import dask.bag
-from dask.distributed import Client, LocalCluster
+import importlib
 
 # import everything so it is re-exported
 from .schema import Schema, SchemaNode  # noqa: F401
 from .schema import SchemaNodeArray, SchemaNodeDict  # noqa: F401
 from .schema import SchemaNodeLeaf, SchemaNodeRef  # noqa: F401
-
-
-def process_to_schema(items):
-    schemas = map(Schema.schema_extractor, items)
-    schema = functools.reduce(Schema.merge, schemas, Schema(None))
+from .schema import NodeInterner, ENUM_LIMIT  # noqa: F401
+from .accumulator import SchemaAccumulator  # noqa: F401
+from .decoders import DECODERS, EVENTS, get_decoder  # noqa: F401
+from .merging import FAN_IN, merge_group, merge_schemas  # noqa: F401
+from .dedup import RecentLines
+from .profiling import record_schema
+
+# these need Dask or asyncio, which are slow to import, so their modules
+# are only imported when they are first used
+_LAZY = {
+    "process_to_schema_dask": "dask_engine",
+    "process_to_json_dask": "dask_engine",
+    "process_to_schema_async": "streaming",
+    "main": "cli",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module = importlib.import_module("." + _LAZY[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
+
+
+def process_to_schema(items, enum_limit=ENUM_LIMIT, enum_coverage=1.0,
+                      sampling=None, max_depth=None, count_distinct=False):
+    accumulator = SchemaAccumulator(enum_limit, enum_coverage,
+                                    max_depth=max_depth,
+                                    count_distinct=count_distinct)
+    if sampling is not None:
+        items = sampling.records(items, accumulator)
+    schema = accumulator.update(items).freeze()
     # post-process the schema to compute definitions
     schema.infer_references()
     return schema
 
 
-def process_to_schema_dask(dask_bag, visualize):
-    dask_bag = dask_bag.map(Schema.schema_extractor)\
-        .fold(binop=Schema.merge, combine=Schema.merge,
-              initial=Schema(None))
-    if visualize:
-        # import this here, so if not used we don't need the requirements
-        # flake8 - works by side effect
-        from dask.dot import dot_graph  # noqa: F401
-        dask_bag.visualize(visualize)
-
-    # this will block until complete
-    schema = dask_bag.compute()
-
-    # post-process the schema to compute definitions
-    schema.infer_references()
-
+def process_lines_to_schema(lines, decoder="auto", enum_limit=ENUM_LIMIT,
+                            enum_coverage=1.0, infer_references=True,
+                            sampling=None, profile=None, progress=None,
+                            dedup=None, max_depth=None,
+                            count_distinct=False):
+    """
+    As process_to_schema, but from undecoded lines of JSON. Decoder is
+    one of DECODERS, "auto", or EVENTS to avoid decoding each line.
+
+    If profile is given, each stage is timed in it. If progress is given,
+    the lines read are counted in it. If dedup is given, lines the same
+    as one of about that many recent lines are skipped, see dedup.py. If
+    max_depth is given, anything nested that deep is summarised, and if
+    count_distinct, distinct values are estimated, see SchemaAccumulator.
+    """
+    accumulator = SchemaAccumulator(enum_limit, enum_coverage,
+                                    max_depth=max_depth,
+                                    count_distinct=count_distinct)
+    if progress is not None:
+        lines = progress.lines(lines, accumulator)
+    if dedup is not None:
+        recent = RecentLines(dedup)
+        lines = recent.unique(lines)
+    if sampling is not None:
+        lines = sampling.records(lines, accumulator)
+    accumulator.update_lines(lines, decoder, profile)
+    if profile is None:
+        schema = accumulator.freeze()
+        if infer_references:
+            schema.infer_references()
+        return schema
+
+    if dedup is not None:
+        profile.count("duplicate_lines", recent.duplicates)
+    with profile.stage("freeze"):
+        schema = accumulator.freeze()
+    record_schema(profile, schema)
+    if infer_references:
+        with profile.stage("infer_references"):
+            schema.infer_references()
     return schema
-
-
-def process_to_json_dask(dask_bag, visualize):
-    return process_to_schema_dask(dask_bag, visualize).to_json()
-
-
-def main():
-    parser = argparse.ArgumentParser(description='JSON schema from JSON lines')
-    parser.add_argument("output",
-                        help="optional filename to write to, - for stdout")
-    parser.add_argument("input", nargs='+',
-                        help="one or more JSON lines filenames")
-    parser.add_argument("--blocksize", action="store", default=None, type=str,
-                        help="Size of blocks of input e.g. 128MiB")
-    parser.add_argument("--workers", action="store", default="1", type=int,
-                        help="Number of processess to use, >1 with Dask")
-    parser.add_argument("--visualize", action="store", default=None, type=str,
-                        help="Flag if compute graph should be displayed")
-    args = parser.parse_args()
-
-    if args.workers > 1:
-        cluster = LocalCluster()
-        # here the client registers itself as the default within Dask
-        # TODO explicitly call the client
-        # TODO explicitly allow client to be passed
-        # flake8 - this works by side effect
-        client = Client(cluster)  # noqa: F841
-        cluster.scale(args.workers)
-
-        items = dask.bag.read_text(args.input, blocksize=args.blocksize)\
-            .map(json.loads)
-        schema = process_to_schema_dask(items, args.visualize)
-    else:
-        if len(args.input) == 1 and args.input[0] == "-":
-            lines = fileinput.input()
-            items = map(json.loads, lines)
-            schema = process_to_schema(items)
-        else:
-            with fileinput.input(files=args.input) as files:
-                items = map(json.loads, files)
-                schema = process_to_schema(items)
-
-    schema_json = schema.to_json()
-    if args.output == "-":
-        print(json.dumps(schema_json, indent=2, sort_keys=True))
-    else:
-        with open(args.output, "w") as outfile:
-            json.dump(schema_json, outfile, indent=2, sort_keys=True)
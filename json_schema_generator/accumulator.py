@@ -0,0 +1,697 @@
+import collections
+
+from . import changes as _changes
+from . import events as _events
+from .decoders import EVENTS, get_decoder
+from .schema import ENUM_LIMIT, TUPLE_DEPTH, TUPLE_LIMIT
+from .schema import Schema, SchemaNode, fold_tree
+from .schema import SchemaNodeArray, SchemaNodeDict, SchemaNodeLeaf
+from .stats import FrequencySketch, LeafStats
+
+# marker for a leaf that has not seen any values yet
+_UNSET = object()
+# marker for a container whose contents have all been folded in
+_FINISH = object()
+# most shapes of record to remember the leaves of
+SHAPE_CACHE_SIZE = 256
+# misses after which to stop remembering shapes if there are more misses
+# than hits, as working out shapes costs more than hits save
+SHAPE_TRIAL = 100
+# deepest nesting of records to work out the shape of
+SHAPE_DEPTH = 64
+# types of value that are leaves, and can be part of a shape
+_LEAF_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
+class SchemaAccumulator(object):
+    """
+    Builds a schema by folding JSON records one at a time into a single
+    mutable tree, rather than building and merging a tree per record.
+
+    Call freeze() to get an ordinary Schema of everything added so far.
+
+    Every change to the shape of the schema, such as a new property, type
+    or enum value, but not to only its statistics, is recorded in changes
+    until the next snapshot(). Version is how many there have been.
+
+    The leaves that records of the same shape, meaning the same keys and
+    types of value, are added to are remembered for the most recent
+    shape_cache_size shapes. Records of those shapes are then added
+    straight to the leaves, counted by shape_hits, rather than through the
+    whole tree, counted by shape_misses. Use 0 to not remember any. If
+    most records have shapes not seen before, shapes are no longer worked
+    out at all.
+
+    Objects and arrays nested max_depth deep, counting records as 0, are
+    not followed but summarised by a leaf of no particular type. Records
+    are folded without recursion, so can be nested to any depth anyway.
+
+    If count_distinct, leaves also estimate how many distinct values they
+    have, see stats.LeafStats.
+    """
+
+    def __init__(self, enum_limit=ENUM_LIMIT, enum_coverage=1.0,
+                 shape_cache_size=SHAPE_CACHE_SIZE, max_depth=None,
+                 count_distinct=False):
+        self.enum_limit = enum_limit
+        self.enum_coverage = enum_coverage
+        self.max_depth = max_depth
+        self.count_distinct = count_distinct
+        self.root = None
+        self.count = 0
+        self.version = 0
+        self._changes = []
+        # changes whose paths haven't been worked out yet, as (node, kind,
+        # detail), as walking up from every new node of a deeply nested
+        # record would take time proportional to the square of its depth
+        self._pending = []
+        self.shape_cache_size = shape_cache_size
+        # shape to tuple of the leaves each value in it is added to
+        self.shapes = collections.OrderedDict()
+        self.shape_hits = 0
+        self.shape_misses = 0
+        self._use_shapes = bool(shape_cache_size)
+
+    @property
+    def changes(self):
+        """
+        The list of changes.Change since the last snapshot.
+        """
+        self._add_pending()
+        return self._changes
+
+    def _add_pending(self):
+        # work out the paths of pending changes
+        for node, kind, detail in self._pending:
+            steps = []
+            while node.parent is not None:
+                steps.append(node.step)
+                node = node.parent
+            steps.reverse()
+            self._changes.append(
+                _changes.Change(_changes.format_path(steps), kind, detail))
+        self._pending.clear()
+
+    def changed(self, node, kind, detail=None):
+        """
+        Record a change of kind to the shape of the schema at node.
+        """
+        # where a node is in the tree never changes, so its path can be
+        # worked out later
+        self._pending.append((node, kind, detail))
+        self.version += 1
+        if kind is _changes.CONFLICT or kind is _changes.NOT_TUPLE:
+            # nodes have been replaced or dropped, so remembered leaves
+            # may no longer be in the tree, and pending changes shouldn't
+            # keep them alive
+            self.shapes.clear()
+            self._add_pending()
+
+    def add(self, thing):
+        if not self._use_shapes:
+            self.root = _accumulate(self.root, thing, self, None, None)
+            self.count += 1
+            return
+
+        values = []
+        shape = _shape(thing, values)
+        leaves = self.shapes.get(shape) if shape is not None else None
+        if leaves is None:
+            self.shape_misses += 1
+            self.root = _accumulate(self.root, thing, self, None, None)
+            if self.shape_misses >= SHAPE_TRIAL \
+                    and self.shape_misses > self.shape_hits:
+                self._use_shapes = False
+                self.shapes.clear()
+            elif shape is not None:
+                self._remember(shape, thing)
+        else:
+            # with the same shape as before, no dict or array can change
+            self.shape_hits += 1
+            self.shapes.move_to_end(shape)
+            for nodes, value in zip(leaves, values):
+                for node in nodes:
+                    node.add(value, self)
+        self.count += 1
+
+    def _remember(self, shape, thing):
+        leaves = []
+        if not _shape_leaves((self.root,), thing, leaves):
+            return
+        shapes = self.shapes
+        shapes[shape] = leaves
+        if len(shapes) > self.shape_cache_size:
+            shapes.popitem(last=False)
+
+    def update(self, things):
+        for thing in things:
+            self.add(thing)
+        return self
+
+    def add_events(self, events):
+        """
+        Fold a single JSON document, given as (event, value) pairs from
+        events.iter_events, without building the document itself.
+        """
+        # the root is the only slot at the top level
+        root = [self.root]
+        # open containers, as [kind, accumulators, keys or length], and
+        # for arrays the slots of every item and whether any are tuples
+        frames = []
+        # slots are (parent, holder, key), see _get_slot
+        slots = [(None, root, 0)]
+        for event, value in events:
+            if event == _events.MAP_KEY:
+                frame = frames[-1]
+                frame[2].append(value)
+                slots = [(x, x.children, value) for x in frame[1]]
+                continue
+            if event == _events.END_MAP or event == _events.END_ARRAY:
+                frame = frames.pop()
+                for node in frame[1]:
+                    node.finish(frame[2], self)
+                continue
+
+            if frames and frames[-1][0] is SchemaNodeArray:
+                # arrays have no keys, so work out where each item goes
+                frame = frames[-1]
+                index = frame[2]
+                frame[2] = index + 1
+                slots = frame[3]
+                if frame[4] and index < TUPLE_LIMIT:
+                    slots = []
+                    for node in frame[1]:
+                        slots.append((node, node, None))
+                        if node.keeps_position(index):
+                            slots.append((node, node.positions, index))
+
+            if event == _events.VALUE:
+                for parent, holder, key in slots:
+                    node = _get_slot(holder, key)
+                    if node is not None and node.kind is SchemaNodeLeaf:
+                        # the common case, as in _accumulate
+                        node.add(value, self)
+                    else:
+                        _set_slot(holder, key, _accumulate(
+                            node, value, self, parent, key))
+                continue
+
+            if event == _events.START_MAP:
+                kind, state = SchemaNodeDict, []
+            else:
+                kind, state = SchemaNodeArray, 0
+            nodes = []
+            frame = [kind, nodes, state]
+            if len(frames) == self.max_depth:
+                # too deep, so nothing inside this is followed
+                for parent, holder, key in slots:
+                    _set_slot(holder, key, _summarise(
+                        _get_slot(holder, key), self, parent, key))
+            else:
+                # every slot of the right kind carries on into the container
+                for parent, holder, key in slots:
+                    node = _get_slot(holder, key)
+                    if node is None:
+                        node = _new_node(kind, self, parent, key, len(frames))
+                        _set_slot(holder, key, node)
+                    elif node.kind is not kind:
+                        if not _is_generic(node):
+                            _set_slot(holder, key,
+                                      _LeafAccumulator.generic(self, node))
+                        continue
+                    nodes.append(node)
+            if kind is SchemaNodeArray:
+                frame.append([(x, x, None) for x in nodes])
+                frame.append(any(x.positions is not None for x in nodes))
+            frames.append(frame)
+
+        self.root = root[0]
+        self.count += 1
+
+    def add_json(self, document):
+        """
+        Fold a single JSON document, as str or UTF-8 bytes, without
+        decoding it into Python objects first.
+        """
+        self.add_events(_events.iter_events(document))
+
+    def update_json(self, documents):
+        for document in documents:
+            self.add_json(document)
+        return self
+
+    def update_lines(self, lines, decoder="auto", profile=None):
+        """
+        Add undecoded lines of JSON. Decoder is one of DECODERS, "auto",
+        or EVENTS to fold tokens without decoding.
+
+        If profile is given, reading, decoding and extracting are timed.
+        """
+        if profile is None:
+            if decoder == EVENTS:
+                return self.update_json(lines)
+            return self.update(map(get_decoder(decoder), lines))
+
+        count = self.count
+        hits = self.shape_hits
+        misses = self.shape_misses
+        lines = profile.timed("read", lines, "bytes_read")
+        with profile.stage("extract"):
+            if decoder == EVENTS:
+                # tokens are folded as they are decoded
+                self.update_json(lines)
+            else:
+                self.update(profile.timed(
+                    "decode", map(get_decoder(decoder), lines)))
+        profile.count("records", self.count - count)
+        profile.count("shape_hits", self.shape_hits - hits)
+        profile.count("shape_misses", self.shape_misses - misses)
+        return self
+
+    def node_count(self):
+        """
+        The number of nodes in the tree so far, which takes a walk of it.
+        """
+        count = 0
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            if node is None:
+                continue
+            count += 1
+            if node.kind is SchemaNodeDict:
+                nodes.extend(node.children.values())
+            elif node.kind is SchemaNodeArray:
+                nodes.append(node.items)
+                if node.positions is not None:
+                    nodes.extend(node.positions)
+        return count
+
+    def freeze(self, interner=None):
+        """
+        Returns a Schema of everything added so far.
+
+        If interner is given, equal subtrees will share a single node.
+        """
+        if self.root is None:
+            return Schema(None, self.count)
+        root = fold_tree(
+            (self.root, None), lambda item: item[0].contents(),
+            lambda item, frozen: item[0].freeze(item[1], frozen, interner))
+        return Schema(root, self.count)
+
+    def snapshot(self, interner=None):
+        """
+        Returns a Schema of everything added so far, and the changes since
+        the last snapshot, and starts recording changes afresh.
+        """
+        changes = self.changes
+        self._changes = []
+        return self.freeze(interner), changes
+
+
+def _shape(thing, values, depth=0):
+    """
+    A hashable shape of thing, made of its keys and the types of its
+    values, appending the values at its leaves to values in order. None if
+    it has things that aren't plain JSON, or is nested more than
+    SHAPE_DEPTH deep, so has no shape.
+    """
+    kind = type(thing)
+    if kind is dict or kind is list:
+        if depth == SHAPE_DEPTH:
+            return None
+        depth += 1
+    if kind is dict:
+        shape = [dict]
+        for key, value in thing.items():
+            child = _shape(value, values, depth)
+            if child is None:
+                return None
+            shape.append(key)
+            shape.append(child)
+        return tuple(shape)
+    elif kind is list:
+        shape = [list]
+        for value in thing:
+            child = _shape(value, values, depth)
+            if child is None:
+                return None
+            shape.append(child)
+        return tuple(shape)
+    elif kind in _LEAF_TYPES:
+        values.append(thing)
+        return kind
+    return None
+
+
+def _shape_leaves(nodes, thing, leaves):
+    """
+    Append the tuple of leaves among nodes, and their descendants, that
+    each value at a leaf of thing was added to, in the same order as
+    _shape. False if thing doesn't match the tree, after a conflict.
+    """
+    kind = type(thing)
+    if kind is dict:
+        if any(node.kind is not SchemaNodeDict for node in nodes):
+            return False
+        for key, value in thing.items():
+            if not _shape_leaves(tuple(node.children[key] for node in nodes),
+                                 value, leaves):
+                return False
+    elif kind is list:
+        if any(node.kind is not SchemaNodeArray for node in nodes):
+            return False
+        for index, value in enumerate(thing):
+            children = [node.items for node in nodes]
+            for node in nodes:
+                if node.positions is not None \
+                        and index < len(node.positions):
+                    children.append(node.positions[index])
+            if not _shape_leaves(tuple(children), value, leaves):
+                return False
+    else:
+        if any(node.kind is not SchemaNodeLeaf for node in nodes):
+            return False
+        leaves.append(nodes)
+    return True
+
+
+def _new_node(kind, accumulator, parent, step, depth=0):
+    if kind is SchemaNodeArray:
+        node = _ArrayAccumulator(accumulator, parent, step, depth)
+    else:
+        node = _ACCUMULATORS[kind](accumulator, parent, step)
+    accumulator.changed(node, _changes.ADDED, _KIND_NAMES[kind])
+    return node
+
+
+def _accumulate(node, thing, accumulator, parent, step, depth=0):
+    """
+    Fold thing, nested depth deep, into node, returning the node that
+    should take its place.
+
+    This will be a new node at step of parent if node is None, or a
+    generic leaf if thing is a different kind of thing to what node has
+    seen before.
+
+    The contents of thing are folded in from a stack rather than by
+    recursion, so there is no limit on how deeply they can be nested.
+    """
+    max_depth = accumulator.max_depth
+    # the top level is the only slot of its own
+    top = [node]
+    # things to fold into slots, as (thing, parent, holder, key, step,
+    # depth), see _get_slot, or containers to finish once all of their
+    # contents have been, as (_FINISH, node, keys or length)
+    stack = [(thing, parent, top, 0, step, depth)]
+    while stack:
+        entry = stack.pop()
+        if entry[0] is _FINISH:
+            entry[1].finish(entry[2], accumulator)
+            continue
+        thing, parent, holder, key, step, depth = entry
+        if type(holder) is dict:
+            node = holder.get(key)
+        else:
+            node = _get_slot(holder, key)
+
+        # check the common concrete types first, they are much faster
+        # than the abstract base classes in discover_class
+        if type(thing) is dict:
+            kind = SchemaNodeDict
+        elif type(thing) is list:
+            kind = SchemaNodeArray
+        elif type(thing) in _LEAF_TYPES:
+            kind = SchemaNodeLeaf
+            if node is not None and node.kind is kind:
+                node.add(thing, accumulator)
+                continue
+        else:
+            kind = SchemaNode.discover_class(thing)
+
+        if kind is not SchemaNodeLeaf and depth == max_depth:
+            _set_slot(holder, key,
+                      _summarise(node, accumulator, parent, step))
+            continue
+        if node is None:
+            node = _new_node(kind, accumulator, parent, step, depth)
+            _set_slot(holder, key, node)
+        elif node.kind is not kind:
+            # different kinds of thing can't share a type, so be generic
+            if not _is_generic(node):
+                node = _LeafAccumulator.generic(accumulator, node)
+                _set_slot(holder, key, node)
+            if kind is SchemaNodeLeaf:
+                node.add(thing, accumulator)
+            continue
+
+        if kind is SchemaNodeLeaf:
+            node.add(thing, accumulator)
+            continue
+        # push the contents in reverse, so they are folded in order
+        depth += 1
+        if kind is SchemaNodeDict:
+            stack.append((_FINISH, node, thing.keys()))
+            children = node.children
+            items = thing.items()
+            if type(thing) is not dict:
+                items = list(items)
+            stack.extend([(value, node, children, key, key, depth)
+                          for key, value in reversed(items)])
+        else:
+            contents = []
+            length = 0
+            for value in thing:
+                # fold every item into a single schema
+                contents.append((value, node, node, None, None, depth))
+                if node.positions is not None \
+                        and node.keeps_position(length):
+                    contents.append((value, node, node.positions, length,
+                                     length, depth))
+                length += 1
+            stack.append((_FINISH, node, length))
+            contents.reverse()
+            stack.extend(contents)
+    return top[0]
+
+
+def _summarise(node, accumulator, parent, step):
+    """
+    A generic leaf at step of parent, for a container nested too deep to
+    follow, in place of node.
+    """
+    if node is None:
+        node = _new_node(SchemaNodeLeaf, accumulator, parent, step)
+        node.datatype = None
+        node.sketch = FrequencySketch.overflowed(accumulator.enum_limit,
+                                                 accumulator.enum_coverage)
+        return node
+    if _is_generic(node):
+        return node
+    return _LeafAccumulator.generic(accumulator, node)
+
+
+def _is_generic(node):
+    # already as generic as can be, so replacing it would change nothing
+    return node.kind is SchemaNodeLeaf and node.datatype is None \
+        and node.sketch.counts is None
+
+
+def _get_slot(holder, key):
+    # holder is a dict of children, a list of positions, or an array
+    # accumulator whose items are the slot
+    if type(holder) is dict:
+        return holder.get(key)
+    elif type(holder) is list:
+        return holder[key] if key < len(holder) else None
+    return holder.items
+
+
+def _set_slot(holder, key, node):
+    if type(holder) is dict:
+        holder[key] = node
+    elif type(holder) is list:
+        if key < len(holder):
+            holder[key] = node
+        else:
+            holder.append(node)
+    else:
+        holder.items = node
+
+
+def _intern(node, interner):
+    if interner is not None:
+        node = interner.intern(node)
+    return node
+
+
+class _DictAccumulator(object):
+    __slots__ = ("parent", "step", "children", "required")
+    kind = SchemaNodeDict
+
+    def __init__(self, accumulator, parent=None, step=None):
+        # where this is in the tree, for recording changes
+        self.parent = parent
+        self.step = step
+        self.children = {}
+        self.required = None
+
+    def finish(self, keys, accumulator):
+        # things can be marked as required iff they are in every instance
+        if self.required is None:
+            self.required = set(keys)
+        else:
+            missing = self.required.difference(keys)
+            if missing:
+                self.required.difference_update(missing)
+                accumulator.changed(self, _changes.OPTIONAL,
+                                    tuple(sorted(missing)))
+
+    def contents(self):
+        """
+        The nodes to be frozen before this one, paired with their names.
+        """
+        return [(child, key) for key, child in self.children.items()]
+
+    def freeze(self, name, frozen, interner=None):
+        """
+        A schema node of this, given its contents frozen.
+        """
+        return _intern(SchemaNodeDict(name, frozen, self.required), interner)
+
+
+class _ArrayAccumulator(object):
+    __slots__ = ("parent", "step", "items", "min_length", "max_length",
+                 "positions")
+    kind = SchemaNodeArray
+
+    def __init__(self, accumulator, parent=None, step=None, depth=0):
+        self.parent = parent
+        self.step = step
+        self.items = None
+        self.min_length = None
+        self.max_length = None
+        # only kept while every array has been the same short length, and
+        # if it is not nested TUPLE_DEPTH deep
+        self.positions = [] if depth < TUPLE_DEPTH else None
+
+    def keeps_position(self, index):
+        """
+        If the item at index could still be part of a fixed length array.
+
+        This is decided item by item, so positions may be filled in for an
+        array that then turns out to be too long and is dropped by finish.
+        """
+        return self.positions is not None and index < TUPLE_LIMIT \
+            and (self.max_length is None or index < self.max_length)
+
+    def finish(self, length, accumulator):
+        if self.positions is not None:
+            if self.max_length is None:
+                if length > TUPLE_LIMIT:
+                    # the first items were already added to positions,
+                    # and their changes recorded, so this is a change too
+                    self.positions = None
+                    accumulator.changed(self, _changes.NOT_TUPLE)
+            elif self.max_length != length:
+                self.positions = None
+                accumulator.changed(self, _changes.NOT_TUPLE)
+
+        if self.min_length is None or length < self.min_length:
+            self.min_length = length
+        if self.max_length is None or length > self.max_length:
+            self.max_length = length
+
+    def contents(self):
+        contents = []
+        if self.items is not None:
+            contents.append((self.items, None))
+        if self.positions is not None:
+            contents.extend((x, None) for x in self.positions)
+        return contents
+
+    def freeze(self, name, frozen, interner=None):
+        children = frozen[:1] if self.items is not None else ()
+        positions = None
+        if self.positions is not None:
+            positions = frozen[len(children):]
+        return _intern(
+            SchemaNodeArray(name, children, self.min_length, self.max_length,
+                            positions),
+            interner)
+
+
+class _LeafAccumulator(object):
+    __slots__ = ("parent", "step", "datatype", "sketch", "stats")
+    kind = SchemaNodeLeaf
+
+    def __init__(self, accumulator, parent=None, step=None):
+        self.parent = parent
+        self.step = step
+        self.datatype = _UNSET
+        self.sketch = FrequencySketch(accumulator.enum_limit,
+                                      accumulator.enum_coverage)
+        self.stats = LeafStats(count_distinct=accumulator.count_distinct)
+
+    @classmethod
+    def generic(clazz, accumulator, replacing):
+        """
+        An untyped leaf to take the place of the node replacing, keeping
+        its statistics if it is a leaf, as merging schemas does.
+        """
+        node = clazz(accumulator, replacing.parent, replacing.step)
+        node.datatype = None
+        if replacing.kind is SchemaNodeLeaf:
+            # replacing is dropped, so can give these up
+            node.stats = replacing.stats
+            node.sketch = replacing.sketch
+            node.sketch.counts = None
+        else:
+            node.sketch = FrequencySketch.overflowed(
+                accumulator.enum_limit, accumulator.enum_coverage)
+        accumulator.changed(node, _changes.CONFLICT)
+        return node
+
+    def add(self, thing, accumulator):
+        datatype = SchemaNodeLeaf.discover_datatype(thing)
+        if self.datatype is _UNSET:
+            self.datatype = datatype
+        elif self.datatype != datatype and self.datatype is not None:
+            accumulator.changed(self, _changes.WIDENED,
+                                (self.datatype, datatype))
+            self.datatype = None
+        sketch = self.sketch
+        if sketch.counts is None:
+            sketch.add(thing)
+        else:
+            # only new values while the counts are exact, or the values no
+            # longer being an enum, count as a change
+            known = thing in sketch.counts or sketch.decrement > 0
+            sketch.add(thing)
+            if sketch.counts is None:
+                accumulator.changed(self, _changes.NOT_ENUM)
+            elif not known:
+                accumulator.changed(self, _changes.ENUM_VALUE, thing)
+        self.stats.add(thing)
+
+    def contents(self):
+        return ()
+
+    def freeze(self, name, frozen, interner=None):
+        return _intern(
+            SchemaNodeLeaf(name, None, self.datatype, self.stats.copy(),
+                           self.sketch.copy()),
+            interner)
+
+
+_ACCUMULATORS = {
+    SchemaNodeDict: _DictAccumulator,
+    SchemaNodeArray: _ArrayAccumulator,
+    SchemaNodeLeaf: _LeafAccumulator,
+}
+_KIND_NAMES = {
+    SchemaNodeDict: "object",
+    SchemaNodeArray: "array",
+    SchemaNodeLeaf: "value",
+}
@@ -0,0 +1,42 @@
+"""
+Changes to the shape of a schema, as recorded by SchemaAccumulator.
+
+Each change says where in the schema it happened, as a JSON pointer into
+the generated schema such as /properties/address/properties/city, what
+kind of change it was, and any detail for that kind.
+"""
+import collections
+
+# a new object, array or value, detail is which of those
+ADDED = "added"
+# different kinds of thing at the same place, so it is now untyped
+CONFLICT = "conflict"
+# values of a different type, detail is the (old, new) types
+WIDENED = "widened"
+# properties that are no longer always present, detail is their names
+OPTIONAL = "optional"
+# arrays of different lengths, or one too long, so no longer a tuple
+NOT_TUPLE = "not_tuple"
+# a new value of an enum, detail is the value
+ENUM_VALUE = "enum_value"
+# too many different values to be an enum
+NOT_ENUM = "not_enum"
+
+Change = collections.namedtuple("Change", ("path", "kind", "detail"))
+
+
+def format_path(steps):
+    """
+    JSON pointer into a schema from steps, which are property names, None
+    for the items of an array, or an int for a position of a tuple.
+    """
+    parts = [""]
+    for step in steps:
+        if step is None:
+            parts.append("items")
+        elif isinstance(step, int):
+            parts.extend(("items", str(step)))
+        else:
+            parts.extend(("properties",
+                          step.replace("~", "~0").replace("/", "~1")))
+    return "/".join(parts)
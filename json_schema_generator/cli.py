@@ -0,0 +1,227 @@
+"""
+The command line interface.
+
+Dask is only imported if the dask engine is chosen.
+"""
+import argparse
+import itertools
+import sys
+
+from . import process_lines_to_schema
+from .decoders import DECODERS, EVENTS
+from .merging import FAN_IN
+from .output import write_json
+from .processes import process_files_to_schema
+from .profiling import Profile
+from .progress import REPORT_INTERVAL, Progress, input_size
+from .readers import RANGE_SIZE, parse_size, read_lines, read_range
+from .readers import split_ranges
+from .sampling import Sampling
+from .schema import ENUM_LIMIT, Schema
+from .state import SchemaState
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON schema from JSON lines')
+    parser.add_argument("output",
+                        help="optional filename to write to, - for stdout")
+    parser.add_argument("input", nargs='+',
+                        help="one or more JSON lines filenames")
+    parser.add_argument("--blocksize", action="store", default=None, type=str,
+                        help="Size of blocks of input e.g. 128MiB")
+    parser.add_argument("--workers", action="store", default="1", type=int,
+                        help="Number of processess to use")
+    parser.add_argument("--engine", action="store", default=None,
+                        choices=("serial", "processes", "dask"),
+                        help="How to run, defaults to dask if more than one "
+                             "worker else serial")
+    parser.add_argument("--visualize", action="store", default=None, type=str,
+                        help="Flag if compute graph should be displayed")
+    parser.add_argument("--enum-limit", action="store", default=ENUM_LIMIT,
+                        type=int,
+                        help="Most distinct values for something to be enum")
+    parser.add_argument("--enum-coverage", action="store", default=1.0,
+                        type=float,
+                        help="Fraction of values that must be one of the "
+                             "enum values e.g. 0.99")
+    parser.add_argument("--decoder", action="store", default="auto",
+                        choices=("auto",) + DECODERS + (EVENTS,),
+                        help="JSON decoder to use, auto picks the fastest "
+                             "and events builds the schema from tokens "
+                             "without decoding")
+    parser.add_argument("--fan-in", action="store", default=FAN_IN,
+                        type=int,
+                        help="Number of partial schemas to merge at a time")
+    parser.add_argument("--state", action="store", default=None, type=str,
+                        help="File to keep the schema in between runs, so "
+                             "only new input files are processed")
+    parser.add_argument("--sample-size", action="store", default=None,
+                        type=int,
+                        help="Only use a random sample of this many records "
+                             "(of each block, if more than one worker)")
+    parser.add_argument("--sample-blocks", action="store", default=None,
+                        type=int,
+                        help="Only read this many randomly chosen blocks, "
+                             "see --blocksize")
+    parser.add_argument("--patience", action="store", default=None,
+                        type=int,
+                        help="Stop once this many records in a row have "
+                             "not changed the schema (in each block, if "
+                             "more than one worker)")
+    parser.add_argument("--seed", action="store", default=None, type=int,
+                        help="Random seed, to make sampling repeatable")
+    parser.add_argument("--profile", action="store", default=None, type=str,
+                        help="File to write the time taken by each stage "
+                             "to as JSON, - for stderr")
+    parser.add_argument("--progress", action="store", default=None,
+                        type=float, metavar="SECONDS",
+                        help="Report progress to stderr this often")
+    parser.add_argument("--metrics", action="store", default=None, type=str,
+                        help="File to keep up to date with progress in the "
+                             "Prometheus text format")
+    parser.add_argument("--dedup", action="store", default=None, type=int,
+                        metavar="LINES",
+                        help="Skip lines identical to one of about this many "
+                             "recent lines (in the same block, if more than "
+                             "one worker), which aren't counted in the "
+                             "schema")
+    parser.add_argument("--max-depth", action="store", default=None,
+                        type=int,
+                        help="Summarise objects and arrays nested this deep "
+                             "as untyped, rather than following them")
+    parser.add_argument("--count-distinct", action="store_true",
+                        help="Estimate how many distinct values each field "
+                             "has, as x-distinct, which is slower")
+    args = parser.parse_args()
+    if args.fan_in < 2:
+        parser.error("--fan-in must be at least 2")
+    if args.dedup is not None and args.dedup < 2:
+        parser.error("--dedup must be at least 2")
+    if args.max_depth is not None and args.max_depth < 0:
+        parser.error("--max-depth must not be negative")
+    engine = args.engine
+    if engine is None:
+        engine = "dask" if args.workers > 1 else "serial"
+    sampling = None
+    if args.sample_size is not None or args.sample_blocks is not None \
+            or args.patience is not None:
+        if args.state is not None:
+            parser.error("sampling can't be used with --state")
+        sampling = Sampling(args.sample_size, args.sample_blocks,
+                            args.patience, args.seed)
+
+    filenames = args.input
+    state = None
+    if args.state is not None:
+        if "-" in filenames:
+            parser.error("standard input can't be used with --state")
+        try:
+            state = SchemaState.load(args.state, args.enum_limit,
+                                     args.enum_coverage, args.max_depth,
+                                     args.count_distinct)
+            filenames = state.new_files(filenames)
+        except ValueError as e:
+            parser.error(str(e))
+
+    profile = None
+    if args.profile is not None:
+        profile = Profile()
+        # time not in any other stage, such as starting workers
+        profile.enter("other")
+    progress = None
+    if args.progress is not None or args.metrics is not None:
+        progress = Progress(
+            input_size(filenames),
+            args.progress if args.progress is not None else REPORT_INTERVAL,
+            sys.stderr if args.progress is not None else None,
+            args.metrics)
+
+    if not filenames:
+        schema = Schema(None)
+    elif engine == "dask":
+        # import these here, as they are slow and not needed otherwise
+        import dask.bag
+        from dask.distributed import Client, LocalCluster
+        from .dask_engine import process_to_schema_dask
+
+        cluster = LocalCluster()
+        # here the client registers itself as the default within Dask
+        # TODO explicitly call the client
+        # TODO explicitly allow client to be passed
+        # flake8 - this works by side effect
+        client = Client(cluster)  # noqa: F841
+        cluster.scale(args.workers)
+
+        lines = dask.bag.read_text(filenames, blocksize=args.blocksize)
+        schema = process_to_schema_dask(lines, args.visualize,
+                                        args.enum_limit, args.enum_coverage,
+                                        args.decoder, args.fan_in, False,
+                                        sampling, profile, progress,
+                                        args.dedup, args.max_depth,
+                                        args.count_distinct)
+    elif engine == "processes":
+        if "-" in filenames:
+            parser.error("standard input can only be read serially")
+        range_size = None
+        if args.blocksize is not None:
+            range_size = parse_size(args.blocksize)
+        schema = process_files_to_schema(filenames, args.workers,
+                                         args.decoder, args.enum_limit,
+                                         args.enum_coverage, range_size,
+                                         args.fan_in, False, sampling,
+                                         profile, progress, args.dedup,
+                                         args.max_depth, args.count_distinct)
+    else:
+        if sampling is not None and sampling.blocks is not None:
+            if "-" in filenames:
+                parser.error("standard input can't be split into blocks")
+            range_size = RANGE_SIZE
+            if args.blocksize is not None:
+                range_size = parse_size(args.blocksize)
+            ranges = sampling.choose(split_ranges(filenames, range_size))
+            lines = itertools.chain.from_iterable(map(read_range, ranges))
+        else:
+            lines = read_lines(filenames)
+        schema = process_lines_to_schema(lines, args.decoder,
+                                         args.enum_limit, args.enum_coverage,
+                                         False, sampling, profile,
+                                         progress, args.dedup,
+                                         args.max_depth, args.count_distinct)
+    if progress is not None:
+        progress.finish(schema)
+    if sampling is not None:
+        print("Sampled {} records".format(schema.count), file=sys.stderr)
+
+    if state is not None:
+        # save before inferring references, which can't be merged into
+        state.update(schema, filenames)
+        state.save(args.state)
+        schema = Schema(state.schema.root, state.schema.count)
+    # post-process the schema to compute definitions
+    if profile is None:
+        schema.infer_references()
+        schema_json = schema.to_json()
+    else:
+        with profile.stage("infer_references"):
+            schema.infer_references()
+        with profile.stage("to_json"):
+            schema_json = schema.to_json()
+
+    # written without recursion, as the schema can be nested to any depth
+    if args.output == "-":
+        write_json(schema_json, sys.stdout)
+        print()
+    else:
+        with open(args.output, "w") as outfile:
+            write_json(schema_json, outfile)
+
+    if profile is not None:
+        profile.exit()
+        profile_json = profile.to_json()
+        profile_json["engine"] = engine
+        if args.profile == "-":
+            write_json(profile_json, sys.stderr)
+            print(file=sys.stderr)
+        else:
+            with open(args.profile, "w") as outfile:
+                write_json(profile_json, outfile)
@@ -0,0 +1,174 @@
+"""
+Building a schema of a Dask bag, with each partition accumulated into a
+single schema and only those per-partition schemas merged, as a tree.
+
+This imports Dask, which is slow, so is only imported when it is used.
+"""
+import functools
+import uuid
+
+import dask
+import dask.bag
+
+from .accumulator import SchemaAccumulator
+from .dedup import RecentLines
+from .merging import FAN_IN, merge_group
+from .profiling import Profile, record_schema
+from .progress import log_progress, log_schema
+from .schema import ENUM_LIMIT
+from .serialization import register_dask_serializers
+
+# workers import this module to run the partitions, so will use these too
+register_dask_serializers()
+
+
+def _partition_to_schema(items, enum_limit, enum_coverage, decoder=None,
+                         sampling=None, profile=False, progress_topic=None,
+                         dedup=None, max_depth=None, count_distinct=False,
+                         block=0):
+    # if profile, returns the schema and a Profile of this partition
+    # if sampling, samples as the block'th block
+    # if progress_topic, sends what has been read to it
+    # if dedup, skips lines the same as a recent line in this partition
+    accumulator = SchemaAccumulator(enum_limit, enum_coverage,
+                                    max_depth=max_depth,
+                                    count_distinct=count_distinct)
+    if progress_topic is not None:
+        items = log_progress(items, progress_topic)
+    if dedup is not None:
+        recent = RecentLines(dedup)
+        items = recent.unique(items)
+    if sampling is not None:
+        items = sampling.records(items, accumulator, block)
+    if not profile:
+        if decoder is not None:
+            accumulator.update_lines(items, decoder)
+        else:
+            accumulator.update(items)
+        schema = accumulator.freeze()
+        if progress_topic is not None:
+            log_schema(progress_topic, schema)
+        return schema
+
+    profile = Profile()
+    if decoder is not None:
+        accumulator.update_lines(items, decoder, profile)
+    else:
+        with profile.stage("extract"):
+            accumulator.update(items)
+        profile.count("records", accumulator.count)
+    if dedup is not None:
+        profile.count("duplicate_lines", recent.duplicates)
+    with profile.stage("freeze"):
+        schema = accumulator.freeze()
+    record_schema(profile, schema)
+    if progress_topic is not None:
+        log_schema(progress_topic, schema)
+    return schema, profile
+
+
+def _block_to_schema(items, blocks, partition_to_schema):
+    # as partition_to_schema, given a partition of the single index of
+    # this block in the original bag, as a partition of the single result
+    [block] = blocks
+    return [partition_to_schema(items, block=block)]
+
+
+def _sole(results):
+    # the result in a partition of the single result
+    [result] = results
+    return result
+
+
+def _merge_profiled(results, enum_limit, enum_coverage):
+    # as merge_group, of the schemas and profiles of _partition_to_schema
+    results = list(results)
+    profile = Profile()
+    for result in results:
+        profile.update(result[1])
+    with profile.stage("merge"):
+        schema = merge_group([result[0] for result in results], enum_limit,
+                             enum_coverage)
+    record_schema(profile, schema)
+    return schema, profile
+
+
+def process_to_schema_dask(dask_bag, visualize, enum_limit=ENUM_LIMIT,
+                           enum_coverage=1.0, decoder=None, fan_in=FAN_IN,
+                           infer_references=True, sampling=None,
+                           profile=None, progress=None, dedup=None,
+                           max_depth=None, count_distinct=False):
+    # if decoder is given, the bag is of lines that each partition decodes
+    # each partition is accumulated into a single schema
+    # and only those per-partition schemas are merged, as a tree of fan_in
+    # if profile is given, each partition and merge is profiled separately
+    # and their profiles merged alongside the schemas
+    # if progress is given, partitions send what they have read to it via
+    # the default distributed client
+    # if dedup is given, lines the same as one of about that many recent
+    # lines in the same partition are skipped, so the bag must be of lines
+    # if max_depth is given, anything nested that deep is summarised
+    # if count_distinct, distinct values are estimated
+    if dedup is not None and decoder is None:
+        raise ValueError("Duplicate lines can only be skipped with a decoder")
+    blocks = list(range(dask_bag.npartitions))
+    if sampling is not None and sampling.blocks is not None:
+        blocks = sampling.choose(blocks)
+        partitions = dask_bag.to_delayed()
+        dask_bag = dask.bag.from_delayed([partitions[i] for i in blocks])
+    progress_topic = None
+    if progress is not None:
+        # import this here, so if not used we don't need the requirements
+        from distributed import default_client
+        client = default_client()
+        progress_topic = "json_schema_generator-progress-{}".format(
+            uuid.uuid4().hex)
+        client.subscribe_topic(progress_topic, progress.receive)
+    partition_to_schema = functools.partial(
+        _partition_to_schema, enum_limit=enum_limit,
+        enum_coverage=enum_coverage, decoder=decoder, sampling=sampling,
+        profile=profile is not None, progress_topic=progress_topic,
+        dedup=dedup, max_depth=max_depth, count_distinct=count_distinct)
+    merge = functools.partial(
+        merge_group if profile is None else _merge_profiled,
+        enum_limit=enum_limit, enum_coverage=enum_coverage)
+    # each partition is passed its index, so that each samples differently
+    indexes = dask.bag.from_sequence(blocks, npartitions=len(blocks))
+    dask_bag = dask_bag.map_partitions(
+        _block_to_schema, indexes, partition_to_schema).reduction(
+        perpartition=_sole,
+        aggregate=merge,
+        split_every=fan_in)
+    if visualize:
+        # import this here, so if not used we don't need the requirements
+        # flake8 - works by side effect
+        from dask.dot import dot_graph  # noqa: F401
+        dask_bag.visualize(visualize)
+
+    # this will block until complete
+    try:
+        if profile is None:
+            schema = dask_bag.compute()
+        else:
+            with profile.stage("workers"):
+                schema, worker_profile = dask_bag.compute()
+            profile.update(worker_profile)
+    finally:
+        if progress_topic is not None:
+            client.unsubscribe_topic(progress_topic)
+
+    # post-process the schema to compute definitions
+    if infer_references:
+        if profile is None:
+            schema.infer_references()
+        else:
+            with profile.stage("infer_references"):
+                schema.infer_references()
+
+    return schema
+
+
+def process_to_json_dask(dask_bag, visualize, enum_limit=ENUM_LIMIT,
+                         enum_coverage=1.0, decoder=None, fan_in=FAN_IN):
+    return process_to_schema_dask(dask_bag, visualize, enum_limit,
+                                  enum_coverage, decoder, fan_in).to_json()
@@ -0,0 +1,76 @@
+"""
+Choice of JSON decoder used to read each line of input.
+
+orjson is fastest but is an optional requirement, the standard library
+json module has a C accelerated decoder, and simplejson is kept for
+compatibility with earlier versions. All of them accept str or bytes, and
+give the same schema.
+
+orjson reads integers wider than 64 bits as floats, and crashes the whole
+process on documents nested hundreds of thousands deep. Documents that
+could be either of those are decoded by json instead, which is checked
+for in much less time than orjson saves.
+
+EVENTS is not a decoder, but can be given instead of one to build the
+schema straight from the tokens of each line, see events.py.
+"""
+import functools
+import importlib
+
+# in order of preference for "auto"
+DECODERS = ("orjson", "json", "simplejson")
+EVENTS = "events"
+
+# a run of this many digits may be an integer too wide for 64 bits
+_WIDE_INTEGER = b"0" * 19
+_DIGITS_TO_ZERO = bytes(ord("0") if x in b"0123456789" else x
+                        for x in range(256))
+# documents with more than this many brackets may be nested too deep
+ORJSON_MAX_NESTING = 1000
+
+
+@functools.lru_cache(None)
+def _guarded_orjson():
+    # orjson.loads, with json.loads for documents it would get wrong
+    orjson_loads = importlib.import_module("orjson").loads
+    json_loads = importlib.import_module("json").loads
+
+    def loads(document):
+        data = document
+        if isinstance(data, str):
+            data = data.encode("utf-8", "surrogatepass")
+        if _WIDE_INTEGER in data.translate(_DIGITS_TO_ZERO) \
+                or data.count(b"[") + data.count(b"{") > ORJSON_MAX_NESTING:
+            return json_loads(document)
+        return orjson_loads(document)
+    return loads
+
+
+def available_decoders():
+    """
+    Names of the decoders that can be imported here.
+    """
+    available = []
+    for name in DECODERS:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def get_decoder(name="auto"):
+    """
+    Returns a function that decodes a single JSON document.
+
+    Name is one of DECODERS, or "auto" for the fastest one available.
+    """
+    if name == "auto":
+        name = available_decoders()[0]
+    elif name not in DECODERS:
+        raise ValueError("Unrecognized decoder {}".format(name))
+    if name == "orjson":
+        return _guarded_orjson()
+    # only import the module that is used
+    return importlib.import_module(name).loads
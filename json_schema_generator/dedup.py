@@ -0,0 +1,51 @@
+"""
+Skipping lines that are exact copies of recent lines, such as heartbeats
+and retries in logs, before they are decoded.
+
+Adding the same record again can't change the shape of the schema, only
+its statistics, so skipped lines are not counted in the schema at all.
+Only hashes of lines are kept, in two sets of up to half the size each,
+the older being dropped when the newer is full, so memory is bounded and
+lines are remembered for at least half of size distinct lines.
+"""
+
+# distinct lines to remember by default
+DEDUP_SIZE = 1 << 16
+
+
+class RecentLines(object):
+    """
+    Hashes of recent lines, and how many duplicates have been skipped.
+    """
+
+    def __init__(self, size=DEDUP_SIZE):
+        if size < 2:
+            raise ValueError("Must remember at least 2 lines")
+        self.size = size
+        self.current = set()
+        self.previous = set()
+        self.duplicates = 0
+
+    def unique(self, lines):
+        """
+        Generates the lines that are not the same as a recent line.
+        """
+        half = self.size // 2
+        current = self.current
+        previous = self.previous
+        for line in lines:
+            key = hash(line)
+            if key in current:
+                self.duplicates += 1
+                continue
+            # seen before the sets last swapped, if at all, but keep it for
+            # as long as it keeps being seen
+            known = key in previous
+            current.add(key)
+            if len(current) >= half:
+                previous = self.previous = current
+                current = self.current = set()
+            if known:
+                self.duplicates += 1
+                continue
+            yield line
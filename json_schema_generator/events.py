@@ -0,0 +1,98 @@
+"""
+Tokenizing JSON documents into a stream of events, so that a schema can
+be built without ever creating the whole decoded document.
+
+Only the scalar values are created, one at a time, which keeps memory low
+for records with long arrays or many large strings. This is a tokenizer
+rather than a validating parser, so some invalid JSON may be accepted,
+such as missing or extra commas.
+"""
+import json.decoder
+import re
+
+START_MAP = "start_map"
+MAP_KEY = "map_key"
+END_MAP = "end_map"
+START_ARRAY = "start_array"
+END_ARRAY = "end_array"
+VALUE = "value"
+
+_TOKEN = re.compile(r"""
+    [ \t\n\r]*
+    (?:,[ \t\n\r]*)?
+    (?:
+        "([^"\\\x00-\x1f]*(?:\\.[^"\\\x00-\x1f]*)*)"(?:[ \t\n\r]*(:))?
+        | (-?(?:0|[1-9][0-9]*)
+           (?:\.[0-9]+(?:[eE][-+]?[0-9]+)?|[eE][-+]?[0-9]+))
+        | (-?(?:0|[1-9][0-9]*))
+        | (\{) | (\}) | (\[) | (\])
+        | (true|false|null)
+        | ([^ \t\n\r]|\Z)
+    )
+    """, re.VERBOSE)
+# the group matched by each kind of token, which is its lastindex
+(_STRING, _KEY, _FLOAT, _INTEGER, _START_MAP, _END_MAP, _START_ARRAY,
+ _END_ARRAY, _LITERAL, _INVALID) = range(1, 11)
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_LITERALS = {"true": True, "false": False, "null": None}
+
+# this is the C implementation if available
+_scanstring = json.decoder.scanstring
+
+
+def iter_events(document):
+    """
+    Generates (event, value) pairs for a single JSON document given as
+    str or UTF-8 bytes. Value is None except for MAP_KEY and VALUE events.
+    """
+    if not isinstance(document, str):
+        document = bytes(document).decode("utf-8")
+
+    # each token is one match, taking any comma before it, and a key takes
+    # the colon after it, so nothing has to be tracked to tell keys apart
+    # from values
+
+    # true for each map currently open, false for each array
+    containers = []
+    for token in _TOKEN.finditer(document):
+        kind = token.lastindex
+        if kind == _START_MAP:
+            containers.append(True)
+            yield START_MAP, None
+            continue
+        elif kind == _START_ARRAY:
+            containers.append(False)
+            yield START_ARRAY, None
+            continue
+        elif kind <= _KEY:
+            value = token.group(_STRING)
+            if "\\" in value:
+                value = _scanstring(document, token.start(_STRING))[0]
+            if kind == _KEY:
+                yield MAP_KEY, value
+                continue
+            yield VALUE, value
+        elif kind == _FLOAT:
+            yield VALUE, float(token.group(kind))
+        elif kind == _INTEGER:
+            yield VALUE, int(token.group(kind))
+        elif kind == _LITERAL:
+            yield VALUE, _LITERALS[token.group(kind)]
+        elif kind == _END_MAP:
+            if not containers or not containers.pop():
+                raise ValueError("Unexpected }} at {}".format(token.end()))
+            yield END_MAP, None
+        elif kind == _END_ARRAY:
+            if not containers or containers.pop():
+                raise ValueError("Unexpected ] at {}".format(token.end()))
+            yield END_ARRAY, None
+        else:
+            raise ValueError(
+                "Invalid JSON at position {}".format(token.start(kind)))
+
+        if not containers:
+            # the document is complete, so only whitespace may follow
+            end = _WHITESPACE.match(document, token.end()).end()
+            if end != len(document):
+                raise ValueError("Extra data at position {}".format(end))
+            return
@@ -0,0 +1,54 @@
+"""
+Merging many partial schemas as a balanced tree.
+
+Folding partial schemas one after another is a chain of as many merges as
+there are partials, each of them on the biggest schema so far. Merging
+them fan_in at a time, level by level, takes log(partials) levels instead
+and every merge in a level can run at the same time.
+"""
+import functools
+
+from .schema import ENUM_LIMIT, Schema
+
+# how many schemas are merged together at each step by default
+FAN_IN = 2
+
+
+def merge_group(schemas, enum_limit=ENUM_LIMIT, enum_coverage=1.0):
+    """
+    Merge a small group of schemas one after another. Enum_limit and
+    enum_coverage are the settings they were built with.
+    """
+    merge = functools.partial(Schema.merge, enum_limit=enum_limit,
+                              enum_coverage=enum_coverage)
+    return functools.reduce(merge, schemas, Schema(None))
+
+
+def merge_schemas(schemas, fan_in=FAN_IN, executor=None,
+                  enum_limit=ENUM_LIMIT, enum_coverage=1.0):
+    """
+    Merge schemas as a balanced tree of groups of fan_in.
+
+    If executor is given, e.g. a concurrent.futures executor, the groups at
+    each level of the tree are merged by it concurrently. Enum_limit and
+    enum_coverage are the settings the schemas were built with.
+    """
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+    merge = functools.partial(merge_group, enum_limit=enum_limit,
+                              enum_coverage=enum_coverage)
+    schemas = list(schemas)
+    if not schemas:
+        return Schema(None)
+    while len(schemas) > 1:
+        groups = [schemas[i:i + fan_in]
+                  for i in range(0, len(schemas), fan_in)]
+        # a group of one at the end has nothing to merge with yet
+        last = groups.pop() if len(groups[-1]) == 1 else None
+        if executor is None:
+            schemas = [merge(x) for x in groups]
+        else:
+            schemas = list(executor.map(merge, groups))
+        if last is not None:
+            schemas.extend(last)
+    return schemas[0]
@@ -0,0 +1,61 @@
+"""
+Writing JSON out, such as the generated schema, as indented text.
+
+The json modules encode objects and arrays by recursion, so fail on
+schemas of documents nested around a thousand deep. This writes the
+same text as json.dumps(value, indent=2, sort_keys=True) from a stack
+instead, so there is no limit on the depth.
+"""
+import json
+
+INDENT = "  "
+# marker for the end of an iterator
+_END = object()
+
+
+def iter_json(value):
+    """
+    Generates the text of value as JSON, in pieces.
+    """
+    # open objects and arrays, as [remaining items, is an object, count]
+    stack = []
+    while True:
+        if isinstance(value, dict) and value:
+            yield "{"
+            stack.append([iter(sorted(value.items())), True, 0])
+        elif isinstance(value, (list, tuple)) and value:
+            yield "["
+            stack.append([iter(value), False, 0])
+        elif isinstance(value, dict):
+            yield "{}"
+        elif isinstance(value, (list, tuple)):
+            yield "[]"
+        else:
+            yield json.dumps(value)
+
+        # find the next value to write, closing anything finished
+        while stack:
+            frame = stack[-1]
+            item = next(frame[0], _END)
+            if item is _END:
+                stack.pop()
+                yield "\n" + INDENT * len(stack) + ("}" if frame[1] else "]")
+                continue
+            yield ("," if frame[2] else "") + "\n" + INDENT * len(stack)
+            frame[2] += 1
+            if frame[1]:
+                key, value = item
+                yield json.dumps(key) + ": "
+            else:
+                value = item
+            break
+        else:
+            return
+
+
+def write_json(value, outfile):
+    """
+    Write value to outfile as JSON, as json.dump(value, outfile,
+    indent=2, sort_keys=True) would.
+    """
+    outfile.writelines(iter_json(value))
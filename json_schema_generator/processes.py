@@ -0,0 +1,133 @@
+"""
+Building a schema with a pool of local processes, without Dask.
+
+Input files are split into byte ranges aligned to lines, each worker
+builds a partial schema of one range at a time, and the partial schemas
+are merged as a balanced tree by the same pool of workers.
+"""
+import concurrent.futures
+import functools
+import math
+import os
+
+from .accumulator import SchemaAccumulator
+from .dedup import RecentLines
+from .merging import FAN_IN, merge_schemas
+from .profiling import Profile, record_schema
+from .readers import RANGE_SIZE, is_compressed, read_range, split_ranges
+from .schema import ENUM_LIMIT
+
+# smallest range worth sending to another process
+MIN_RANGE_SIZE = 1 << 20
+# ranges per worker, so that uneven ranges still balance out
+RANGES_PER_WORKER = 4
+
+
+def _range_to_schema(file_range, decoder, enum_limit, enum_coverage,
+                     sampling=None, profile=False, dedup=None,
+                     max_depth=None, count_distinct=False):
+    # if profile, returns the schema and a Profile of this range
+    # if dedup, skips lines the same as a recent line in this range
+    accumulator = SchemaAccumulator(enum_limit, enum_coverage,
+                                    max_depth=max_depth,
+                                    count_distinct=count_distinct)
+    lines = read_range(file_range)
+    if dedup is not None:
+        recent = RecentLines(dedup)
+        lines = recent.unique(lines)
+    if sampling is not None:
+        lines = sampling.records(lines, accumulator, file_range)
+    if not profile:
+        return accumulator.update_lines(lines, decoder).freeze()
+
+    profile = Profile()
+    accumulator.update_lines(lines, decoder, profile)
+    if dedup is not None:
+        profile.count("duplicate_lines", recent.duplicates)
+    with profile.stage("freeze"):
+        schema = accumulator.freeze()
+    record_schema(profile, schema)
+    return schema, profile
+
+
+def _count_ranges(ranges, schemas, progress):
+    # generates schemas, counting each with its range as it finishes
+    for (filename, start, end), schema in zip(ranges, schemas):
+        if end is None:
+            end = os.path.getsize(filename)
+        progress.add(schema.count, end - start,
+                     len(schema.root) if schema.root is not None else None)
+        yield schema
+
+
+def _collect_profiles(results, profile):
+    # generates the schemas of _range_to_schema, adding up their profiles
+    for schema, range_profile in profile.timed("workers", results):
+        profile.update(range_profile)
+        yield schema
+
+
+def default_range_size(filenames, workers):
+    """
+    Range size that gives each worker a few ranges of the plain files.
+    """
+    total = sum(os.path.getsize(x) for x in filenames
+                if not is_compressed(x))
+    size = math.ceil(total / (workers * RANGES_PER_WORKER))
+    return min(RANGE_SIZE, max(MIN_RANGE_SIZE, size))
+
+
+def process_files_to_schema(filenames, workers=None, decoder="auto",
+                            enum_limit=ENUM_LIMIT, enum_coverage=1.0,
+                            range_size=None, fan_in=FAN_IN,
+                            infer_references=True, sampling=None,
+                            profile=None, progress=None, dedup=None,
+                            max_depth=None, count_distinct=False):
+    """
+    Build a schema of JSON lines files with a pool of worker processes,
+    by default one per CPU. If sampling is given, each range is a block.
+
+    If profile is given, the stages of each range are timed and added to
+    it, as is merging, though only in this process. If progress is given,
+    each range is counted in it as it finishes. If dedup is given, lines
+    the same as one of about that many recent lines in the same range are
+    skipped. If max_depth is given, anything nested that deep is
+    summarised. If count_distinct, distinct values are estimated.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if range_size is None:
+        range_size = default_range_size(filenames, workers)
+    ranges = split_ranges(filenames, range_size)
+    if sampling is not None:
+        ranges = sampling.choose(ranges)
+
+    range_to_schema = functools.partial(
+        _range_to_schema, decoder=decoder, enum_limit=enum_limit,
+        enum_coverage=enum_coverage, sampling=sampling,
+        profile=profile is not None, dedup=dedup, max_depth=max_depth,
+        count_distinct=count_distinct)
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        schemas = executor.map(range_to_schema, ranges)
+        if profile is None:
+            if progress is not None:
+                schemas = _count_ranges(ranges, schemas, progress)
+            schema = merge_schemas(schemas, fan_in, executor, enum_limit,
+                                   enum_coverage)
+        else:
+            schemas = _collect_profiles(schemas, profile)
+            if progress is not None:
+                schemas = _count_ranges(ranges, schemas, progress)
+            with profile.stage("merge"):
+                schema = merge_schemas(schemas, fan_in, executor,
+                                       enum_limit, enum_coverage)
+            record_schema(profile, schema)
+
+    # post-process the schema to compute definitions
+    if infer_references:
+        if profile is None:
+            schema.infer_references()
+        else:
+            with profile.stage("infer_references"):
+                schema.infer_references()
+    return schema
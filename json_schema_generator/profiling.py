@@ -0,0 +1,118 @@
+"""
+Optional timing of each stage of building a schema.
+
+A Profile is passed to the functions that build schemas, or None to not
+profile at all, so there is no cost unless it is asked for. Time is
+charged to whichever stage is innermost, so that the time spent reading
+lines while decoding them is counted as reading and not as decoding.
+
+Profiles from different workers can be combined with update().
+"""
+import contextlib
+import time
+
+
+class Profile(object):
+    """
+    Wall and CPU time per stage, counters such as records and bytes, and
+    maxima such as the most nodes in a schema.
+    """
+
+    def __init__(self):
+        # name to [wall seconds, cpu seconds]
+        self.stages = {}
+        self.counters = {}
+        self.maxima = {}
+        self._stack = []
+        self._wall = None
+        self._cpu = None
+
+    def __getstate__(self):
+        # only finished profiles are sent between processes
+        return (self.stages, self.counters, self.maxima)
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.stages, self.counters, self.maxima = state
+
+    def _charge(self):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if self._stack:
+            totals = self.stages.setdefault(self._stack[-1], [0.0, 0.0])
+            totals[0] += wall - self._wall
+            totals[1] += cpu - self._cpu
+        self._wall = wall
+        self._cpu = cpu
+
+    def enter(self, name):
+        self._charge()
+        self._stack.append(name)
+
+    def exit(self):
+        self._charge()
+        self._stack.pop()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        self.enter(name)
+        try:
+            yield self
+        finally:
+            self.exit()
+
+    def timed(self, name, items, size_counter=None):
+        """
+        Generates items, charging the time taken to get each one to the
+        stage name. If size_counter is given, the lengths of the items
+        are added to that counter.
+        """
+        items = iter(items)
+        while True:
+            self.enter(name)
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                self.exit()
+            if size_counter is not None:
+                self.count(size_counter, len(item))
+            yield item
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def maximum(self, name, value):
+        if value > self.maxima.get(name, value - 1):
+            self.maxima[name] = value
+
+    def update(self, other):
+        """
+        Add the times and counts of other, such as from another worker.
+        """
+        for name, (wall, cpu) in other.stages.items():
+            totals = self.stages.setdefault(name, [0.0, 0.0])
+            totals[0] += wall
+            totals[1] += cpu
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+        for name, value in other.maxima.items():
+            self.maximum(name, value)
+        return self
+
+    def to_json(self):
+        return {
+            "stages": {name: {"wall_seconds": wall, "cpu_seconds": cpu}
+                       for name, (wall, cpu) in self.stages.items()},
+            "counters": dict(self.counters),
+            "maxima": dict(self.maxima),
+        }
+
+
+def record_schema(profile, schema):
+    """
+    Note the size of schema in profile, if there is one.
+    """
+    if profile is not None and schema.root is not None:
+        profile.maximum("peak_nodes", len(schema.root))
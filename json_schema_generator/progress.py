@@ -0,0 +1,219 @@
+"""
+Reporting progress through long runs.
+
+A Progress adds up the records and bytes read so far, and every interval
+seconds writes them to stderr with the current rate and the number of
+nodes in the schema, and optionally to a file in the Prometheus text
+format for a node exporter to pick up.
+
+Dask workers can't share a Progress, so they send what they have read as
+events to a topic that the client passes on to its Progress.
+"""
+import os
+import sys
+import time
+
+# seconds between reports
+REPORT_INTERVAL = 10.0
+# records to read between updates of the counts
+UPDATE_EVERY = 1000
+
+_METRICS = (
+    ("records", "counter", "Records read so far."),
+    ("bytes_read", "counter", "Bytes of input read so far."),
+    ("input_bytes", "gauge", "Total bytes of input, if known."),
+    ("records_per_second", "gauge", "Records read per second recently."),
+    ("schema_nodes", "gauge", "Most nodes in a schema so far."),
+)
+
+
+def _format_size(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "TiB"
+    return "{:.1f} {}".format(size, unit)
+
+
+def input_size(filenames):
+    """
+    Total bytes of filenames, or None if any are compressed or stdin, as
+    then the bytes read won't add up to it.
+    """
+    # import this here, as readers doesn't need this module
+    from .readers import is_compressed
+    if any(x == "-" or is_compressed(x) for x in filenames):
+        return None
+    return sum(os.path.getsize(x) for x in filenames)
+
+
+class Progress(object):
+    """
+    Counts of what has been read, reported every interval seconds.
+
+    Stream is where reports are written, None for nowhere. If metrics is
+    a filename, it is replaced with the counts at every report.
+    """
+
+    def __init__(self, total_bytes=None, interval=REPORT_INTERVAL,
+                 stream=sys.stderr, metrics=None, clock=time.monotonic):
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.stream = stream
+        self.metrics = metrics
+        self.clock = clock
+        self.records = 0
+        self.bytes_read = 0
+        self.nodes = 0
+        self.rate = 0.0
+        self._start = clock()
+        self._last_time = self._start
+        self._last_records = 0
+
+    def due(self):
+        return self.clock() - self._last_time >= self.interval
+
+    def add(self, records, bytes_read=0, nodes=None):
+        self.records += records
+        self.bytes_read += bytes_read
+        if nodes is not None and nodes > self.nodes:
+            self.nodes = nodes
+        if self.due():
+            self.report()
+
+    def lines(self, lines, accumulator=None, every=UPDATE_EVERY):
+        """
+        Generates lines of bytes, counting them. If accumulator is given,
+        its nodes are counted whenever a report is due.
+        """
+        records = 0
+        size = 0
+        for line in lines:
+            records += 1
+            # including the newline that was stripped off
+            size += len(line) + 1
+            if records == every:
+                nodes = None
+                if accumulator is not None and self.due():
+                    nodes = accumulator.node_count()
+                self.add(records, size, nodes)
+                records = 0
+                size = 0
+            yield line
+        self.add(records, size)
+
+    def report(self, since=None):
+        """
+        Write out the counts, and the rate since the last report, or since
+        the clock time since.
+        """
+        now = self.clock()
+        if since is None:
+            since = self._last_time
+            records = self.records - self._last_records
+        else:
+            records = self.records
+        if now > since:
+            self.rate = records / (now - since)
+        self._last_time = now
+        self._last_records = self.records
+
+        if self.stream is not None:
+            read = _format_size(self.bytes_read)
+            if self.total_bytes:
+                read = "{} of {} ({:.0%})".format(
+                    read, _format_size(self.total_bytes),
+                    self.bytes_read / self.total_bytes)
+            print("Read {} records, {}, {:.0f} records/s, {} nodes".format(
+                      self.records, read, self.rate, self.nodes),
+                  file=self.stream)
+            self.stream.flush()
+        if self.metrics is not None:
+            self.write_metrics(self.metrics)
+
+    def finish(self, schema=None):
+        """
+        Report the final counts, including the nodes of schema if given,
+        and the rate over the whole run.
+        """
+        if schema is not None and schema.root is not None:
+            self.nodes = max(self.nodes, len(schema.root))
+        self.report(self._start)
+
+    def write_metrics(self, filename):
+        """
+        Replace filename with the counts in the Prometheus text format.
+        """
+        values = {
+            "records": self.records,
+            "bytes_read": self.bytes_read,
+            "input_bytes": self.total_bytes,
+            "records_per_second": self.rate,
+            "schema_nodes": self.nodes,
+        }
+        lines = []
+        for name, kind, description in _METRICS:
+            if values[name] is None:
+                continue
+            value = values[name]
+            name = "json_schema_generator_" + name
+            if kind == "counter":
+                name += "_total"
+            lines.append("# HELP {} {}".format(name, description))
+            lines.append("# TYPE {} {}".format(name, kind))
+            lines.append("{} {}".format(name, value))
+        # write and rename, so it is never read half written
+        temp = filename + ".tmp"
+        with open(temp, "w") as outfile:
+            outfile.write("\n".join(lines) + "\n")
+        os.replace(temp, filename)
+
+    def receive(self, event):
+        """
+        Add an event sent by log_progress, for Client.subscribe_topic.
+        """
+        timestamp, (records, bytes_read, nodes) = event
+        self.add(records, bytes_read, nodes)
+
+
+def _line_size(line):
+    # bytes of a line of input, including its newline if it was stripped
+    if isinstance(line, str):
+        line = line.encode("utf-8", "surrogatepass")
+    if line.endswith(b"\n"):
+        return len(line)
+    return len(line) + 1
+
+
+def log_progress(items, topic, every=UPDATE_EVERY):
+    """
+    Generates items, sending how many there have been, and their length
+    if they are lines, as events to topic from the Dask worker this is
+    run by, for a Progress to receive.
+    """
+    # import this here, so if not used we don't need the requirements
+    from distributed import get_worker
+    worker = get_worker()
+    records = 0
+    size = 0
+    for item in items:
+        records += 1
+        if isinstance(item, (bytes, str)):
+            size += _line_size(item)
+        if records == every:
+            worker.log_event(topic, (records, size, None))
+            records = 0
+            size = 0
+        yield item
+    worker.log_event(topic, (records, size, None))
+
+
+def log_schema(topic, schema):
+    """
+    Send the number of nodes in schema to topic from a Dask worker.
+    """
+    from distributed import get_worker
+    if schema.root is not None:
+        get_worker().log_event(topic, (0, 0, len(schema.root)))
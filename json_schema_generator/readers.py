@@ -0,0 +1,181 @@
+"""
+Reading lines of JSON from files as bytes, in large blocks.
+
+Plain files are memory-mapped and split a block at a time, so the work
+per line is done by bytes.split rather than by the interpreter. Files
+ending .gz, .bz2 or .zst are decompressed a block at a time; .zst needs
+the optional zstandard package. A filename of - reads standard input.
+
+Plain files can also be split into byte ranges aligned to the start of
+lines, so that separate processes can each read part of a file.
+"""
+import bz2
+import gzip
+import mmap
+import os
+import sys
+
+# bytes read or decompressed at a time
+BLOCK_SIZE = 1 << 22
+# largest byte range of a file to give to one process
+RANGE_SIZE = 1 << 27
+
+
+def _open_zstd(filename):
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard is required to read {}".format(filename))
+    infile = open(filename, "rb")
+    return zstandard.ZstdDecompressor().stream_reader(infile, closefd=True)
+
+
+# how to open a compressed file for reading, by extension
+OPENERS = {
+    ".gz": lambda x: gzip.open(x, "rb"),
+    ".bz2": lambda x: bz2.open(x, "rb"),
+    ".zst": _open_zstd,
+}
+
+
+def _read_blocks(infile, block_size):
+    while True:
+        block = infile.read(block_size)
+        if not block:
+            return
+        yield block
+
+
+def _mapped_blocks(infile, block_size, start=0, end=None):
+    try:
+        mapped = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        # empty files, pipes and the like can't be mapped
+        infile.seek(start)
+        if end is None:
+            yield from _read_blocks(infile, block_size)
+        else:
+            while start < end:
+                block = infile.read(min(block_size, end - start))
+                if not block:
+                    return
+                start += len(block)
+                yield block
+        return
+    with mapped:
+        if end is None or end > len(mapped):
+            end = len(mapped)
+        for offset in range(start, end, block_size):
+            yield mapped[offset:min(offset + block_size, end)]
+
+
+def _split_blocks(blocks):
+    # the last piece of each block is the start of a line in the next one
+    rest = b""
+    for block in blocks:
+        lines = block.split(b"\n")
+        lines[0] = rest + lines[0]
+        rest = lines.pop()
+        # skip blank lines, including the b"\r" left of a CRLF one; strip
+        # returns the line itself when there is nothing to strip
+        yield from filter(bytes.strip, lines)
+    if rest.strip():
+        yield rest
+
+
+def is_compressed(filename):
+    return os.path.splitext(filename)[1] in OPENERS
+
+
+def iter_blocks(filename, block_size=BLOCK_SIZE, start=0, end=None):
+    """
+    Generates the uncompressed content of filename as blocks of bytes.
+
+    Start and end select a byte range of a plain file, end is exclusive
+    and None for the end of the file.
+    """
+    if filename == "-" or is_compressed(filename):
+        if start != 0 or end is not None:
+            raise ValueError("Can only read all of {}".format(filename))
+        if filename == "-":
+            yield from _read_blocks(sys.stdin.buffer, block_size)
+            return
+        opener = OPENERS[os.path.splitext(filename)[1]]
+        with opener(filename) as infile:
+            yield from _read_blocks(infile, block_size)
+    else:
+        with open(filename, "rb") as infile:
+            yield from _mapped_blocks(infile, block_size, start, end)
+
+
+def read_lines(filenames, block_size=BLOCK_SIZE):
+    """
+    Generates every non-blank line of every file as bytes, without the
+    trailing newline.
+    """
+    for filename in filenames:
+        yield from _split_blocks(iter_blocks(filename, block_size))
+
+
+def read_range(file_range, block_size=BLOCK_SIZE):
+    """
+    Generates the non-blank lines of a (filename, start, end) byte range
+    from split_ranges.
+    """
+    filename, start, end = file_range
+    return _split_blocks(iter_blocks(filename, block_size, start, end))
+
+
+def _line_start(filename, offset):
+    # the offset of the first line starting at or after offset
+    with open(filename, "rb") as infile:
+        infile.seek(offset - 1)
+        while True:
+            block = infile.read(BLOCK_SIZE)
+            if not block:
+                return None
+            found = block.find(b"\n")
+            if found >= 0:
+                return offset + found
+            offset += len(block)
+
+
+def split_ranges(filenames, range_size=RANGE_SIZE):
+    """
+    Returns a list of (filename, start, end) byte ranges that together
+    cover every line of the files, each range starting at the start of a
+    line. Compressed files can't be split so are always a single range.
+    """
+    ranges = []
+    for filename in filenames:
+        if filename == "-":
+            raise ValueError("Standard input can't be split into ranges")
+        if is_compressed(filename):
+            ranges.append((filename, 0, None))
+            continue
+        size = os.path.getsize(filename)
+        start = 0
+        while start < size:
+            end = start + range_size
+            if end < size:
+                end = _line_start(filename, end)
+            if end is None or end >= size:
+                ranges.append((filename, start, None))
+                break
+            ranges.append((filename, start, end))
+            start = end
+    return ranges
+
+
+def parse_size(text):
+    """
+    Number of bytes from a size such as 64MiB, 100MB or 1024.
+    """
+    units = {"": 1, "b": 1, "kb": 10 ** 3, "mb": 10 ** 6, "gb": 10 ** 9,
+             "kib": 1 << 10, "mib": 1 << 20, "gib": 1 << 30}
+    text = text.strip().lower()
+    number = text.rstrip("kmgib")
+    unit = text[len(number):]
+    if unit not in units:
+        raise ValueError("Unrecognized size {}".format(text))
+    return int(float(number) * units[unit])
@@ -0,0 +1,75 @@
+"""
+Grouping of schema nodes that could share a single reference.
+
+Rather than compare every pair of nodes, nodes are bucketed by a
+fingerprint of their structure that ignores their own name, and only
+nodes within a bucket are compared. Matches are combined with a
+union-find, so the whole grouping is roughly linear in the number of
+nodes.
+"""
+
+
+class UnionFind(object):
+    """
+    Disjoint sets of hashable items, with path halving and union by size.
+    """
+
+    def __init__(self, items=()):
+        self.parents = {}
+        self.sizes = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if item not in self.parents:
+            self.parents[item] = item
+            self.sizes[item] = 1
+
+    def find(self, item):
+        parents = self.parents
+        while parents[item] is not item:
+            parents[item] = parents[parents[item]]
+            item = parents[item]
+        return item
+
+    def union(self, item_a, item_b):
+        root_a = self.find(item_a)
+        root_b = self.find(item_b)
+        if root_a is root_b:
+            return root_a
+        if self.sizes[root_a] < self.sizes[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parents[root_b] = root_a
+        self.sizes[root_a] += self.sizes[root_b]
+        return root_a
+
+    def groups(self):
+        groups = {}
+        for item in self.parents:
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+
+def group_by_shape(nodes):
+    """
+    Groups distinct nodes that are the same except for their own name.
+
+    Nodes whose shape_key() is None (leaves and references) are never
+    grouped with anything. Returns a UnionFind of all the nodes.
+    """
+    groups = UnionFind()
+    buckets = {}
+    for node in nodes:
+        groups.add(node)
+        key = node.shape_key()
+        if key is None:
+            continue
+        # almost always a single entry, unless fingerprints collide
+        bucket = buckets.setdefault(key, [])
+        for example in bucket:
+            if node.same_shape(example):
+                groups.union(node, example)
+                break
+        else:
+            bucket.append(node)
+    return groups
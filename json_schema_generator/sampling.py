@@ -0,0 +1,115 @@
+"""
+Building a schema from a sample of the input rather than all of it.
+
+There are three ways to sample, which can be combined:
+
+- a uniform reservoir sample of a fixed number of records
+- only reading some randomly chosen blocks of the input
+- stopping once the shape of the schema has stopped changing
+
+Statistics such as counts and ranges are then only of what was sampled.
+"""
+import itertools
+import math
+import random
+
+# marker for the end of an iterator
+_END = object()
+
+
+def reservoir_sample(items, size, rng=None):
+    """
+    Returns a uniform random sample of size of the items, or all of them
+    if there are fewer. Every item is read, but most are skipped over.
+    """
+    if rng is None:
+        rng = random.Random()
+    items = iter(items)
+    reservoir = list(itertools.islice(items, size))
+    if len(reservoir) < size or size == 0:
+        return reservoir
+    # Li's algorithm L, which picks how many items to skip at a time
+    # 1 - random() is used as random() can be zero
+    weight = math.exp(math.log(1.0 - rng.random()) / size)
+    while True:
+        if weight < 1.0:
+            skip = math.floor(math.log(1.0 - rng.random())
+                              / math.log(1.0 - weight))
+        else:
+            skip = 0
+        item = next(itertools.islice(items, skip, None), _END)
+        if item is _END:
+            return reservoir
+        reservoir[rng.randrange(size)] = item
+        weight *= math.exp(math.log(1.0 - rng.random()) / size)
+
+
+def until_converged(items, accumulator, patience):
+    """
+    Generates items until patience of them in a row have been added to
+    accumulator without changing the shape of its schema.
+
+    The accumulator must add each item before the next is generated.
+    """
+    version = accumulator.version
+    unchanged = 0
+    for item in items:
+        yield item
+        if accumulator.version != version:
+            version = accumulator.version
+            unchanged = 0
+        else:
+            unchanged += 1
+            if unchanged >= patience:
+                return
+
+
+class Sampling(object):
+    """
+    How to sample the input.
+
+    Size is how many records to keep as a reservoir sample, blocks is how
+    many blocks of the input to read, and patience is how many records in
+    a row must leave the schema unchanged to stop. Any of them can be None
+    to not sample that way. When blocks are processed in parallel, size
+    and patience apply to each block separately.
+    """
+
+    def __init__(self, size=None, blocks=None, patience=None, seed=None):
+        self.size = size
+        self.blocks = blocks
+        self.patience = patience
+        self.seed = seed
+
+    def __repr__(self):
+        return 'Sampling({}, {}, {}, {})'.format(
+            self.size, self.blocks, self.patience, self.seed)
+
+    def records(self, items, accumulator, block=0):
+        """
+        The items that accumulator should add, of the block'th block.
+        """
+        if self.size is not None:
+            rng = random.Random(self._seed(block))
+            items = reservoir_sample(items, self.size, rng)
+        if self.patience is not None:
+            items = until_converged(items, accumulator, self.patience)
+        return items
+
+    def choose(self, blocks):
+        """
+        The blocks to read, from a list of every block, in their original
+        order.
+        """
+        blocks = list(blocks)
+        if self.blocks is None or self.blocks >= len(blocks):
+            return blocks
+        rng = random.Random(self.seed)
+        chosen = sorted(rng.sample(range(len(blocks)), self.blocks))
+        return [blocks[i] for i in chosen]
+
+    def _seed(self, block):
+        # each block gets a different, but repeatable, sample
+        if self.seed is None:
+            return None
+        return "{}:{}".format(self.seed, block)
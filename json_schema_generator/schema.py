@@ -1,17 +1,135 @@
-import collections
+import collections.abc
 import numbers
-import copy
-import itertools
 import functools
 
+from .references import group_by_shape
+from .stats import FrequencySketch, LeafStats
+
 ENUM_LIMIT = 5
+# arrays no longer than this also keep a schema for each position
+TUPLE_LIMIT = 8
+# arrays nested this deep don't, as every item is folded into both its
+# position and the items, which would double the work at every level
+TUPLE_DEPTH = 8
+
+
+def fold_tree(root, children, combine):
+    """
+    Returns the result of combine(item, results) for root, where results
+    are those of each of children(item), a sequence, in the same order.
+
+    Items are kept on a stack rather than walked by recursion, so there is
+    no limit on how deep the tree can be.
+    """
+    results = []
+    # items are paired with how many children they have once those have
+    # been pushed, to be combined when they are popped again
+    stack = [(root, None)]
+    while stack:
+        item, count = stack.pop()
+        if count is None:
+            below = children(item)
+            stack.append((item, len(below)))
+            stack.extend((x, None) for x in reversed(below))
+        elif count:
+            below = results[-count:]
+            del results[-count:]
+            results.append(combine(item, below))
+        else:
+            results.append(combine(item, ()))
+    return results[0]
+
+
+def _merge_nodes(node_a, node_b, enum_limit=ENUM_LIMIT, enum_coverage=1.0):
+    if node_a is None:
+        return node_b
+    return node_a.merge(node_b, enum_limit, enum_coverage)
+
+
+def _min_none(value_a, value_b):
+    if value_a is None:
+        return value_b
+    elif value_b is None:
+        return value_a
+    return min(value_a, value_b)
+
+
+def _max_none(value_a, value_b):
+    if value_a is None:
+        return value_b
+    elif value_b is None:
+        return value_a
+    return max(value_a, value_b)
+
+
+def _order_key(node):
+    # nodes are sorted by name and kind only, as comparing their children
+    # would walk each subtree again for every comparison
+    return (node.name is not None, node.name or "", node.__class__.__name__,
+            node._shape_hash)
+
+
+def _generic_leaf(name, enum_limit, enum_coverage, *nodes):
+    """
+    An untyped leaf in place of nodes of different kinds, with the
+    statistics of those of them that are leaves combined, so that it is
+    the same whichever order things were merged in.
+
+    If none are leaves, the sketch is a new one of enum_limit and
+    enum_coverage, as SchemaAccumulator makes for the same conflict.
+    """
+    stats = LeafStats()
+    sketch = None
+    for node in nodes:
+        if isinstance(node, SchemaNodeLeaf):
+            stats.update(node.stats)
+            if sketch is None:
+                sketch = node.sketch.copy()
+            else:
+                sketch.update(node.sketch)
+    if sketch is None:
+        sketch = FrequencySketch.overflowed(enum_limit, enum_coverage)
+    else:
+        # can't be an enum of values without a type
+        sketch.counts = None
+    return SchemaNodeLeaf(name, None, None, stats, sketch)
+
+
+def _merge_pairs(pair):
+    node, other = pair
+    assert isinstance(other, SchemaNode)
+    assert node.name == other.name
+    return node._merge_pairs(other)
+
+
+def _merged(settings, pair, merged):
+    node, other = pair
+    return node._merged(other, merged, *settings)
+
+
+def _replace(children, replacements, new_children):
+    # children with those in replacements swapped for references, and the
+    # rest for new_children in turn, and if any have changed
+    new_children = iter(new_children)
+    changed = False
+    replaced = []
+    for child in children:
+        if child in replacements:
+            new_child = SchemaNodeRef(child.name, replacements[child])
+        else:
+            new_child = next(new_children)
+        changed = changed or new_child is not child
+        replaced.append(new_child)
+    return replaced, changed
 
 
 class Schema(object):
     root = None
 
-    def __init__(self, root):
+    def __init__(self, root, count=0):
         self.root = root
+        # number of records this is a schema of
+        self.count = count
         self.definitions = set()
 
     def to_json(self):
@@ -27,18 +145,24 @@ class Schema(object):
         return schema_json
 
     def generate_all_nodes(self):
-        stack = [self.root]
+        stack = [] if self.root is None else [self.root]
         stack.extend(self.definitions)
         while len(stack) > 0:
             next_node = stack.pop()
             yield next_node
             if isinstance(next_node, SchemaNodeDict):
-                for child in next_node.children:
+                for child in next_node.children.values():
                     stack.append(child)
             elif isinstance(next_node, SchemaNodeArray):
                 for child in next_node.children:
                     stack.append(child)
 
+    def _ref_groups(self):
+        """
+        Groups of nodes that are equal except for name.
+        """
+        return group_by_shape(set(self.generate_all_nodes())).groups()
+
     def _ref_node_pairs(self):
         """
         generator of pairs of nodes that are equal
@@ -46,143 +170,162 @@ class Schema(object):
 
         these are suitable for replacement with a common reference
         """
-        # check if there are any nodes that could be reused
-        nodes = sorted(self.generate_all_nodes())
-        for i in range(len(nodes)):
-            node_a = nodes[i]
-            for j in range(i+1, len(nodes)):
-                node_b = nodes[j]
-                # only care about comparing non-leaf nodes
-                # equality includes name but
-                # here we don't care about name, only content
-                if isinstance(node_a, SchemaNodeArray) and \
-                        isinstance(node_b, SchemaNodeArray):
-                    if node_a.children == node_b.children:
-                        yield sorted((node_a, node_b))
-                elif isinstance(node_a, SchemaNodeDict) and \
-                        isinstance(node_b, SchemaNodeDict):
-                    if node_a.required == node_b.required and \
-                            node_a.children == node_b.children:
-                        yield sorted((node_a, node_b))
+        for group in self._ref_groups():
+            group = sorted(group, key=_order_key)
+            for i in range(len(group)):
+                for j in range(i+1, len(group)):
+                    yield [group[i], group[j]]
 
     def _ref_components(self):
         """
         Generate sets of nodes that could be replaced with a single reference.
         """
-        node_sets = set()
-        for node in self.generate_all_nodes():
-            node_sets.add(frozenset((node,)))
-
-        for node_a, node_b in self._ref_node_pairs():
-            node_set_a = None
-            node_set_b = None
-
-            for node_set in node_sets:
-                if node_a in node_set:
-                    node_set_a = node_set
-                if node_b in node_set:
-                    node_set_b = node_set
-
-            assert node_set_a is not None
-            assert node_set_b is not None
-
-            if node_set_a is not node_set_b:
-                node_sets.remove(node_set_a)
-                node_sets.remove(node_set_b)
-                node_sets.add(node_set_a.union(node_set_b))
-
-        return frozenset(node_sets)
+        return frozenset(frozenset(x) for x in self._ref_groups())
 
     def infer_references(self):
-        changed = True
-        while changed:
-            changed = False
-
-            # combine all pairwise matches into bigger groups
-            components = self._ref_components()
-            # filter only to components of more than one node
-            components = [x for x in components if len(x) > 1]
-            if len(components) == 0:
-                continue
-            # pick the biggest group, defined as total number of nodes
-            biggest_component = None
-            biggest_component_len = -1
-            for component in components:
-                component_len = sum((len(x) for x in component))
-                if component_len > biggest_component_len:
-                    biggest_component = component
-            assert biggest_component is not None
-
-            if len(biggest_component) > 1:
-                # take any single node as an example
-                # they should all be the same except for name, so its fine
-                example, *_ = biggest_component
-                # create a new node based on the example with a combined name
+        # replacing nodes with references could make their parents equal
+        # except for name, so repeat until there is nothing left to do
+        while True:
+            # only nodes that are children can be replaced with a reference
+            top_level = set(self.definitions)
+            top_level.add(self.root)
+            groups = [[y for y in x if y not in top_level]
+                      for x in self._ref_groups()]
+            groups = [x for x in groups if len(x) > 1]
+            if len(groups) == 0:
+                break
+
+            # handle groups of smaller nodes first, so that the definitions
+            # of any bigger nodes containing them can use references too
+            groups.sort(key=lambda x: len(x[0]))
+
+            replacements = {}
+            new_definitions = set()
+            used_names = set(x.name for x in self.definitions)
+            for group in groups:
+                # create a new node from the group with a combined name
                 # ideally this sort of internal-only name should be human
                 # choosable, but not sure how to do that
                 # for now, combine existing names
                 definition_name = "_".join(
-                        sorted(set(x.name for x in biggest_component)))
-                example = copy.deepcopy(example)
-                example.name = definition_name
-
-                # add the node to the definition
-                # TODO check no definition with the same name exists already
-                self.definitions.add(example)
-
-                # take each of the nodes in the biggest component
-                # replace them with a reference node
-
-                nodes = tuple(self.generate_all_nodes())
-                for node in nodes:
-                    if isinstance(node, SchemaNodeDict):
-                        new_children = []
-                        for child in tuple(node.children):
-                            if child in biggest_component:
-                                new_children.append(
-                                    SchemaNodeRef(child.name,
-                                                  definition_name))
-                            else:
-                                new_children.append(child)
-                        node.children = tuple(new_children)
-                    elif isinstance(node, SchemaNodeArray):
-                        new_children = []
-                        for child in tuple(node.children):
-                            if child in biggest_component:
-                                new_children.append(
-                                    SchemaNodeRef(child.name,
-                                                  definition_name))
-                            else:
-                                new_children.append(child)
-                        node.children = tuple(new_children)
-
-                changed = True
-
-    def merge(self, other):
+                    sorted(set(x.name for x in group if x.name is not None)))
+                if not definition_name:
+                    definition_name = "items"
+                # don't clash with any existing definitions
+                suffix = 1
+                unique_name = definition_name
+                while unique_name in used_names:
+                    suffix += 1
+                    unique_name = "{}_{}".format(definition_name, suffix)
+                used_names.add(unique_name)
+
+                # members are the same except for name and statistics
+                # so the definition is all of them merged together
+                members = (x.replace_children(replacements)
+                           .renamed(unique_name)
+                           for x in sorted(group, key=_order_key))
+                new_definitions.add(functools.reduce(_merge_nodes, members))
+                for node in group:
+                    replacements[node] = unique_name
+
+            # take each of the nodes in the groups and
+            # replace them with a reference node
+            # nodes are immutable, so this rebuilds their parents
+            self.root = self.root.replace_children(replacements)
+            self.definitions = new_definitions.union(
+                x.replace_children(replacements) for x in self.definitions)
+
+    def merge(self, other, enum_limit=ENUM_LIMIT, enum_coverage=1.0):
+        """
+        This schema and other merged. Enum_limit and enum_coverage are
+        the settings the schemas were built with, for any untyped leaf
+        made where they have different kinds of thing.
+        """
         if other is None:
             return self
-        elif self.root is None and other.root is not None:
-            return other
-        elif self.root is not None and other.root is None:
-            return self
-
-        merged = Schema(self.root.merge(other.root))
+        elif other.root is None:
+            merged = Schema(self.root, self.count + other.count)
+            merged.definitions = self.definitions
+            return merged
+        elif self.root is None:
+            merged = Schema(other.root, self.count + other.count)
+            merged.definitions = other.definitions
+            return merged
+
+        merged = Schema(
+            self.root.merge(other.root, enum_limit, enum_coverage),
+            self.count + other.count)
         merged.definitions = self.definitions.union(other.definitions)
         return merged
 
+    def to_bytes(self):
+        """
+        Compact binary encoding of this schema, see serialization.py.
+        """
+        # imported here as serialization depends on this module
+        from .serialization import dumps
+        return dumps(self)
+
     @classmethod
-    def schema_extractor(clazz, thing):
-        root = SchemaNode.discover_class(thing) \
-                .from_json_instance(thing, None)
+    def from_bytes(clazz, data):
+        from .serialization import loads
+        return loads(data)
+
+    def __reduce__(self):
+        # pickled as encoded bytes, as pickle recurses into each node
+        from .serialization import loads
+        return (loads, (self.to_bytes(),))
+
+    @classmethod
+    def schema_extractor(clazz, thing, interner=None,
+                         enum_limit=ENUM_LIMIT, enum_coverage=1.0,
+                         max_depth=None, count_distinct=False):
+        root = SchemaNode.from_json_instance(thing, None, interner,
+                                             enum_limit, enum_coverage,
+                                             max_depth, count_distinct)
         # TODO calculate coocurance matrix
-        return clazz(root)
+        return clazz(root, 1)
+
+
+class NodeInterner(object):
+    """
+    Table of nodes so that equal nodes can share a single object (hash
+    consing), which saves memory and lets equality stop at identity.
+
+    Nodes are assumed to be built bottom-up, so that their children have
+    already been interned. Once max_size nodes are held no more are added.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self.nodes = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def intern(self, node):
+        existing = self.nodes.get(node)
+        if existing is not None:
+            return existing
+        if self.max_size is None or len(self.nodes) < self.max_size:
+            self.nodes[node] = node
+        return node
 
 
 class SchemaNode(object):
-    name = None
+    """
+    Base of the schema tree nodes.
+
+    Nodes are immutable once constructed, which lets each node compute
+    its hash once from the already-computed hashes of its children.
+    """
+    # there can be very many nodes, so they are kept small
+    __slots__ = ("name", "_shape_hash", "_hash")
 
     def __init__(self, name):
         self.name = name
+        self._shape_hash = hash(())
+        self._hash = hash((self.name,))
 
     def __repr__(self):
         return 'SchemaNode({})'.format(
@@ -193,31 +336,187 @@ class SchemaNode(object):
             self.name)
 
     def __eq__(self, other):
-        if not issubclass(other.__class__, self.__class__):
-            return False
-        if self.name != other.name:
-            return False
+        # pairs of nodes are compared from a stack, rather than by each
+        # comparing its children, so there is no limit on the depth
+        pairs = [(self, other)]
+        while pairs:
+            node, other = pairs.pop()
+            if node is other:
+                continue
+            if not issubclass(other.__class__, node.__class__):
+                return False
+            if node._hash != other._hash or not node._equal_fields(other):
+                return False
+            pairs.extend(node._child_pairs(other))
         return True
 
+    def _equal_fields(self, other):
+        """
+        True if this node is equal to other, of the same class, apart from
+        any children.
+        """
+        return self.name == other.name
+
+    def _child_pairs(self, other):
+        """
+        Pairs of the children of this node and of other that must also be
+        equal, if _equal_fields is true.
+        """
+        return ()
+
     def __lt__(self, other):
         raise NotImplementedError()
 
     def __hash__(self):
-        return hash((self.name,))
+        return self._hash
 
     def __len__(self):
-        return 1
+        count = 0
+        stack = [self]
+        while stack:
+            count += 1
+            stack.extend(stack.pop()._children())
+        return count
+
+    def _children(self):
+        return ()
 
     def to_json(self):
+        return fold_tree(self, lambda node: node._json_children(),
+                         lambda node, children: node._json(children))
+
+    def _json_children(self):
+        """
+        The nodes whose JSON _json needs, in order.
+        """
+        return ()
+
+    def _json(self, children_json):
         raise NotImplementedError()
 
-    def merge(self, other):
+    def merge(self, other, enum_limit=ENUM_LIMIT, enum_coverage=1.0):
+        if other is None:
+            return self
+        return fold_tree((self, other), _merge_pairs,
+                         functools.partial(_merged,
+                                           (enum_limit, enum_coverage)))
+
+    def _merge_pairs(self, other):
+        """
+        Pairs of the children of this node and of other to be merged, for
+        _merged to combine.
+        """
+        return ()
+
+    def _merged(self, other, merged, enum_limit, enum_coverage):
         raise NotImplementedError()
 
-    @classmethod
-    def from_json_instance(clazz, obj, name):
+    def renamed(self, name):
         raise NotImplementedError()
 
+    def replace_children(self, replacements):
+        """
+        Returns this node with any descendants that are keys of replacements
+        swapped for references to the corresponding definition name.
+        Unchanged subtrees are shared, not copied.
+        """
+        return fold_tree(
+            self,
+            lambda node: [x for x in node._children()
+                          if x not in replacements],
+            lambda node, children: node._replaced(replacements, children))
+
+    def _replaced(self, replacements, children):
+        """
+        This node with its children that are in replacements swapped for
+        references, and the rest for children, in order.
+        """
+        return self
+
+    def shape_key(self):
+        """
+        Fingerprint of this node that ignores its own name, or None if
+        this node should never be replaced by a reference.
+        """
+        return None
+
+    def same_shape(self, other):
+        """
+        True if this node is equal to other, except for their own names.
+        """
+        pairs = [(self, other)]
+        while pairs:
+            node, other = pairs.pop()
+            if not node._same_shape_fields(other):
+                return False
+            pairs.extend(node._shape_pairs(other))
+        return True
+
+    def _same_shape_fields(self, other):
+        return False
+
+    def _shape_pairs(self, other):
+        return ()
+
+    @classmethod
+    def from_json_instance(clazz, thing, name=None, interner=None,
+                           enum_limit=ENUM_LIMIT, enum_coverage=1.0,
+                           max_depth=None, count_distinct=False):
+        """
+        A node for the single JSON value thing.
+
+        Objects and arrays nested max_depth deep, counting thing itself as
+        0, are summarised by a leaf of no particular type. If
+        count_distinct, leaves estimate how many distinct values they have.
+        """
+        def item(thing, name, depth):
+            kind = SchemaNode.discover_class(thing)
+            if kind is not SchemaNodeLeaf and depth == max_depth:
+                kind = None
+            return thing, name, depth, kind
+
+        def children(item_):
+            thing, name, depth, kind = item_
+            if kind is SchemaNodeDict:
+                return [item(thing[key], key, depth + 1)
+                        for key in sorted(thing.keys())]
+            elif kind is SchemaNodeArray:
+                return [item(x, None, depth + 1) for x in thing]
+            return ()
+
+        # so that conflicting items make leaves of the same settings
+        merge_nodes = functools.partial(_merge_nodes, enum_limit=enum_limit,
+                                        enum_coverage=enum_coverage)
+
+        def combine(item_, nodes):
+            thing, name, depth, kind = item_
+            if kind is SchemaNodeDict:
+                # assume that everything is required to start with
+                # this will be relaxed when merging
+                node = SchemaNodeDict(name, nodes,
+                                      frozenset(x.name for x in nodes))
+            elif kind is SchemaNodeArray:
+                length = len(nodes)
+                items = functools.reduce(merge_nodes, nodes, None)
+                tuple_ = length <= TUPLE_LIMIT and depth < TUPLE_DEPTH
+                node = SchemaNodeArray(
+                    name, () if items is None else (items,), length, length,
+                    nodes if tuple_ else None)
+            elif kind is SchemaNodeLeaf:
+                sketch = FrequencySketch(enum_limit, enum_coverage, (thing,))
+                node = SchemaNodeLeaf(
+                    name, None, SchemaNodeLeaf.discover_datatype(thing),
+                    LeafStats((thing,), count_distinct), sketch)
+            else:
+                node = SchemaNodeLeaf(
+                    name, None, None, LeafStats((), count_distinct),
+                    FrequencySketch.overflowed(enum_limit, enum_coverage))
+            if interner is not None:
+                node = interner.intern(node)
+            return node
+
+        return fold_tree(item(thing, name, 0), children, combine)
+
     @classmethod
     def discover_class(clazz, thing):
         if isinstance(thing, collections.abc.Mapping):
@@ -233,8 +532,7 @@ class SchemaNode(object):
 
 @functools.total_ordering
 class SchemaNodeDict(SchemaNode):
-    children = frozenset()
-    required = frozenset()
+    __slots__ = ("children", "required")
 
     def __init__(self, name, children, required):
         super().__init__(name)
@@ -242,35 +540,49 @@ class SchemaNodeDict(SchemaNode):
             "children must be iterable"
         assert isinstance(required, collections.abc.Iterable), \
             "required must be iterable"
-        self.children = frozenset(children)
+        # children are keyed by name so they can be looked up directly
+        # this must not be modified after construction
+        if isinstance(children, collections.abc.Mapping):
+            children = children.values()
+        self.children = {x.name: x for x in children}
         self.required = frozenset(required)
-
-    def __eq__(self, other):
-        if self is other:
-            return True
-        if not issubclass(other.__class__, self.__class__):
-            return False
-        if self.name != other.name:
-            return False
-        if self.required != other.required:
-            return False
-        if self.children != other.children:
-            return False
-        return True
+        # the shape ignores this node's name and any statistics
+        self._shape_hash = hash((self.required, frozenset(
+            (x.name, x._shape_hash) for x in self.children.values())))
+        self._hash = hash((self.name, self.required,
+                           frozenset(self.children.values())))
+
+    def __reduce__(self):
+        # rebuild on unpickling, as string hashes vary between processes
+        return (self.__class__,
+                (self.name, tuple(self.children.values()), self.required))
+
+    def _equal_fields(self, other):
+        return self.name == other.name \
+            and self.required == other.required \
+            and self.children.keys() == other.children.keys()
+
+    def _child_pairs(self, other):
+        return [(child, other.children[childname])
+                for childname, child in self.children.items()]
 
     def __lt__(self, other):
         if self.name is None and other.name is not None:
             return True
         elif self.name is not None and other.name is None:
             return False
-        elif self.name < other.name:
-            return True
-        elif self.name > other.name:
-            return False
+        elif self.name != other.name:
+            return self.name < other.name
 
-        if self.children < other.children:
+        # different kinds of node are ordered by kind
+        if self.__class__ is not other.__class__:
+            return self.__class__.__name__ < other.__class__.__name__
+
+        self_children = frozenset(self.children.values())
+        other_children = frozenset(other.children.values())
+        if self_children < other_children:
             return True
-        elif self.children > other.children:
+        elif self_children > other_children:
             return False
 
         if self.required < other.required:
@@ -281,225 +593,318 @@ class SchemaNodeDict(SchemaNode):
         return False
 
     def __hash__(self):
-        return hash((self.name, self.required, self.children))
+        return self._hash
 
-    def __len__(self):
-        return sum((len(x) for x in self.children))+1
+    def _children(self):
+        return tuple(self.children.values())
 
     def __repr__(self):
         return 'SchemaNodeDict({}, {}, {})'.format(
-            self.name, self.children, self.required)
+            self.name, tuple(self.children.values()), self.required)
 
     def __str__(self):
         return 'SchemaNodeDict({}, {}, {})'.format(
-            self.name, self.children, self.required)
+            self.name, tuple(self.children.values()), self.required)
 
-    @classmethod
-    def from_json_instance(clazz, thing, name=None):
-        assert isinstance(thing, collections.abc.Mapping)
-        children = set()
-        for key in sorted(thing.keys()):
-            # determine which node type this object should be
-            # represented as, then delegate to that node type to build
-            # an appropriate node
-            child = clazz.discover_class(thing[key]) \
-                    .from_json_instance(thing[key], key)
-            children.add(child)
-        children = frozenset(children)
-        # assume that everything is required to start with
-        # this will be relaxed when merging
-        required = frozenset((x.name for x in children))
-        return SchemaNodeDict(name, children, required)
+    def _json_children(self):
+        return tuple(self.children.values())
 
-    def to_json(self):
+    def _json(self, children_json):
         json = {}
         json["type"] = "object"
-        json["properties"] = {}
-        for child in self.children:
-            json["properties"][child.name] = child.to_json()
+        json["properties"] = dict(zip(self.children, children_json))
         if len(self.required) > 0:
             json["required"] = sorted(self.required)
         return json
 
-    def merge(self, other):
-        if other is None:
-            return self
-        assert isinstance(other, SchemaNode)
-        assert self.__class__ == other.__class__
-        assert self.name == other.name
-
-        children = set()
-        self_childnames = frozenset([x.name for x in self.children])
-        other_childnames = frozenset([x.name for x in other.children])
-        childnames = sorted(self_childnames | other_childnames)
-
-        for childname in childnames:
-            try:
-                self_child = [x for x in self.children
-                              if x.name == childname][0]
-            except IndexError:
-                self_child = None
-            try:
-                other_child = [x for x in other.children
-                               if x.name == childname][0]
-            except IndexError:
-                other_child = None
-
-            if self_child is None:
-                assert other_child is not None
-                children.add(other_child)
-            elif other_child is None:
-                assert self_child is not None
-                children.add(self_child)
-            else:
-                children.add(self_child.merge(other_child))
+    def _merge_pairs(self, other):
+        if not isinstance(other, SchemaNodeDict):
+            return ()
+        return [(child, other.children[childname])
+                for childname, child in self.children.items()
+                if childname in other.children]
+
+    def _merged(self, other, merged, enum_limit, enum_coverage):
+        if not isinstance(other, SchemaNodeDict):
+            # different kinds of node can't share a type, so be generic
+            return _generic_leaf(self.name, enum_limit, enum_coverage, other)
+
+        # join the children on name, anything only on one side is kept as-is
+        children = dict(self.children)
+        children.update(zip((x for x in self.children if x in other.children),
+                            merged))
+        for childname, other_child in other.children.items():
+            if childname not in children:
+                children[childname] = other_child
 
         # things can be marked as required iff they are required in both
         required = self.required & other.required
 
         return SchemaNodeDict(self.name, children, required)
 
+    def renamed(self, name):
+        return SchemaNodeDict(name, self.children, self.required)
+
+    def shape_key(self):
+        return (SchemaNodeDict, self._shape_hash)
+
+    def _same_shape_fields(self, other):
+        return isinstance(other, SchemaNodeDict) \
+            and self.required == other.required \
+            and self.children.keys() == other.children.keys()
+
+    def _shape_pairs(self, other):
+        return self._child_pairs(other)
+
+    def _replaced(self, replacements, children):
+        children, changed = _replace(self.children.values(), replacements,
+                                     children)
+        if not changed:
+            return self
+        return SchemaNodeDict(self.name, children, self.required)
+
 
 @functools.total_ordering
 class SchemaNodeArray(SchemaNode):
-    def __init__(self, name, children):
+    """
+    An array, summarised by a single schema that all of its items have
+    been folded into, the range of its lengths, and, while it has only
+    been seen with one short length, a schema for each position.
+
+    If min_length and max_length are not given, children are taken to be
+    the items of a single array instance. Otherwise children must be the
+    already folded item schema, if any, and positions the per-position
+    schemas or None.
+    """
+    __slots__ = ("children", "min_length", "max_length", "positions")
+
+    def __init__(self, name, children, min_length=None, max_length=None,
+                 positions=None):
         super().__init__(name)
         assert isinstance(children, collections.abc.Iterable), \
             "children must be iterable"
-        self.children = tuple(children)
-
-    def __eq__(self, other):
-        if self is other:
-            return True
-        if not issubclass(other.__class__, self.__class__):
-            return False
-        if self.name != other.name:
-            return False
-        if self.children != other.children:
-            return False
-        return True
+        children = tuple(children)
+        if min_length is None and max_length is None:
+            min_length = len(children)
+            max_length = len(children)
+            if len(children) <= TUPLE_LIMIT:
+                positions = children
+            item = functools.reduce(_merge_nodes, children, None)
+            children = () if item is None else (item,)
+        assert len(children) <= 1, "children must be folded"
+        self.children = children
+        self.min_length = min_length
+        self.max_length = max_length
+        self.positions = None if positions is None else tuple(positions)
+        # the shape ignores this node's name and any statistics
+        self._shape_hash = hash(tuple(x._shape_hash for x in self.children))
+        self._hash = hash((self.name, self.children,
+                           self.min_length, self.max_length, self.positions))
+
+    def __reduce__(self):
+        # rebuild on unpickling, as string hashes vary between processes
+        return (self.__class__,
+                (self.name, self.children, self.min_length, self.max_length,
+                 self.positions))
+
+    def _equal_fields(self, other):
+        return self.name == other.name \
+            and self.min_length == other.min_length \
+            and self.max_length == other.max_length \
+            and len(self.children) == len(other.children) \
+            and (self._positions_match(other)
+                 or self.positions is other.positions is None)
+
+    def _child_pairs(self, other):
+        pairs = list(zip(self.children, other.children))
+        if self.positions is not None:
+            pairs.extend(zip(self.positions, other.positions))
+        return pairs
+
+    def _positions_match(self, other):
+        # positions only make sense while every array is the same length
+        return self.positions is not None and other.positions is not None \
+            and len(self.positions) == len(other.positions)
 
     def __lt__(self, other):
         if self.name is None and other.name is not None:
             return True
         elif self.name is not None and other.name is None:
             return False
-        elif self.name < other.name:
-            return True
-        elif self.name > other.name:
-            return False
+        elif self.name != other.name:
+            return self.name < other.name
 
-        if self.children < other.children:
-            return True
-        elif self.children > other.children:
-            return False
+        # different kinds of node are ordered by kind
+        if self.__class__ is not other.__class__:
+            return self.__class__.__name__ < other.__class__.__name__
+
+        # only the first differing item needs comparing, and only once
+        if self.children != other.children:
+            return self.children < other.children
+
+        self_lengths = (self.min_length, self.max_length)
+        other_lengths = (other.min_length, other.max_length)
+        if self_lengths != other_lengths:
+            return self_lengths < other_lengths
 
         return False
 
     def __hash__(self):
-        return hash((self.name, self.children))
+        return self._hash
 
-    def __len__(self):
-        return sum((len(x) for x in self.children))+1
+    def _children(self):
+        return self.children
 
     def __repr__(self):
-        return 'SchemaNodeArray({}, {})'.format(
-            self.name, self.children)
+        return 'SchemaNodeArray({}, {}, {}, {}, {})'.format(
+            self.name, self.children, self.min_length, self.max_length,
+            self.positions)
 
     def __str__(self):
-        return 'SchemaNodeArray({}, {})'.format(
-            self.name, self.children)
+        return 'SchemaNodeArray({}, {}, {}, {}, {})'.format(
+            self.name, self.children, self.min_length, self.max_length,
+            self.positions)
 
-    @classmethod
-    def from_json_instance(clazz, thing, name=None):
-        assert isinstance(thing, collections.abc.Iterable)
-        children = []
-        for thing_child in thing:
-            # determine which node type this object should be
-            # represented as, then delegate to that node type to build
-            # an appropriate node
-            child = clazz.discover_class(thing_child) \
-                    .from_json_instance(thing_child, None)
-            children.append(child)
-        children = frozenset(children)
-        return SchemaNodeArray(name, children)
+    def _json_children(self):
+        if self.positions:
+            return self.children + self.positions
+        return self.children
 
-    def to_json(self):
+    def _json(self, children_json):
         json = {}
         json["type"] = "array"
         if len(self.children) > 0:
-            # merge children together
-            # TODO what if position matters?
-            children_merged = self.children[0]
-            for child in self.children[1:]:
-                children_merged = children_merged.merge(child)
-            json["items"] = children_merged.to_json()
-        # TODO minlen maxlen
+            items_json = children_json[0]
+            json["items"] = items_json
+            # if the items together have no type but each position does,
+            # then describe it as a tuple instead
+            if self.positions and "type" not in items_json:
+                positions_json = list(children_json[1:])
+                if all("type" in x for x in positions_json):
+                    json["items"] = positions_json
+                    json["additionalItems"] = False
+        if self.min_length is not None:
+            json["minItems"] = self.min_length
+        if self.max_length is not None:
+            json["maxItems"] = self.max_length
         # TODO uniqueItems
         return json
 
-    def merge(self, other):
-        if other is None:
-            return self
-        assert isinstance(other, SchemaNodeArray)
-        assert self.name == other.name
-
-        children = []
-        for self_child, other_child in itertools.zip_longest(
-                    self.children, other.children):
-            if self_child is None:
-                assert other_child is not None
-                children.append(other_child)
-            elif other_child is None:
-                assert self_child is not None
-                children.append(self_child)
-            else:
-                children.append(self_child.merge(other_child))
+    def _merge_pairs(self, other):
+        if not isinstance(other, SchemaNodeArray):
+            return ()
+        pairs = []
+        if self.children and other.children:
+            pairs.append((self.children[0], other.children[0]))
+        if self._positions_match(other):
+            pairs.extend(zip(self.positions, other.positions))
+        return pairs
+
+    def _merged(self, other, merged, enum_limit, enum_coverage):
+        if not isinstance(other, SchemaNodeArray):
+            # different kinds of node can't share a type, so be generic
+            return _generic_leaf(self.name, enum_limit, enum_coverage, other)
+
+        if self.children and other.children:
+            children = merged[:1]
+            merged = merged[1:]
+        else:
+            children = self.children or other.children
 
-        return SchemaNodeArray(self.name, children)
+        positions = merged if self._positions_match(other) else None
+
+        return SchemaNodeArray(
+            self.name, children,
+            _min_none(self.min_length, other.min_length),
+            _max_none(self.max_length, other.max_length),
+            positions)
+
+    def renamed(self, name):
+        return SchemaNodeArray(name, self.children, self.min_length,
+                               self.max_length, self.positions)
+
+    def shape_key(self):
+        return (SchemaNodeArray, self._shape_hash)
+
+    def _same_shape_fields(self, other):
+        return isinstance(other, SchemaNodeArray) \
+            and len(self.children) == len(other.children)
+
+    def _shape_pairs(self, other):
+        return zip(self.children, other.children)
+
+    def _replaced(self, replacements, children):
+        children, changed = _replace(self.children, replacements, children)
+        if not changed:
+            return self
+        return SchemaNodeArray(self.name, children, self.min_length,
+                               self.max_length, self.positions)
 
 
 @functools.total_ordering
 class SchemaNodeLeaf(SchemaNode):
-    def __init__(self, name, values, datatype):
+    """
+    A single value, described by its datatype, the values themselves if
+    they look like an enum, and fixed-size statistics of every value seen.
+
+    If stats or sketch are not given, they are calculated from values,
+    with the default ENUM_LIMIT. If sketch is given, values are ignored
+    and the enum values, if any, are taken from the sketch instead, which
+    is how leaves with other settings are made.
+    """
+    __slots__ = ("sketch", "values", "datatype", "stats")
+
+    def __init__(self, name, values, datatype, stats=None, sketch=None):
         assert values is None or isinstance(
                 values, collections.abc.Collection), \
                 "values must be collection or None"
         super().__init__(name)
-        if values is None:
-            self.values = None
-        else:
-            self.values = frozenset(values)
+        if sketch is None:
+            if values is None:
+                sketch = FrequencySketch.overflowed(ENUM_LIMIT)
+            else:
+                sketch = FrequencySketch(ENUM_LIMIT, values=values)
+        if stats is None:
+            stats = LeafStats(values or ())
+        self.sketch = sketch
+        self.values = sketch.enum_values()
         # TODO check the datatype is sensible
         self.datatype = datatype
-
-    def __eq__(self, other):
-        if self is other:
-            return True
-        if not issubclass(other.__class__, self.__class__):
-            return False
-        if self.name != other.name:
-            return False
-        if self.datatype != other.datatype:
-            return False
-        if self.values != other.values:
-            return False
-        return True
+        self.stats = stats
+        self._shape_hash = hash((self.datatype, self.values))
+        self._hash = hash((self.name, self._shape_hash, self.stats,
+                           self.sketch))
+
+    def __reduce__(self):
+        # rebuild on unpickling, as string hashes vary between processes
+        return (self.__class__,
+                (self.name, None, self.datatype, self.stats, self.sketch))
+
+    def _equal_fields(self, other):
+        return self.name == other.name \
+            and self.datatype == other.datatype \
+            and self.values == other.values \
+            and self.stats == other.stats \
+            and self.sketch == other.sketch
 
     def __lt__(self, other):
         if self.name is None and other.name is not None:
             return True
         elif self.name is not None and other.name is None:
             return False
-        elif self.name < other.name:
-            return True
-        elif self.name > other.name:
-            return False
+        elif self.name != other.name:
+            return self.name < other.name
+
+        # different kinds of node are ordered by kind
+        if self.__class__ is not other.__class__:
+            return self.__class__.__name__ < other.__class__.__name__
 
-        if self.datatype < other.datatype:
+        if self.datatype is None and other.datatype is not None:
             return True
-        elif self.datatype > other.datatype:
+        elif self.datatype is not None and other.datatype is None:
             return False
+        elif self.datatype != other.datatype:
+            return self.datatype < other.datatype
 
         if self.values is None and other.values is not None:
             return True
@@ -515,41 +920,42 @@ class SchemaNodeLeaf(SchemaNode):
         return False
 
     def __hash__(self):
-        return hash((self.name, self.datatype, self.values))
+        return self._hash
 
     def __len__(self):
         return 1
 
     def __repr__(self):
-        return 'SchemaNodeLeaf({}, {}, {})'.format(
-            self.name, sorted(self.values), self.datatype)
+        return 'SchemaNodeLeaf({}, {}, {}, {})'.format(
+            self.name, self.values, self.datatype, self.stats)
 
     def __str__(self):
-        return 'SchemaNodeLeaf({}, {}, {})'.format(
-            self.name, sorted(self.values), self.datatype)
+        return 'SchemaNodeLeaf({}, {}, {}, {})'.format(
+            self.name, self.values, self.datatype, self.stats)
 
     @classmethod
-    def from_json_instance(clazz, thing, name=None):
+    def discover_datatype(clazz, thing):
         if isinstance(thing, str):
-            return SchemaNodeLeaf(name, [thing], "string")
+            return "string"
         elif isinstance(thing, bool):
-            return SchemaNodeLeaf(name, [thing], "boolean")
+            return "boolean"
         elif isinstance(thing, int):
-            return SchemaNodeLeaf(name, [thing], "integer")
+            return "integer"
         elif isinstance(thing, numbers.Number):
-            return SchemaNodeLeaf(name, [thing], "number")
+            return "number"
         elif thing is None:
-            return SchemaNodeLeaf(name, [thing], "null")
+            return "null"
         else:
             # shouldn't get here so raise an exception in case
             raise ValueError("Unrecognized thing {}".format(thing))
 
-    def to_json(self):
+    def _json(self, children_json):
         json = {}
 
         if self.datatype is not None:
             json["type"] = self.datatype
-            # if there a few unique values, its an enum
+            # if there a few unique values, or a few cover nearly all of
+            # them, its an enum
             # otherwise, its free values and we can't store all
             if self.values is not None:
                 if len(self.values) == 1:
@@ -557,79 +963,80 @@ class SchemaNodeLeaf(SchemaNode):
                 else:
                     json["enum"] = sorted((x for x in self.values))
             elif self.datatype == "string":
-                # TODO min_length
-                # TODO max_length
+                if self.stats.min_length is not None:
+                    json["minLength"] = self.stats.min_length
+                if self.stats.max_length is not None:
+                    json["maxLength"] = self.stats.max_length
                 # TODO format
                 # TODO pattern ?
-                pass
-            elif self.datatype == "integer":
-                # TODO maximum / exclusiveMaximum
-                # TODO minimum / exclusiveMinimum
-                # TODO multipleOf ?
-                pass
-            elif self.datatype == "number":
-                # TODO maximum / exclusiveMaximum
-                # TODO minimum / exclusiveMinimum
+            elif self.datatype in ("integer", "number"):
+                if self.stats.minimum is not None:
+                    json["minimum"] = self.stats.minimum
+                if self.stats.maximum is not None:
+                    json["maximum"] = self.stats.maximum
                 # TODO multipleOf ?
-                pass
+            if self.values is None and self.stats.distinct is not None:
+                # not a standard keyword, so marked as an extension
+                json["x-distinct"] = self.stats.distinct_estimate()
 
             # TODO other data types
         return json
 
-    def merge(self, other):
-        if other is None:
-            return self
-        assert isinstance(other, SchemaNodeLeaf), \
-            "{} must be SchemaNodeLeaf".format(other.name)
-        assert self.name == other.name
+    def _merged(self, other, merged, enum_limit, enum_coverage):
+        if not isinstance(other, SchemaNodeLeaf):
+            # different kinds of node can't share a type, so be generic
+            return _generic_leaf(self.name, enum_limit, enum_coverage, self)
 
         if other.datatype != self.datatype:
             child_datatype = None
         else:
             child_datatype = self.datatype
 
-        # merge values
-        if self.values is None or other.values is None:
-            child_values = None
-        else:
-            child_values = set()
-            for value in self.values:
-                # TODO warn for zero-length keys
-                child_values.add(value)
-            for value in other.values:
-                # TODO warn for zero-length keys
-                child_values.add(value)
+        # merge values, the sketch will decide if its still an enum
+        # TODO warn for zero-length keys
+        child_sketch = self.sketch.copy()
+        child_sketch.update(other.sketch)
 
-            # if we now have too many different values, don't be enum
-            if len(child_values) > ENUM_LIMIT:
-                child_values = None
+        return SchemaNodeLeaf(self.name, None, child_datatype,
+                              self.stats.merge(other.stats), child_sketch)
 
-        return SchemaNodeLeaf(self.name, child_values, child_datatype)
+    def renamed(self, name):
+        return SchemaNodeLeaf(name, None, self.datatype, self.stats,
+                              self.sketch)
+
+    def _same_shape_fields(self, other):
+        return isinstance(other, SchemaNodeLeaf) \
+            and self.datatype == other.datatype \
+            and self.values == other.values
 
 
 class SchemaNodeRef(SchemaNode):
+    __slots__ = ("ref",)
+
     def __init__(self, name, ref):
         super().__init__(name)
         self.ref = ref
+        self._shape_hash = hash(self.ref)
+        self._hash = hash((self.name, self.ref))
 
-    def __eq__(self, other):
-        if not issubclass(other.__class__, self.__class__):
-            return False
-        if self.name != other.name:
-            return False
-        if self.ref != other.ref:
-            return False
-        return True
+    def __reduce__(self):
+        # rebuild on unpickling, as string hashes vary between processes
+        return (self.__class__, (self.name, self.ref))
+
+    def _equal_fields(self, other):
+        return self.name == other.name and self.ref == other.ref
 
     def __lt__(self, other):
         if self.name is None and other.name is not None:
             return True
         elif self.name is not None and other.name is None:
             return False
-        elif self.name < other.name:
-            return True
-        elif self.name > other.name:
-            return False
+        elif self.name != other.name:
+            return self.name < other.name
+
+        # different kinds of node are ordered by kind
+        if self.__class__ is not other.__class__:
+            return self.__class__.__name__ < other.__class__.__name__
 
         if self.ref < other.ref:
             return True
@@ -639,7 +1046,7 @@ class SchemaNodeRef(SchemaNode):
         return False
 
     def __hash__(self):
-        return hash((self.name, self.ref))
+        return self._hash
 
     def __repr__(self):
         return 'SchemaNodeRef({}, {})'.format(
@@ -649,7 +1056,19 @@ class SchemaNodeRef(SchemaNode):
         return 'SchemaNodeRef({}, {})'.format(
             self.name, self.ref)
 
-    def to_json(self):
+    def _json(self, children_json):
         json = {}
         json["$ref"] = '#/definitions/{}'.format(self.ref)
         return json
+
+    def _merged(self, other, merged, enum_limit, enum_coverage):
+        if not isinstance(other, SchemaNodeRef) or self.ref != other.ref:
+            # different things can't share a type, so be generic
+            return _generic_leaf(self.name, enum_limit, enum_coverage, other)
+        return self
+
+    def renamed(self, name):
+        return SchemaNodeRef(name, self.ref)
+
+    def _same_shape_fields(self, other):
+        return isinstance(other, SchemaNodeRef) and self.ref == other.ref
@@ -0,0 +1,372 @@
+"""
+Compact, versioned binary encoding of schemas and their statistics.
+
+Schemas are written depth first after a short header, from a stack
+rather than by recursion, so they can be nested to any depth. Every
+string, such as property names, is written once and afterwards referred
+to by its position in a table, and integers are variable length, so wide
+schemas with repeated names encode to much less than pickle does.
+
+The format starts with MAGIC and then FORMAT_VERSION. Decoding rejects
+any other version, as partial schemas should only ever be exchanged
+between processes running the same code.
+"""
+import functools
+import struct
+
+from .schema import Schema, SchemaNodeArray, SchemaNodeDict
+from .schema import SchemaNodeLeaf, SchemaNodeRef
+from .stats import HLL_REGISTERS, DistinctSketch, FrequencySketch, LeafStats
+
+MAGIC = b"JSG"
+FORMAT_VERSION = 3
+
+# tags of values
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_NEGATIVE_INT = 4
+_FLOAT = 5
+_STRING = 6
+_NEW_STRING = 7
+
+# tags of nodes
+_DICT = 0
+_ARRAY = 1
+_LEAF = 2
+_REF = 3
+
+_DOUBLE = struct.Struct("<d")
+
+
+class _Writer(object):
+
+    def __init__(self):
+        self.data = bytearray(MAGIC)
+        self.data.append(FORMAT_VERSION)
+        self.strings = {}
+
+    def uint(self, number):
+        data = self.data
+        while number >= 0x80:
+            data.append((number & 0x7f) | 0x80)
+            number >>= 7
+        data.append(number)
+
+    def value(self, value):
+        data = self.data
+        if value is None:
+            data.append(_NONE)
+        elif value is True:
+            data.append(_TRUE)
+        elif value is False:
+            data.append(_FALSE)
+        elif isinstance(value, str):
+            index = self.strings.get(value)
+            if index is None:
+                self.strings[value] = len(self.strings)
+                data.append(_NEW_STRING)
+                encoded = value.encode("utf-8", "surrogatepass")
+                self.uint(len(encoded))
+                data += encoded
+            else:
+                data.append(_STRING)
+                self.uint(index)
+        elif isinstance(value, int):
+            if value < 0:
+                data.append(_NEGATIVE_INT)
+                self.uint(-value)
+            else:
+                data.append(_INT)
+                self.uint(value)
+        else:
+            data.append(_FLOAT)
+            data += _DOUBLE.pack(value)
+
+    def node(self, node):
+        data = self.data
+        # what is written after the children of a node is pushed before
+        # them, as a function to call
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, SchemaNodeDict):
+                data.append(_DICT)
+                self.value(node.name)
+                self.uint(len(node.children))
+                stack.append(functools.partial(self.required, node.required))
+                stack.extend(reversed(tuple(node.children.values())))
+            elif isinstance(node, SchemaNodeArray):
+                data.append(_ARRAY)
+                self.value(node.name)
+                self.uint(len(node.children))
+                if node.positions is not None:
+                    stack.extend(reversed(node.positions))
+                stack.append(functools.partial(self.lengths, node))
+                stack.extend(reversed(node.children))
+            elif isinstance(node, SchemaNodeLeaf):
+                data.append(_LEAF)
+                self.value(node.name)
+                self.value(node.datatype)
+                self.stats(node.stats)
+                self.sketch(node.sketch)
+            elif isinstance(node, SchemaNodeRef):
+                data.append(_REF)
+                self.value(node.name)
+                self.value(node.ref)
+            elif callable(node):
+                node()
+            else:
+                raise ValueError("Unrecognized node {}".format(node))
+
+    def required(self, required):
+        self.uint(len(required))
+        for name in required:
+            self.value(name)
+
+    def lengths(self, node):
+        # followed by the positions, if any
+        self.value(node.min_length)
+        self.value(node.max_length)
+        if node.positions is None:
+            self.uint(0)
+        else:
+            self.uint(len(node.positions) + 1)
+
+    def stats(self, stats):
+        self.uint(stats.count)
+        self.uint(stats.null_count)
+        self.value(stats.minimum)
+        self.value(stats.maximum)
+        self.value(stats.min_length)
+        self.value(stats.max_length)
+        if stats.distinct is None:
+            # no estimate, as two more than the sparse sizes could ever be
+            self.uint(HLL_REGISTERS + 2)
+            return
+        registers = stats.distinct.registers
+        if isinstance(registers, dict):
+            self.uint(len(registers))
+            for index, rank in registers.items():
+                self.uint(index)
+                self.data.append(rank)
+        else:
+            # one more than the sparse sizes could ever be
+            self.uint(HLL_REGISTERS + 1)
+            self.data += registers
+
+    def sketch(self, sketch):
+        self.uint(sketch.limit)
+        self.data += _DOUBLE.pack(sketch.coverage)
+        self.uint(sketch.total)
+        self.uint(sketch.decrement)
+        if sketch.counts is None:
+            self.uint(0)
+        else:
+            self.uint(len(sketch.counts) + 1)
+            for value, count in sketch.counts.items():
+                self.value(value)
+                self.uint(count)
+
+
+class _Reader(object):
+
+    def __init__(self, data):
+        data = memoryview(data)
+        if bytes(data[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a serialized schema")
+        version = data[len(MAGIC)]
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                "Unsupported schema format version {}".format(version))
+        self.data = data
+        self.pos = len(MAGIC) + 1
+        self.strings = []
+
+    def byte(self):
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def uint(self, number=0):
+        data = self.data
+        pos = self.pos
+        shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            number |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                self.pos = pos
+                return number
+            shift += 7
+
+    def double(self):
+        value = _DOUBLE.unpack_from(self.data, self.pos)[0]
+        self.pos += _DOUBLE.size
+        return value
+
+    def value(self):
+        tag = self.byte()
+        if tag == _STRING:
+            return self.strings[self.uint()]
+        elif tag == _NEW_STRING:
+            length = self.uint()
+            value = str(self.data[self.pos:self.pos + length], "utf-8",
+                        "surrogatepass")
+            self.pos += length
+            self.strings.append(value)
+            return value
+        elif tag == _NONE:
+            return None
+        elif tag == _INT:
+            return self.uint()
+        elif tag == _NEGATIVE_INT:
+            return -self.uint()
+        elif tag == _FLOAT:
+            return self.double()
+        elif tag == _TRUE:
+            return True
+        elif tag == _FALSE:
+            return False
+        raise ValueError("Unrecognized value tag {}".format(tag))
+
+    def node(self):
+        # dicts and arrays whose children are still being read, as
+        # [tag, name, children left, nodes read, array lengths]
+        frames = []
+        while True:
+            tag = self.byte()
+            name = self.value()
+            node = None
+            if tag == _DICT or tag == _ARRAY:
+                frames.append([tag, name, self.uint(), [], None])
+            elif tag == _LEAF:
+                datatype = self.value()
+                stats = self.stats()
+                sketch = self.sketch()
+                node = SchemaNodeLeaf(name, None, datatype, stats, sketch)
+            elif tag == _REF:
+                node = SchemaNodeRef(name, self.value())
+            else:
+                raise ValueError("Unrecognized node tag {}".format(tag))
+
+            # finish every node that has all of its children now
+            while True:
+                if node is not None:
+                    if not frames:
+                        return node
+                    frame = frames[-1]
+                    frame[3].append(node)
+                    frame[2] -= 1
+                else:
+                    frame = frames[-1]
+                if frame[2] > 0:
+                    break
+                node = self.finish(frame)
+                if node is None:
+                    break
+                frames.pop()
+
+    def finish(self, frame):
+        # the node of frame once its children have been read, or None if
+        # it is an array with positions still to read
+        tag, name, left, nodes, lengths = frame
+        if tag == _DICT:
+            required = [self.value() for i in range(self.uint())]
+            return SchemaNodeDict(name, nodes, required)
+        if lengths is not None:
+            children, min_length, max_length = lengths
+            return SchemaNodeArray(name, children, min_length, max_length,
+                                   nodes)
+        min_length = self.value()
+        max_length = self.value()
+        count = self.uint()
+        if count > 1:
+            frame[2:] = [count - 1, [], (nodes, min_length, max_length)]
+            return None
+        positions = [] if count == 1 else None
+        return SchemaNodeArray(name, nodes, min_length, max_length,
+                               positions)
+
+    def stats(self):
+        stats = LeafStats()
+        stats.count = self.uint()
+        stats.null_count = self.uint()
+        stats.minimum = self.value()
+        stats.maximum = self.value()
+        stats.min_length = self.value()
+        stats.max_length = self.value()
+        count = self.uint()
+        if count > HLL_REGISTERS + 1:
+            return stats
+        distinct = DistinctSketch()
+        if count > HLL_REGISTERS:
+            distinct.registers = bytearray(
+                self.data[self.pos:self.pos + HLL_REGISTERS])
+            self.pos += HLL_REGISTERS
+        else:
+            for i in range(count):
+                index = self.uint()
+                distinct.registers[index] = self.byte()
+        stats.distinct = distinct
+        return stats
+
+    def sketch(self):
+        sketch = FrequencySketch(self.uint(), self.double())
+        sketch.total = self.uint()
+        sketch.decrement = self.uint()
+        count = self.uint()
+        if count == 0:
+            sketch.counts = None
+        else:
+            for i in range(count - 1):
+                value = self.value()
+                sketch.counts[value] = self.uint()
+        return sketch
+
+
+def dumps(schema):
+    """
+    Encode a Schema, including its definitions, as bytes.
+    """
+    writer = _Writer()
+    writer.uint(schema.count)
+    if schema.root is None:
+        writer.uint(0)
+    else:
+        writer.uint(1)
+        writer.node(schema.root)
+    writer.uint(len(schema.definitions))
+    for definition in schema.definitions:
+        writer.node(definition)
+    return bytes(writer.data)
+
+
+def loads(data):
+    """
+    Decode a Schema from bytes made by dumps.
+    """
+    reader = _Reader(data)
+    count = reader.uint()
+    root = reader.node() if reader.uint() else None
+    schema = Schema(root, count)
+    schema.definitions = set(reader.node() for i in range(reader.uint()))
+    return schema
+
+
+def register_dask_serializers():
+    """
+    Have Dask distributed send schemas between workers in this format,
+    rather than pickling them.
+    """
+    from distributed.protocol import dask_deserialize, dask_serialize
+
+    @dask_serialize.register(Schema)
+    def _serialize(schema):
+        return {}, [dumps(schema)]
+
+    @dask_deserialize.register(Schema)
+    def _deserialize(header, frames):
+        return loads(b"".join(frames))
@@ -0,0 +1,145 @@
+"""
+Saving the full schema state between runs, so later runs only have to
+process new input files.
+
+A state file holds the schema before references are inferred, in the
+binary format of serialization.py, along with a manifest of the files
+that went into it and the settings used. As schemas merge associatively,
+a schema of the new files can be merged into the saved one and the
+result is the same as processing everything at once.
+"""
+import json
+import os
+import struct
+
+from .schema import ENUM_LIMIT, Schema
+
+MAGIC = b"JSGSTATE"
+FORMAT_VERSION = 2
+
+_LENGTH = struct.Struct("<I")
+
+
+def file_signature(filename):
+    """
+    The size and modification time of a file, used to tell if it has
+    changed since it was processed.
+    """
+    stat = os.stat(filename)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class SchemaState(object):
+    """
+    A schema before references are inferred, and the files it is of.
+
+    Files are keyed by absolute path, with the signature of each when
+    it was processed.
+    """
+
+    def __init__(self, enum_limit=ENUM_LIMIT, enum_coverage=1.0,
+                 max_depth=None, count_distinct=False):
+        self.enum_limit = enum_limit
+        self.enum_coverage = enum_coverage
+        self.max_depth = max_depth
+        self.count_distinct = count_distinct
+        self.schema = Schema(None)
+        self.files = {}
+
+    def new_files(self, filenames):
+        """
+        Returns the filenames that have not been processed yet.
+
+        Raises ValueError if any of them has changed since it was
+        processed, as what was added from it can't be taken back out.
+        """
+        new = []
+        changed = []
+        for filename in filenames:
+            signature = self.files.get(os.path.abspath(filename))
+            if signature is None:
+                new.append(filename)
+            elif signature != file_signature(filename):
+                changed.append(filename)
+        if changed:
+            raise ValueError(
+                "Already processed files have changed: {}".format(
+                    ", ".join(changed)))
+        return new
+
+    def update(self, schema, filenames):
+        """
+        Merge in a schema of filenames, which must not have had
+        references inferred yet.
+        """
+        assert not schema.definitions, \
+            "references must be inferred after merging"
+        self.schema = self.schema.merge(schema, self.enum_limit,
+                                        self.enum_coverage)
+        for filename in filenames:
+            self.files[os.path.abspath(filename)] = file_signature(filename)
+
+    def check_settings(self, enum_limit, enum_coverage, max_depth=None,
+                       count_distinct=False):
+        if (enum_limit, enum_coverage, max_depth, count_distinct) != \
+                (self.enum_limit, self.enum_coverage, self.max_depth,
+                 self.count_distinct):
+            raise ValueError(
+                "State was saved with enum limit {}, coverage {}, "
+                "max depth {} and count distinct {}".format(
+                    self.enum_limit, self.enum_coverage, self.max_depth,
+                    self.count_distinct))
+
+    def to_bytes(self):
+        manifest = json.dumps({
+            "enum_limit": self.enum_limit,
+            "enum_coverage": self.enum_coverage,
+            "max_depth": self.max_depth,
+            "count_distinct": self.count_distinct,
+            "files": self.files,
+        }, sort_keys=True).encode("utf-8")
+        return b"".join((MAGIC, bytes((FORMAT_VERSION,)),
+                         _LENGTH.pack(len(manifest)), manifest,
+                         self.schema.to_bytes()))
+
+    @classmethod
+    def from_bytes(clazz, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a schema state")
+        version = data[len(MAGIC)]
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                "Unsupported state format version {}".format(version))
+        pos = len(MAGIC) + 1
+        length = _LENGTH.unpack_from(data, pos)[0]
+        pos += _LENGTH.size
+        manifest = json.loads(data[pos:pos + length].decode("utf-8"))
+        state = clazz(manifest["enum_limit"], manifest["enum_coverage"],
+                      manifest["max_depth"], manifest["count_distinct"])
+        state.files = manifest["files"]
+        state.schema = Schema.from_bytes(data[pos + length:])
+        return state
+
+    def save(self, filename):
+        """
+        Write this state to filename, replacing it only once complete.
+        """
+        temporary = filename + ".tmp"
+        with open(temporary, "wb") as outfile:
+            outfile.write(self.to_bytes())
+        os.replace(temporary, filename)
+
+    @classmethod
+    def load(clazz, filename, enum_limit=ENUM_LIMIT, enum_coverage=1.0,
+             max_depth=None, count_distinct=False):
+        """
+        Read a state from filename, or start a new one if it doesn't
+        exist. Settings must match those it was saved with.
+        """
+        if not os.path.exists(filename):
+            return clazz(enum_limit, enum_coverage, max_depth, count_distinct)
+        with open(filename, "rb") as infile:
+            state = clazz.from_bytes(infile.read())
+        state.check_settings(enum_limit, enum_coverage, max_depth,
+                             count_distinct)
+        return state
@@ -0,0 +1,385 @@
+"""
+Fixed-size statistics about the values seen at a leaf of a schema.
+
+Every statistic here takes constant memory however many values are added,
+and merging is associative and commutative so partial statistics from
+different partitions can be combined in any order.
+"""
+import hashlib
+import heapq
+import math
+import struct
+
+# number of bits of the hash used to pick a HyperLogLog register
+HLL_PRECISION = 10
+HLL_REGISTERS = 1 << HLL_PRECISION
+# registers are held sparsely until there are this many
+HLL_SPARSE_LIMIT = 32
+# frequency sketches count this many times the enum limit of values
+SKETCH_FACTOR = 4
+SKETCH_MIN_CAPACITY = 32
+
+_MASK64 = (1 << 64) - 1
+# added to numbers before mixing, so that True, 1 and 1.0 hash apart
+_INT_SEED = 0x9E3779B97F4A7C15
+_FLOAT_SEED = 0x632BE59BD9B4E019
+_FLOAT = struct.Struct("<d")
+_CONSTANT_HASHES = {None: 0x4F1BBCDCBFA53E0A, False: 0x7A7D3A1E0C1F5B22,
+                    True: 0x2C6FE4D5A8B3E911}
+
+
+def _mix64(value):
+    # splitmix64 finaliser, so every bit of the result depends on every
+    # bit of value, as HyperLogLog uses both the low and the high bits
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+def _stable_hash(value):
+    """
+    64-bit hash of a JSON scalar that is the same in every process,
+    unlike the builtin hash of strings.
+
+    Only strings, and integers too big for 64 bits, are hashed with
+    blake2b. Other scalars are mixed arithmetically, which is much faster.
+    """
+    kind = type(value)
+    if kind is str:
+        data = b"s" + value.encode("utf-8", "surrogatepass")
+    elif kind is int and -(1 << 63) <= value < (1 << 63):
+        return _mix64((value + _INT_SEED) & _MASK64)
+    elif kind is float:
+        bits = int.from_bytes(_FLOAT.pack(value), "little")
+        return _mix64((bits + _FLOAT_SEED) & _MASK64)
+    elif value is None or kind is bool:
+        return _CONSTANT_HASHES[value]
+    else:
+        # type name keeps subclasses and big integers apart
+        data = kind.__name__.encode("ascii") + repr(value).encode()
+    digest = hashlib.blake2b(data, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class DistinctSketch(object):
+    """
+    HyperLogLog estimate of the number of distinct values.
+
+    Registers are kept in a small dict until enough are set, then in a
+    bytearray of HLL_REGISTERS entries.
+    """
+    __slots__ = ("registers",)
+
+    def __init__(self):
+        self.registers = {}
+
+    def copy(self):
+        other = DistinctSketch()
+        if isinstance(self.registers, dict):
+            other.registers = dict(self.registers)
+        else:
+            other.registers = bytearray(self.registers)
+        return other
+
+    def __eq__(self, other):
+        if not isinstance(other, DistinctSketch):
+            return False
+        # sparse registers never have more than HLL_SPARSE_LIMIT set, and
+        # dense ones always do, so the two can never be equal
+        return self.registers == other.registers
+
+    def __hash__(self):
+        if isinstance(self.registers, dict):
+            return hash(frozenset(self.registers.items()))
+        return hash(bytes(self.registers))
+
+    def _densify(self):
+        if isinstance(self.registers, dict):
+            registers = bytearray(HLL_REGISTERS)
+            for index, rank in self.registers.items():
+                registers[index] = rank
+            self.registers = registers
+
+    def add(self, value):
+        hashed = _stable_hash(value)
+        index = hashed & (HLL_REGISTERS - 1)
+        rest = hashed >> HLL_PRECISION
+        rank = (64 - HLL_PRECISION) - rest.bit_length() + 1
+        registers = self.registers
+        if isinstance(registers, dict):
+            if rank > registers.get(index, 0):
+                registers[index] = rank
+                if len(registers) > HLL_SPARSE_LIMIT:
+                    self._densify()
+        elif rank > registers[index]:
+            registers[index] = rank
+
+    def update(self, other):
+        """
+        Merge other into this sketch in place.
+        """
+        if not isinstance(other.registers, dict):
+            self._densify()
+            self.registers = bytearray(
+                map(max, self.registers, other.registers))
+        elif isinstance(self.registers, dict):
+            registers = self.registers
+            for index, rank in other.registers.items():
+                if rank > registers.get(index, 0):
+                    registers[index] = rank
+            if len(registers) > HLL_SPARSE_LIMIT:
+                self._densify()
+        else:
+            registers = self.registers
+            for index, rank in other.registers.items():
+                if rank > registers[index]:
+                    registers[index] = rank
+
+    def estimate(self):
+        registers = self.registers
+        if isinstance(registers, dict):
+            zeros = HLL_REGISTERS - len(registers)
+            total = zeros + sum(2.0 ** -x for x in registers.values())
+        else:
+            zeros = registers.count(0)
+            total = sum(2.0 ** -x for x in registers)
+        alpha = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+        estimate = alpha * HLL_REGISTERS * HLL_REGISTERS / total
+        # small range correction
+        if estimate <= 2.5 * HLL_REGISTERS and zeros > 0:
+            estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)
+        return int(round(estimate))
+
+
+class LeafStats(object):
+    """
+    Statistics about the values at a leaf: how many values and nulls there
+    were, the range of numbers, the range of string lengths, and, if
+    count_distinct, an estimate of how many distinct values there were.
+
+    Hashing every value for the estimate takes about as long as the rest
+    of building a schema, so distinct is None unless asked for. Merging
+    with statistics of any values without an estimate drops it.
+    """
+    __slots__ = ("count", "null_count", "minimum", "maximum", "min_length",
+                 "max_length", "distinct")
+
+    def __init__(self, values=(), count_distinct=False):
+        self.count = 0
+        self.null_count = 0
+        self.minimum = None
+        self.maximum = None
+        self.min_length = None
+        self.max_length = None
+        self.distinct = DistinctSketch() if count_distinct else None
+        for value in values:
+            self.add(value)
+
+    def __repr__(self):
+        return 'LeafStats({}, {}, {}, {}, {}, {}, ~{})'.format(
+            self.count, self.null_count, self.minimum, self.maximum,
+            self.min_length, self.max_length, self.distinct_estimate())
+
+    def _key(self):
+        return (self.count, self.null_count, self.minimum, self.maximum,
+                self.min_length, self.max_length, self.distinct)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, LeafStats):
+            return False
+        return self.count == other.count \
+            and self.null_count == other.null_count \
+            and self.minimum == other.minimum \
+            and self.maximum == other.maximum \
+            and self.min_length == other.min_length \
+            and self.max_length == other.max_length \
+            and self.distinct == other.distinct
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def distinct_estimate(self):
+        """
+        Estimate of how many distinct values there were, or None if they
+        weren't counted.
+        """
+        if self.distinct is None:
+            return None
+        return self.distinct.estimate()
+
+    def copy(self):
+        other = LeafStats()
+        other.update(self)
+        return other
+
+    def add(self, value):
+        self.count += 1
+        if value is None:
+            self.null_count += 1
+        elif isinstance(value, str):
+            length = len(value)
+            if self.min_length is None or length < self.min_length:
+                self.min_length = length
+            if self.max_length is None or length > self.max_length:
+                self.max_length = length
+        elif not isinstance(value, bool):
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+        if self.distinct is not None:
+            self.distinct.add(value)
+
+    def update(self, other):
+        """
+        Merge other into these statistics in place.
+        """
+        # statistics of no values at all don't lose the estimate
+        if other.distinct is None:
+            if other.count:
+                self.distinct = None
+        elif self.distinct is not None:
+            self.distinct.update(other.distinct)
+        elif not self.count:
+            self.distinct = other.distinct.copy()
+        self.count += other.count
+        self.null_count += other.null_count
+        for name, better in (("minimum", min), ("maximum", max),
+                             ("min_length", min), ("max_length", max)):
+            value = getattr(self, name)
+            other_value = getattr(other, name)
+            if value is None:
+                setattr(self, name, other_value)
+            elif other_value is not None:
+                setattr(self, name, better(value, other_value))
+
+    def merge(self, other):
+        merged = self.copy()
+        merged.update(other)
+        return merged
+
+
+class FrequencySketch(object):
+    """
+    Misra-Gries summary of the most frequent values, used to decide if the
+    values are few enough to be an enum.
+
+    Up to capacity values are counted. When a new value doesn't fit,
+    every count is reduced by one instead, so counts are lower bounds
+    that are too low by at most decrement. While decrement is zero the
+    counts are exact.
+
+    The values are an enum if there are no more than limit of them, or if
+    the limit most frequent values cover at least coverage of everything
+    seen. Once that becomes impossible the counts are dropped entirely.
+    """
+    __slots__ = ("limit", "coverage", "capacity", "total", "decrement",
+                 "counts")
+
+    def __init__(self, limit, coverage=1.0, values=()):
+        self.limit = limit
+        self.coverage = coverage
+        self.capacity = max(SKETCH_MIN_CAPACITY, SKETCH_FACTOR * limit)
+        self.total = 0
+        self.decrement = 0
+        # None once these values can't be an enum
+        self.counts = {}
+        for value in values:
+            self.add(value)
+
+    @classmethod
+    def overflowed(clazz, limit, coverage=1.0):
+        sketch = clazz(limit, coverage)
+        sketch.counts = None
+        return sketch
+
+    def __repr__(self):
+        return 'FrequencySketch({}, {}, {}, {}, {})'.format(
+            self.limit, self.coverage, self.total, self.decrement,
+            self.counts)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, FrequencySketch):
+            return False
+        return self.limit == other.limit \
+            and self.coverage == other.coverage \
+            and self.total == other.total \
+            and self.decrement == other.decrement \
+            and self.counts == other.counts
+
+    def __hash__(self):
+        counts = None
+        if self.counts is not None:
+            counts = frozenset(self.counts.items())
+        return hash((self.limit, self.coverage, self.total, self.decrement,
+                     counts))
+
+    def copy(self):
+        other = FrequencySketch(self.limit, self.coverage)
+        other.update(self)
+        return other
+
+    def add(self, value):
+        self.total += 1
+        counts = self.counts
+        if counts is None:
+            return
+        if value in counts:
+            counts[value] += 1
+        elif len(counts) < self.capacity:
+            counts[value] = 1
+            self._check()
+        else:
+            self.decrement += 1
+            self.counts = {x: y - 1 for x, y in counts.items() if y > 1}
+            self._check()
+
+    def update(self, other):
+        """
+        Merge other into this sketch in place.
+        """
+        self.total += other.total
+        if self.counts is None:
+            return
+        elif other.counts is None:
+            self.counts = None
+            return
+
+        counts = self.counts
+        for value, count in other.counts.items():
+            counts[value] = counts.get(value, 0) + count
+        self.decrement += other.decrement
+        if len(counts) > self.capacity:
+            # reduce everything by the first count that doesn't fit
+            cut = sorted(counts.values(), reverse=True)[self.capacity]
+            self.counts = {x: y - cut for x, y in counts.items() if y > cut}
+            self.decrement += cut
+        self._check()
+
+    def _check(self):
+        # if there must be more than limit values and they all have to be
+        # covered, this can never be an enum so don't keep counting
+        if self.coverage >= 1.0 and (
+                self.decrement > 0 or len(self.counts) > self.limit):
+            self.counts = None
+
+    def enum_values(self):
+        """
+        Returns the values of the enum, or None if this isn't an enum.
+        """
+        if self.counts is None:
+            return None
+        if self.decrement == 0 and len(self.counts) <= self.limit:
+            return frozenset(self.counts)
+        if self.total == 0:
+            return None
+        top = heapq.nlargest(self.limit, self.counts.items(),
+                             key=lambda x: x[1])
+        covered = sum(x[1] for x in top)
+        if covered < self.coverage * self.total:
+            return None
+        return frozenset(x[0] for x in top)
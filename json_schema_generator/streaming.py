@@ -0,0 +1,82 @@
+"""
+Building a schema from an asynchronous stream of records, such as a
+socket or queue, without blocking the event loop.
+
+Records are collected into batches on the loop, and each batch is added
+to a single accumulator by an executor while the next batch is being
+collected. As the accumulator is shared, the executor must be a thread
+pool, such as the default one.
+"""
+import asyncio
+import concurrent.futures
+import inspect
+
+from .accumulator import SchemaAccumulator
+from .schema import ENUM_LIMIT
+
+# records handed to the executor at a time
+BATCH_SIZE = 1000
+
+
+def _snapshot(accumulator):
+    schema, changes = accumulator.snapshot()
+    schema.infer_references()
+    return schema, changes
+
+
+async def process_to_schema_async(items, enum_limit=ENUM_LIMIT,
+                                  enum_coverage=1.0, batch_size=BATCH_SIZE,
+                                  executor=None, snapshot_every=None,
+                                  on_snapshot=None, max_depth=None,
+                                  count_distinct=False):
+    """
+    As process_to_schema, but from an async iterable of decoded records.
+
+    The work is done by executor, by default the loop's default executor.
+    It must share this process's memory, so a process pool is rejected.
+    If snapshot_every and on_snapshot are given, on_snapshot is called
+    each time at least snapshot_every more records have been added, with
+    the schema so far and the list of changes.Change to its shape since
+    the last snapshot. It may be a coroutine function. If max_depth is
+    given, anything nested that deep is summarised. If count_distinct,
+    distinct values are estimated.
+    """
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        # each batch would be added to a copy of the accumulator
+        raise ValueError("The executor must be a thread pool, not processes")
+    loop = asyncio.get_running_loop()
+    accumulator = SchemaAccumulator(enum_limit, enum_coverage,
+                                    max_depth=max_depth,
+                                    count_distinct=count_distinct)
+    snapshot_count = 0
+
+    async def fold(batch):
+        nonlocal snapshot_count
+        await loop.run_in_executor(executor, accumulator.update, batch)
+        if snapshot_every is not None and on_snapshot is not None \
+                and accumulator.count - snapshot_count >= snapshot_every:
+            snapshot_count = accumulator.count
+            schema, changes = await loop.run_in_executor(
+                executor, _snapshot, accumulator)
+            result = on_snapshot(schema, changes)
+            if inspect.isawaitable(result):
+                await result
+
+    # only one batch is folded at a time, while the next is collected
+    pending = None
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            if pending is not None:
+                await pending
+            pending = asyncio.ensure_future(fold(batch))
+            batch = []
+    if pending is not None:
+        await pending
+    if batch:
+        await fold(batch)
+
+    schema, changes = await loop.run_in_executor(executor, _snapshot,
+                                                 accumulator)
+    return schema
@@ -15,6 +15,12 @@ setup(
         'visualization':  [
             "dask[dot]"
         ],
+        'orjson': [
+            "orjson"
+        ],
+        'zstd': [
+            "zstandard"
+        ],
         'dev': [
             'pytest-cov',
             'flake8',
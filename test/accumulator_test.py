@@ -0,0 +1,149 @@
+import functools
+import random
+
+from json_schema_generator import NodeInterner, Schema, SchemaAccumulator
+
+
+def merged_schema(items):
+    schemas = map(Schema.schema_extractor, items)
+    return functools.reduce(Schema.merge, schemas, Schema(None))
+
+
+def test_matches_merge():
+    rng = random.Random(42)
+    items = []
+    for i in range(50):
+        item = {
+            "id": i,
+            "name": rng.choice(("Alice", "Bob", "Carol")),
+            "score": rng.random(),
+            "tags": [rng.choice(("x", "y", "z"))
+                     for j in range(rng.randint(0, 3))],
+            "nested": {"flag": rng.random() > 0.5}
+        }
+        if rng.random() > 0.5:
+            item["optional"] = None
+        items.append(item)
+
+    accumulated = SchemaAccumulator().update(items).freeze()
+    assert accumulated.to_json() == merged_schema(items).to_json()
+
+
+def test_required():
+    items = [{"a": 1, "b": 2}, {"a": 3}]
+    schema = SchemaAccumulator().update(items).freeze().to_json()
+    assert schema["required"] == ["a"]
+
+
+def test_count():
+    accumulator = SchemaAccumulator()
+    accumulator.add({"a": 1})
+    accumulator.add({"a": 2})
+    assert accumulator.count == 2
+
+
+def test_empty():
+    schema = SchemaAccumulator().freeze()
+    assert schema.root is None
+
+
+def test_mixed_kinds():
+    items = [{"a": {"b": 1}}, {"a": [1, 2]}, {"a": "c"}]
+    schema = SchemaAccumulator().update(items).freeze().to_json()
+    # there is no single type that can describe all of these
+    assert schema["properties"]["a"] == {}
+    # merging whole schemas must agree
+    assert merged_schema(items).to_json() == schema
+
+
+def test_freeze_interned():
+    items = [{"a": {"c": 1}, "b": {"c": 1}}]
+    interner = NodeInterner()
+    schema = SchemaAccumulator().update(items).freeze(interner)
+    # the leaves are equal including name, so can be shared
+    assert schema.root.children["a"].children["c"] \
+        is schema.root.children["b"].children["c"]
+
+
+def test_changes():
+    accumulator = SchemaAccumulator(enum_limit=2)
+    accumulator.add({"a": 1, "b": [{"c": "x"}]})
+    schema, changes = accumulator.snapshot()
+    assert ("/properties/b/items/properties/c", "added", "value") \
+        in changes
+    assert ("/properties/b/items/0/properties/c", "enum_value", "x") \
+        in changes
+
+    accumulator.add({"a": 1, "b": [{"c": "x"}]})
+    assert accumulator.snapshot()[1] == []
+
+    accumulator.add({"a": 2.5, "b": [{"c": "y"}, {"c": "z"}]})
+    accumulator.add({"b": "none"})
+    schema, changes = accumulator.snapshot()
+    assert set(changes) == {
+        ("/properties/a", "widened", ("integer", "number")),
+        ("/properties/a", "enum_value", 2.5),
+        ("/properties/b/items/properties/c", "enum_value", "y"),
+        ("/properties/b/items/0/properties/c", "enum_value", "y"),
+        ("/properties/b/items/properties/c", "not_enum", None),
+        ("/properties/b", "not_tuple", None),
+        ("/properties/b", "conflict", None),
+        ("", "optional", ("a",)),
+    }
+    assert schema.count == 4
+
+
+def test_shape_cache():
+    rng = random.Random(42)
+    items = []
+    for i in range(300):
+        item = {"id": i, "point": [rng.random(), rng.random()]}
+        if i % 3 == 0:
+            item["tags"] = [rng.choice(("x", "y"))]
+        if i == 200:
+            # conflicts with the remembered shapes
+            item["point"] = "none"
+        items.append(item)
+
+    cached = SchemaAccumulator()
+    cached.update(items)
+    uncached = SchemaAccumulator(shape_cache_size=0)
+    uncached.update(items)
+    assert cached.freeze().to_json() == uncached.freeze().to_json()
+    assert cached.shape_hits > cached.shape_misses
+    assert uncached.shape_hits == uncached.shape_misses == 0
+
+
+def test_shape_cache_gives_up():
+    # every record has a different shape, so no shape is ever seen twice
+    accumulator = SchemaAccumulator()
+    accumulator.update({str(i): i} for i in range(1000))
+    assert accumulator.shape_hits == 0
+    assert accumulator.shape_misses < 1000
+    assert not accumulator.shapes
+
+
+def test_conflict_once():
+    # once a value is generic, more conflicting kinds change nothing
+    items = [{"a": 1} if i % 2 else {"a": {"b": 1}} for i in range(1000)]
+    accumulator = SchemaAccumulator()
+    accumulator.update(items)
+    assert accumulator.version == 5
+    assert [x.kind for x in accumulator.changes].count("conflict") == 1
+
+    events = SchemaAccumulator()
+    events.update_json('{"a": 1}' if i % 2 else '{"a": {"b": 1}}'
+                       for i in range(1000))
+    assert events.version == accumulator.version
+    assert events.freeze().root == accumulator.freeze().root
+
+
+def test_changes_long_array():
+    # the first few items are added to positions before the length is known
+    for accumulator in (SchemaAccumulator().update([{"a": list(range(10))}]),
+                        SchemaAccumulator().update_json(
+                            ['{"a": [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]}'])):
+        changes = accumulator.changes
+        assert ("/properties/a/items/7", "added", "value") in changes
+        assert changes[-1] == ("/properties/a", "not_tuple", None)
+        assert accumulator.freeze().root.children["a"].positions is None
@@ -1,3 +1,4 @@
+import pickle
 import simplejson as json
 import json_schema_generator
 
@@ -156,3 +157,99 @@ def test_const():
     print(json.dumps(schema, indent=2, sort_keys=True))
     assert schema["properties"]["a"]["type"] == "string"
     assert schema["properties"]["a"]["const"] == "alpha"
+
+
+def test_merge_dict():
+    a = json_schema_generator.SchemaNodeDict("a", (
+        json_schema_generator.SchemaNodeLeaf("foo", ["foo"], "string"),
+        json_schema_generator.SchemaNodeLeaf("bar", ["bar"], "string")),
+        ("foo", "bar"))
+    b = json_schema_generator.SchemaNodeDict("a", (
+        json_schema_generator.SchemaNodeLeaf("bar", ["baz"], "string"),
+        json_schema_generator.SchemaNodeLeaf("qux", [1], "integer")),
+        ("bar", "qux"))
+    merged = a.merge(b)
+
+    assert sorted(merged.children.keys()) == ["bar", "foo", "qux"]
+    assert merged.children["foo"] == a.children["foo"]
+    assert merged.children["qux"] == b.children["qux"]
+    assert merged.children["bar"] == json_schema_generator.SchemaNodeLeaf(
+        "bar", ["bar", "baz"], "string")
+    assert merged.required == frozenset(("bar",))
+    assert merged == b.merge(a)
+
+
+def test_hash_cached():
+    a = json_schema_generator.SchemaNodeDict("a", (
+        json_schema_generator.SchemaNodeLeaf("foo", ["foo"], "string"),),
+        ("foo",))
+    assert hash(a) == a._hash
+    # pickling rebuilds the node so the hash is recomputed
+    b = pickle.loads(pickle.dumps(a))
+    assert a == b
+    assert hash(a) == hash(b)
+
+
+def test_interner():
+    interner = json_schema_generator.NodeInterner()
+    items = [{"a": {"b": 1}}, {"a": {"b": 1}}]
+    schemas = [json_schema_generator.Schema.schema_extractor(x, interner)
+               for x in items]
+    assert schemas[0].root is schemas[1].root
+    assert len(interner) == 3
+
+
+def test_interner_max_size():
+    interner = json_schema_generator.NodeInterner(max_size=1)
+    a = json_schema_generator.SchemaNodeLeaf("a", ["foo"], "string")
+    b = json_schema_generator.SchemaNodeLeaf("b", ["foo"], "string")
+    assert interner.intern(a) is a
+    assert interner.intern(b) is b
+    assert len(interner) == 1
+
+
+def test_array_lengths():
+    items = [{"a": [1, 2, 3]}, {"a": []}, {"a": [4]}]
+    schema = json_schema_generator.process_to_schema(items).to_json()
+    assert schema["properties"]["a"]["minItems"] == 0
+    assert schema["properties"]["a"]["maxItems"] == 3
+    assert schema["properties"]["a"]["items"]["type"] == "integer"
+
+
+def test_array_folded():
+    items = [{"a": [{"b": i} for i in range(10000)]}]
+    schema = json_schema_generator.process_to_schema(items)
+    array = schema.root.children["a"]
+    # however long the array, only a single item schema is kept
+    assert len(array.children) == 1
+    assert array.positions is None
+    assert len(array) == 3
+
+
+def test_array_tuple():
+    items = [{"a": ["x", 1]}, {"a": ["y", 2]}]
+    schema = json_schema_generator.process_to_schema(items).to_json()
+    assert schema["properties"]["a"]["items"] == [
+        {"type": "string", "enum": ["x", "y"]},
+        {"type": "integer", "enum": [1, 2]}]
+    assert schema["properties"]["a"]["additionalItems"] is False
+
+    # once the lengths vary it can't be a tuple any more
+    items.append({"a": ["z"]})
+    schema = json_schema_generator.process_to_schema(items).to_json()
+    assert schema["properties"]["a"]["items"] == {}
+
+
+def test_compact_nodes():
+    # there can be millions of nodes, so none of them may have a __dict__
+    items = [{"a": {"b": "x"}, "c": [1.5], "d": None}]
+    schema = json_schema_generator.process_to_schema(
+        items, count_distinct=True)
+    nodes = list(schema.generate_all_nodes())
+    assert len(nodes) >= 5
+    for node in nodes:
+        assert not hasattr(node, "__dict__")
+        if isinstance(node, json_schema_generator.SchemaNodeLeaf):
+            assert not hasattr(node.stats, "__dict__")
+            assert not hasattr(node.stats.distinct, "__dict__")
+            assert not hasattr(node.sketch, "__dict__")
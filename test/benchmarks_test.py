@@ -0,0 +1,18 @@
+import json
+
+from benchmarks import suite, workloads
+
+
+def test_workloads_seeded():
+    for name in workloads.WORKLOADS:
+        first = list(workloads.generate(name, 3, seed=1))
+        assert first == list(workloads.generate(name, 3, seed=1))
+        # must be plain JSON
+        assert json.loads(json.dumps(first)) == first
+
+
+def test_suite():
+    results = suite.run(["polymorphic", "repeated"], ["serial"], scale=0.01,
+                        repeat=1)
+    assert sorted(results) == ["polymorphic/serial", "repeated/serial"]
+    assert suite.compare(results, results, 0.2) == []
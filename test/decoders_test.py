@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from json_schema_generator import process_lines_to_schema, process_to_schema
+from json_schema_generator.decoders import EVENTS, available_decoders
+from json_schema_generator.decoders import get_decoder
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "data",
+                      "sample.jsonl")
+
+
+def test_auto():
+    assert get_decoder("auto") is get_decoder(available_decoders()[0])
+
+
+def test_unknown():
+    with pytest.raises(ValueError):
+        get_decoder("foo")
+
+
+def test_identical():
+    with open(SAMPLE, "rb") as infile:
+        lines = infile.readlines()
+    # wider than 64 bits, which orjson would read as a float
+    lines += [b'{"a": 123456789012345678901234567890}\n', b'{"a": 1}\n']
+    schemas = []
+    for name in available_decoders():
+        decoder = get_decoder(name)
+        schemas.append(process_to_schema(map(decoder, lines)).to_json())
+        # can decode both bytes and str
+        assert decoder(lines[0]) == decoder(lines[0].decode("utf-8"))
+    schemas.append(process_lines_to_schema(lines, EVENTS).to_json())
+    assert schemas[0]["properties"]["a"]["type"] == "integer"
+    for schema in schemas[1:]:
+        assert schema == schemas[0]
+
+
+def test_deep():
+    # too deep for orjson, which would crash rather than raise
+    document = b"[" * 100000 + b"]" * 100000
+    for name in available_decoders():
+        with pytest.raises(RecursionError):
+            get_decoder(name)(document)
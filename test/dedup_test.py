@@ -0,0 +1,31 @@
+import dask
+import dask.bag
+
+from json_schema_generator import process_lines_to_schema
+from json_schema_generator import process_to_schema_dask
+from json_schema_generator.dedup import RecentLines
+from json_schema_generator.profiling import Profile
+
+
+def test_unique():
+    recent = RecentLines(4)
+    lines = [b"a", b"a", b"b", b"a", b"c", b"d", b"e", b"b"]
+    # b is forgotten once c, d and e have filled the sets
+    assert list(recent.unique(lines)) == [b"a", b"b", b"c", b"d", b"e", b"b"]
+    assert recent.duplicates == 2
+
+
+def test_engines():
+    lines = [b'{"a": 1}', b'{"a": 1}', b'{"a": "x"}', b'{"a": 1}']
+    profile = Profile()
+    schema = process_lines_to_schema(lines, dedup=100, profile=profile)
+    # duplicates aren't counted, but don't change the shape
+    assert schema.count == 2
+    assert profile.counters["duplicate_lines"] == 2
+    assert schema.to_json()["properties"] == \
+        process_lines_to_schema(lines).to_json()["properties"]
+
+    bag = dask.bag.from_sequence([x.decode() for x in lines], npartitions=1)
+    with dask.config.set(scheduler="synchronous"):
+        schema = process_to_schema_dask(bag, None, decoder="auto", dedup=100)
+    assert schema.count == 2
@@ -0,0 +1,132 @@
+import functools
+import json
+import pickle
+import sys
+
+from json_schema_generator import Schema, SchemaAccumulator, main
+from json_schema_generator.output import iter_json
+
+# deeper than could be walked by recursion
+DEPTH = sys.getrecursionlimit() * 2
+
+
+def nested(depth, value=1):
+    # objects and arrays in turn, around value
+    thing = value
+    for i in range(depth):
+        thing = {"a": thing} if i % 2 else [thing]
+    return thing
+
+
+def nested_json(depth, value="1"):
+    # the same as nested, as a JSON document
+    opens = []
+    closes = []
+    for i in range(depth):
+        opens.append('{"a":' if i % 2 else "[")
+        closes.append("}" if i % 2 else "]")
+    return "".join(reversed(opens)) + value + "".join(closes)
+
+
+def merged_schema(items, max_depth=None):
+    schemas = (Schema.schema_extractor(x, max_depth=max_depth)
+               for x in items)
+    return functools.reduce(Schema.merge, schemas, Schema(None))
+
+
+def test_deep():
+    items = [nested(DEPTH), nested(DEPTH, "x")]
+    accumulated = SchemaAccumulator().update(items).freeze()
+    assert accumulated.root == merged_schema(items).root
+    assert len(accumulated.root) == DEPTH + 1
+    assert accumulated.root.to_json()["type"] == "object"
+
+
+def test_deep_events():
+    accumulator = SchemaAccumulator()
+    accumulator.add_json(nested_json(DEPTH))
+    accumulator.add_json(nested_json(DEPTH, '"x"'))
+    items = [nested(DEPTH), nested(DEPTH, "x")]
+    assert accumulator.freeze().root == merged_schema(items).root
+
+
+def test_deep_round_trip():
+    schema = SchemaAccumulator().update([nested(DEPTH)]).freeze()
+    assert Schema.from_bytes(schema.to_bytes()).root == schema.root
+    assert pickle.loads(pickle.dumps(schema)).root == schema.root
+
+
+def test_deep_references():
+    # only just too deep, as comparing equal subtrees is quadratic
+    depth = sys.getrecursionlimit() + 100
+    items = [{"b": nested(depth), "c": nested(depth)}]
+    schema = SchemaAccumulator().update(items).freeze()
+    schema.infer_references()
+    properties = schema.to_json()["properties"]
+    assert "$ref" in properties["b"]
+    assert properties["b"] == properties["c"]
+
+
+def test_deep_references_stats():
+    # arrays whose items differ only in their statistics, which used to be
+    # ordered by comparing every level of them twice over
+    items = []
+    for i in range(10):
+        b, c = i, i * 7
+        for _ in range(40):
+            b, c = [b], [c]
+        items.append({"b": b, "c": c})
+    schema = SchemaAccumulator().update(items).freeze()
+    schema.infer_references()
+    properties = schema.to_json()["properties"]
+    assert "$ref" in properties["b"]
+    assert properties["b"] == properties["c"]
+
+
+def test_max_depth():
+    items = [{"a": {"b": {"c": 1}}, "d": [1]}, {"a": {"b": [2]}, "d": [2]}]
+    accumulated = SchemaAccumulator(max_depth=2).update(items).freeze()
+    assert accumulated.root == merged_schema(items, max_depth=2).root
+    schema = accumulated.to_json()
+    assert schema["properties"]["a"]["properties"]["b"] == {}
+    assert schema["properties"]["d"]["items"]["type"] == "integer"
+
+    accumulator = SchemaAccumulator(max_depth=2)
+    accumulator.update_json([
+        '{"a": {"b": {"c": 1}}, "d": [1]}', '{"a": {"b": [2]}, "d": [2]}'])
+    assert accumulator.freeze().root == accumulated.root
+
+
+def test_max_depth_deep():
+    accumulator = SchemaAccumulator(max_depth=10)
+    accumulator.add(nested(DEPTH))
+    accumulator.add_json(nested_json(DEPTH))
+    schema = accumulator.freeze()
+    assert len(schema.root) == 11
+    # summarising doesn't count as changing the shape
+    version = accumulator.version
+    accumulator.add(nested(DEPTH))
+    assert accumulator.version == version
+
+
+def test_iter_json():
+    items = [{"a": [1, {"b": []}], "c": {}, "d": "\u00e9", "e": None},
+             [[]], [], {}, "x", 1.5]
+    for item in items:
+        text = "".join(iter_json(item))
+        assert text == json.dumps(item, indent=2, sort_keys=True)
+    schema = SchemaAccumulator().update([{"a": [1, "x"]}]).freeze()
+    assert "".join(iter_json(schema.to_json())) == json.dumps(
+        schema.to_json(), indent=2, sort_keys=True)
+
+
+def test_deep_cli(tmp_path, monkeypatch, capsys):
+    filename = tmp_path / "deep.json"
+    filename.write_text(nested_json(DEPTH) + "\n")
+    monkeypatch.setattr(sys, "argv", [
+        "json_schema_generator", "-", str(filename), "--decoder", "events",
+        "--profile", str(tmp_path / "profile.json")])
+    main()
+    output = capsys.readouterr().out
+    assert output.startswith("{") and output.endswith("}\n")
+    assert output.count('"type": "array"') == DEPTH // 2
@@ -0,0 +1,81 @@
+import json
+import os
+import random
+
+import pytest
+
+from json_schema_generator import SchemaAccumulator, process_lines_to_schema
+from json_schema_generator.events import iter_events
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "data",
+                      "sample.jsonl")
+
+
+def test_events():
+    events = list(iter_events(b'{"a": [1, 2.5e1, "x"], "b": {"c": null}}'))
+    assert events == [
+        ("start_map", None),
+        ("map_key", "a"),
+        ("start_array", None),
+        ("value", 1),
+        ("value", 25.0),
+        ("value", "x"),
+        ("end_array", None),
+        ("map_key", "b"),
+        ("start_map", None),
+        ("map_key", "c"),
+        ("value", None),
+        ("end_map", None),
+        ("end_map", None),
+    ]
+
+
+def test_scalar_values():
+    for document in ('"a\\"b\\u00e9"', '""', "-0", "1.5", "1e3", "-2.5E-1",
+                     "true", "false", "null", " 1 \r\n"):
+        assert list(iter_events(document)) == [
+            ("value", json.loads(document))]
+
+
+def test_keys():
+    document = '{"": "", "a\\"b" : {"c":"d"}, "e": ["f", {}]}'
+    events = [x for x in iter_events(document) if x[0] == "map_key"]
+    assert events == [("map_key", x) for x in ("", 'a"b', "c", "e")]
+
+
+@pytest.mark.parametrize("document", [
+    "", " ", "{", "[1, 2", "{}}", "[1] 2", "x", "[1,,2]", '["\x01"]'])
+def test_invalid(document):
+    with pytest.raises(ValueError):
+        list(iter_events(document))
+
+
+def test_matches_decoded():
+    rng = random.Random(42)
+    documents = []
+    for i in range(200):
+        item = {
+            "id": i,
+            "name": rng.choice(("Alice", "Bob", "Carol", "Dané")),
+            "score": rng.random(),
+            "point": [rng.random(), rng.random()],
+            "tags": [rng.choice(("x", "y", "z"))
+                     for j in range(rng.randint(0, 10))],
+            "nested": [{"flag": rng.random() > 0.5}],
+            "mixed": rng.choice(({"a": 1}, [1], "b", None)),
+        }
+        if rng.random() > 0.5:
+            item["optional"] = None
+        documents.append(json.dumps(item))
+
+    decoded = SchemaAccumulator().update(map(json.loads, documents))
+    tokenized = SchemaAccumulator().update_json(documents)
+    assert tokenized.count == decoded.count
+    assert tokenized.freeze().to_json() == decoded.freeze().to_json()
+
+
+def test_sample():
+    with open(SAMPLE, "rb") as infile:
+        lines = infile.readlines()
+    assert process_lines_to_schema(lines, "events").to_json() \
+        == process_lines_to_schema(lines, "json").to_json()
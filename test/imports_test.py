@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import json_schema_generator
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "data",
+                      "sample.jsonl")
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+# importing Dask took most of a second, so this leaves plenty of margin
+MAX_IMPORT_SECONDS = 0.3
+SLOW_MODULES = ("asyncio", "dask", "distributed")
+
+
+def run_python(code, *args):
+    return subprocess.run(
+        (sys.executable, "-X", "importtime", "-c", code) + args,
+        cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def loaded(stdout):
+    return set(stdout.split()) & set(SLOW_MODULES)
+
+
+def test_import_time():
+    result = run_python(
+        "import sys, json_schema_generator;"
+        "print(*{m.split('.')[0] for m in sys.modules})")
+    assert not loaded(result.stdout)
+    # each line is "import time: self | cumulative | name" in microseconds
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if fields[-1].strip() == "json_schema_generator":
+            assert int(fields[1]) / 1e6 < MAX_IMPORT_SECONDS
+            break
+    else:
+        assert False, "import time of json_schema_generator not found"
+
+
+def test_serial_cli(tmp_path):
+    result = run_python(
+        "import sys, json_schema_generator;"
+        "json_schema_generator.main();"
+        "print(*{m.split('.')[0] for m in sys.modules})",
+        str(tmp_path / "schema.json"), SAMPLE)
+    assert not loaded(result.stdout)
+
+
+def test_lazy_attributes():
+    assert json_schema_generator.process_to_schema_dask \
+        is json_schema_generator.dask_engine.process_to_schema_dask
+    assert "process_to_schema_async" in dir(json_schema_generator)
+    try:
+        json_schema_generator.missing
+    except AttributeError:
+        pass
+    else:
+        assert False, "expected an AttributeError"
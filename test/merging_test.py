@@ -0,0 +1,95 @@
+import concurrent.futures
+import functools
+
+import dask
+import dask.bag
+import pytest
+
+from json_schema_generator import Schema, SchemaAccumulator
+from json_schema_generator import process_to_schema
+from json_schema_generator import process_to_schema_dask
+from json_schema_generator.merging import merge_schemas
+from json_schema_generator.sampling import Sampling
+
+ITEMS = [{"a": i, "b": [str(i)] * (i % 3)} for i in range(13)] \
+    + [{"c": {"d": True}}]
+
+
+def partials():
+    return [Schema.schema_extractor(x) for x in ITEMS]
+
+
+def folded():
+    return functools.reduce(Schema.merge, partials(), Schema(None))
+
+
+@pytest.mark.parametrize("fan_in", [2, 3, 8, 100])
+def test_matches_fold(fan_in):
+    assert merge_schemas(partials(), fan_in).to_json() \
+        == folded().to_json()
+
+
+def test_executor():
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        merged = merge_schemas(partials(), 2, executor)
+    assert merged.to_json() == folded().to_json()
+
+
+@pytest.mark.parametrize("count_distinct", [False, True])
+def test_conflicts_match_accumulated(count_distinct):
+    # values of different kinds in turn, so the statistics of the generic
+    # leaves they become depend on everything being combined, not reset
+    kinds = [1, "x", None, {"b": 1}, [1, 2]]
+    items = [{"a": kinds[i % 5], "c": kinds[(i * 3) % 5]} for i in range(40)]
+    accumulated = SchemaAccumulator(count_distinct=count_distinct)\
+        .update(items).freeze()
+    schemas = [SchemaAccumulator(count_distinct=count_distinct)
+               .update(items[i:i + 7]).freeze()
+               for i in range(0, len(items), 7)]
+    assert merge_schemas(schemas, 3).root == accumulated.root
+    extracted = [Schema.schema_extractor(x, count_distinct=count_distinct)
+                 for x in reversed(items)]
+    assert merge_schemas(extracted).root == accumulated.root
+    leaf = accumulated.root.children["a"]
+    assert leaf.stats.count == 24
+    assert leaf.stats.null_count == 8
+
+
+def test_conflicts_enum_settings():
+    # objects and arrays in conflict, with nothing to keep a sketch from,
+    # and nesting summarised, make leaves of the settings given
+    items = [{"a": {}, "b": [1], "c": {"d": {}}}, {"a": [], "b": 1},
+             {"a": {"e": 1}, "c": [{}]}]
+    settings = {"enum_limit": 2, "enum_coverage": 0.5, "max_depth": 2}
+    accumulated = SchemaAccumulator(**settings).update(items).freeze()
+    extracted = [Schema.schema_extractor(x, **settings) for x in items]
+    merged = merge_schemas(extracted, enum_limit=2, enum_coverage=0.5)
+    assert merged.root == accumulated.root
+    assert merged.root.children["a"].sketch.limit == 2
+
+
+def test_empty():
+    assert merge_schemas([]).root is None
+
+
+def test_bad_fan_in():
+    with pytest.raises(ValueError):
+        merge_schemas(partials(), 1)
+
+
+def test_dask():
+    bag = dask.bag.from_sequence(ITEMS, npartitions=7)
+    with dask.config.set(scheduler="synchronous"):
+        schema = process_to_schema_dask(bag, None, fan_in=2)
+    assert schema.to_json() == process_to_schema(ITEMS).to_json()
+
+
+def test_dask_sampling():
+    # every partition has the same records, but should sample different ones
+    items = [{"a": i % 100} for i in range(400)]
+    bag = dask.bag.from_sequence(items, npartitions=4)
+    with dask.config.set(scheduler="synchronous"):
+        schema = process_to_schema_dask(bag, None, enum_limit=20,
+                                        sampling=Sampling(size=3, seed=1))
+    assert schema.count == 12
+    assert len(schema.to_json()["properties"]["a"]["enum"]) > 3
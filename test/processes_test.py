@@ -0,0 +1,22 @@
+import os
+
+from json_schema_generator import process_lines_to_schema
+from json_schema_generator.processes import process_files_to_schema
+from json_schema_generator.readers import read_lines
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "data",
+                      "sample.jsonl")
+
+
+def test_matches_serial():
+    serial = process_lines_to_schema(read_lines([SAMPLE]))
+    # small ranges so the sample is split between the workers
+    schema = process_files_to_schema([SAMPLE], workers=2, range_size=10000)
+    assert schema.to_json() == serial.to_json()
+
+
+def test_empty(tmp_path):
+    filename = tmp_path / "empty.jsonl"
+    filename.write_bytes(b"")
+    schema = process_files_to_schema([str(filename)], workers=1)
+    assert schema.root is None
@@ -0,0 +1,65 @@
+import os
+import pickle
+
+import dask
+import dask.bag
+
+from json_schema_generator import process_lines_to_schema
+from json_schema_generator import process_to_schema_dask
+from json_schema_generator.processes import process_files_to_schema
+from json_schema_generator.profiling import Profile
+from json_schema_generator.readers import read_lines
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "data",
+                      "sample.jsonl")
+
+
+def test_nested_stages():
+    profile = Profile()
+    with profile.stage("outer"):
+        items = list(profile.timed("inner", ["ab", "c"], "bytes"))
+    assert items == ["ab", "c"]
+    assert set(profile.stages) == {"outer", "inner"}
+    assert profile.counters == {"bytes": 3}
+
+
+def test_update():
+    first = Profile()
+    first.count("records", 2)
+    first.maximum("peak_nodes", 5)
+    first.stages["read"] = [1.0, 0.5]
+    second = pickle.loads(pickle.dumps(first))
+    second.maximum("peak_nodes", 3)
+    first.update(second)
+    assert first.to_json() == {
+        "stages": {"read": {"wall_seconds": 2.0, "cpu_seconds": 1.0}},
+        "counters": {"records": 4},
+        "maxima": {"peak_nodes": 5},
+    }
+
+
+def test_engines():
+    serial = Profile()
+    expected = process_lines_to_schema(read_lines([SAMPLE]), profile=serial)
+    records = serial.counters["records"]
+    assert records == expected.count
+    assert serial.counters["bytes_read"] > 0
+    assert serial.maxima["peak_nodes"] > 0
+    assert {"read", "decode", "extract", "freeze", "infer_references"} \
+        <= set(serial.stages)
+
+    processes = Profile()
+    schema = process_files_to_schema([SAMPLE], workers=2, range_size=10000,
+                                     profile=processes)
+    assert schema.to_json() == expected.to_json()
+    assert processes.counters["records"] == records
+    assert "merge" in processes.stages
+
+    lines = dask.bag.read_text(SAMPLE, blocksize=10000)
+    with dask.config.set(scheduler="synchronous"):
+        profiled = Profile()
+        schema = process_to_schema_dask(lines, None, decoder="auto",
+                                        profile=profiled)
+    assert schema.to_json() == expected.to_json()
+    assert profiled.counters["records"] == records
+    assert "merge" in profiled.stages
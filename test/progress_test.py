@@ -0,0 +1,86 @@
+import io
+import os
+
+import dask.bag
+from dask.distributed import Client
+
+from json_schema_generator import process_lines_to_schema
+from json_schema_generator import process_to_schema_dask
+from json_schema_generator.processes import process_files_to_schema
+from json_schema_generator.progress import Progress
+from json_schema_generator.readers import read_lines
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "data",
+                      "sample.jsonl")
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+def test_report(tmp_path):
+    clock = Clock()
+    stream = io.StringIO()
+    metrics = str(tmp_path / "metrics.prom")
+    progress = Progress(2000, 10, stream, metrics, clock)
+    progress.add(100, 500)
+    # not reported until the interval has passed
+    assert stream.getvalue() == ""
+    clock.time = 10.0
+    progress.add(100, 500, 7)
+    assert stream.getvalue() == \
+        "Read 200 records, 1000.0 B of 2.0 KiB (50%), 20 records/s, " \
+        "7 nodes\n"
+    with open(metrics) as infile:
+        text = infile.read()
+    assert "json_schema_generator_records_total 200\n" in text
+    assert "json_schema_generator_input_bytes 2000\n" in text
+    assert "json_schema_generator_schema_nodes 7\n" in text
+
+
+def test_engines():
+    expected = process_lines_to_schema(read_lines([SAMPLE]))
+    size = os.path.getsize(SAMPLE)
+
+    serial = Progress(size, stream=None)
+    process_lines_to_schema(read_lines([SAMPLE]), progress=serial)
+    assert serial.records == expected.count
+    assert serial.bytes_read == size
+
+    processes = Progress(size, stream=None)
+    process_files_to_schema([SAMPLE], workers=2, range_size=10000,
+                            progress=processes)
+    assert processes.records == expected.count
+    assert processes.bytes_read == size
+    assert processes.nodes > 0
+
+
+def test_dask():
+    expected = process_lines_to_schema(read_lines([SAMPLE]))
+    progress = Progress(stream=None)
+    with Client(processes=False, n_workers=1, dashboard_address=None):
+        lines = dask.bag.read_text(SAMPLE, blocksize=10000)
+        schema = process_to_schema_dask(lines, None, decoder="auto",
+                                        progress=progress)
+    assert schema.to_json() == expected.to_json()
+    assert progress.records == expected.count
+    assert progress.bytes_read == os.path.getsize(SAMPLE)
+    assert progress.nodes == len(schema.root)
+
+
+def test_dask_bytes(tmp_path):
+    # lines are str that keep their newlines, and these aren't ASCII
+    filename = tmp_path / "input.jsonl"
+    filename.write_bytes('{"a": "\u00e9"}\n{"a": "\u20ac"}\n'.encode())
+    progress = Progress(stream=None)
+    with Client(processes=False, n_workers=1, dashboard_address=None):
+        lines = dask.bag.read_text(str(filename))
+        process_to_schema_dask(lines, None, decoder="auto",
+                               progress=progress)
+    assert progress.records == 2
+    assert progress.bytes_read == os.path.getsize(filename)
@@ -0,0 +1,72 @@
+import bz2
+import gzip
+
+import pytest
+
+from json_schema_generator.readers import parse_size, read_lines
+from json_schema_generator.readers import read_range, split_ranges
+
+LINES = [b'{"a": 1}', b'{"b": "two"}', b'[1, 2, 3]']
+
+
+@pytest.mark.parametrize("suffix, compress", [
+    ("", bytes),
+    (".gz", gzip.compress),
+    (".bz2", bz2.compress),
+])
+def test_read_lines(tmp_path, suffix, compress):
+    filename = tmp_path / ("input.jsonl" + suffix)
+    filename.write_bytes(compress(b"\n".join(LINES) + b"\n"))
+    assert list(read_lines([str(filename)])) == LINES
+
+
+def test_block_boundaries(tmp_path):
+    filename = tmp_path / "input.jsonl"
+    # no trailing newline and a blank line
+    filename.write_bytes(b"\n".join(LINES[:2]) + b"\n\n" + LINES[2])
+    for block_size in (1, 3, 7, 1000):
+        assert list(read_lines([str(filename)], block_size)) == LINES
+
+
+def test_whitespace_lines(tmp_path):
+    filename = tmp_path / "input.jsonl"
+    # CRLF line endings, with a blank line and one of only spaces
+    filename.write_bytes(b"\r\n".join(
+        [LINES[0], b"", LINES[1], b" \t", LINES[2], b""]) + b"\r\n ")
+    for block_size in (1, 3, 1000):
+        lines = list(read_lines([str(filename)], block_size))
+        assert [line.rstrip(b"\r") for line in lines] == LINES
+
+
+def test_multiple_files(tmp_path):
+    filenames = []
+    for i, line in enumerate(LINES):
+        filename = tmp_path / "input{}.jsonl".format(i)
+        filename.write_bytes(line)
+        filenames.append(str(filename))
+    empty = tmp_path / "empty.jsonl"
+    empty.write_bytes(b"")
+    filenames.append(str(empty))
+    assert list(read_lines(filenames)) == LINES
+
+
+def test_split_ranges(tmp_path):
+    filename = tmp_path / "input.jsonl"
+    filename.write_bytes(b"\n".join(LINES * 5) + b"\n")
+    compressed = tmp_path / "input.jsonl.gz"
+    compressed.write_bytes(gzip.compress(b"\n".join(LINES)))
+    for range_size in (1, 10, 30, 1000):
+        ranges = split_ranges([str(filename), str(compressed)], range_size)
+        assert ranges[-1] == (str(compressed), 0, None)
+        lines = []
+        for file_range in ranges:
+            lines.extend(read_range(file_range, block_size=4))
+        assert lines == LINES * 6
+
+
+def test_parse_size():
+    assert parse_size("1024") == 1024
+    assert parse_size("64MiB") == 64 << 20
+    assert parse_size("1.5kb") == 1500
+    with pytest.raises(ValueError):
+        parse_size("12 parsecs")
@@ -82,3 +82,31 @@ def test_random_content():
     source = [random_content(rng) for i in range(25)]
     schema = process_to_schema(source)
     print(json.dumps(schema.to_json(), indent=2, sort_keys=True))
+
+
+def test_infer_refs_nested():
+    def address():
+        return {"street": "High Street", "geo": {"x": 1}}
+
+    source = [{
+        "from": {"address": address(), "alt": address()},
+        "to": {"address": address(), "alt": address()},
+        "misc": {"x": 1}
+    }]
+    schema = process_to_schema(source)
+    assert sorted(x.name for x in schema.definitions) == \
+        ["address_alt", "from_to", "geo_misc"]
+    schema_json = schema.to_json()
+    assert schema_json["properties"]["from"] == \
+        {"$ref": "#/definitions/from_to"}
+    assert schema_json["definitions"]["from_to"]["properties"]["alt"] == \
+        {"$ref": "#/definitions/address_alt"}
+
+
+def test_infer_refs_unique_names():
+    schema = Schema(SchemaNodeDict(None, [
+        SchemaNodeDict("a", [SchemaNodeLeaf("x", [1], "integer")], ()),
+        SchemaNodeDict("b", [SchemaNodeLeaf("x", [1], "integer")], ())], ()))
+    schema.definitions = {SchemaNodeDict("a_b", [], ())}
+    schema.infer_references()
+    assert sorted(x.name for x in schema.definitions) == ["a_b", "a_b_2"]
@@ -0,0 +1,78 @@
+import collections
+import random
+
+from json_schema_generator import SchemaAccumulator, process_to_schema
+from json_schema_generator.processes import process_files_to_schema
+from json_schema_generator.sampling import Sampling, reservoir_sample
+
+
+def test_reservoir():
+    rng = random.Random(42)
+    assert sorted(reservoir_sample(range(5), 10, rng)) == list(range(5))
+    sample = reservoir_sample(range(1000), 10, rng)
+    assert len(set(sample)) == 10
+    assert all(0 <= x < 1000 for x in sample)
+
+
+def test_reservoir_uniform():
+    rng = random.Random(42)
+    counts = collections.Counter()
+    for i in range(2000):
+        counts.update(reservoir_sample(range(20), 5, rng))
+    # each item should be picked about a quarter of the time
+    assert all(400 < x < 600 for x in counts.values())
+
+
+def test_version():
+    accumulator = SchemaAccumulator()
+    accumulator.add({"a": 1})
+    version = accumulator.version
+    accumulator.add({"a": 1})
+    assert accumulator.version == version
+    # a new enum value changes the shape
+    accumulator.add({"a": 2})
+    assert accumulator.version > version
+    version = accumulator.version
+    accumulator.add({"a": "b"})
+    assert accumulator.version > version
+
+
+def test_patience():
+    items = [{"a": i % 2} for i in range(1000)]
+    schema = process_to_schema(items, sampling=Sampling(patience=10))
+    assert schema.count == 12
+    assert schema.to_json()["properties"]["a"]["enum"] == [0, 1]
+
+
+def test_patience_changes():
+    items = [{"a": 1}] * 20 + [{"a": 1, "b": 2}] + [{"a": 1}] * 20
+    schema = process_to_schema(items, sampling=Sampling(patience=30))
+    assert schema.count == 41
+    assert schema.to_json()["required"] == ["a"]
+
+
+def test_patience_alternating_kinds():
+    # once a value has conflicted it is generic, so stops changing
+    items = [{"a": 1} if i % 2 else {"a": {"b": 1}} for i in range(100000)]
+    schema = process_to_schema(items, sampling=Sampling(patience=100))
+    assert schema.count == 102
+    assert schema.to_json()["properties"]["a"] == {}
+
+
+def test_choose():
+    sampling = Sampling(blocks=3, seed=1)
+    chosen = sampling.choose(range(10))
+    assert chosen == sorted(chosen)
+    assert len(set(chosen)) == 3
+    assert sampling.choose(range(10)) == chosen
+    assert sampling.choose(range(2)) == [0, 1]
+
+
+def test_blocks(tmp_path):
+    filename = tmp_path / "input.jsonl"
+    filename.write_text("".join('{{"a": {}}}\n'.format(i)
+                                for i in range(1000)))
+    sampling = Sampling(size=5, blocks=2, seed=1)
+    schema = process_files_to_schema([str(filename)], 2, range_size=100,
+                                     sampling=sampling)
+    assert schema.count == 10
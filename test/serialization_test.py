@@ -0,0 +1,64 @@
+import os
+import pickle
+
+import pytest
+from distributed.protocol import deserialize, serialize
+
+from json_schema_generator import Schema, SchemaAccumulator
+from json_schema_generator import process_lines_to_schema, process_to_schema
+from json_schema_generator.readers import read_lines
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "data",
+                      "sample.jsonl")
+
+ITEMS = [
+    {"a": -5, "b": "x", "c": [1, 2.5], "d": None, "e": True},
+    {"a": 2 ** 70, "b": "é" * 3, "c": [], "f": {"g": [[1], {"h": 1}]}},
+    {"a": 1.0, "b": "\ud800", "c": [{"x": 1}, "y"]},
+] + [{"i": i, "s": str(i)} for i in range(100)]
+
+
+def assert_identical(schema, other):
+    assert schema.root == other.root
+    assert schema.count == other.count
+    assert schema.definitions == other.definitions
+    assert schema.to_json() == other.to_json()
+
+
+def test_round_trip():
+    schema = SchemaAccumulator().update(ITEMS).freeze()
+    assert_identical(Schema.from_bytes(schema.to_bytes()), schema)
+
+
+def test_round_trip_references():
+    items = [{"home": {"street": "a", "city": "b"},
+              "work": {"street": "a", "city": "b"}}]
+    schema = process_to_schema(items)
+    assert schema.definitions
+    assert_identical(Schema.from_bytes(schema.to_bytes()), schema)
+
+
+def test_smaller_than_pickle():
+    schema = process_lines_to_schema(read_lines([SAMPLE]))
+    assert len(schema.to_bytes()) < len(pickle.dumps(schema))
+
+
+def test_empty():
+    schema = Schema.from_bytes(Schema(None).to_bytes())
+    assert schema.root is None
+
+
+def test_version():
+    data = bytearray(Schema(None).to_bytes())
+    data[3] += 1
+    with pytest.raises(ValueError):
+        Schema.from_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        Schema.from_bytes(b"nonsense")
+
+
+def test_dask_serializer():
+    schema = SchemaAccumulator().update(ITEMS).freeze()
+    header, frames = serialize(schema, serializers=["dask", "pickle"])
+    assert header["serializer"] == "dask"
+    assert_identical(deserialize(header, frames), schema)
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+
+import pytest
+
+from json_schema_generator import main
+from json_schema_generator.state import SchemaState
+
+DAYS = [
+    [{"a": 1, "b": "x"}, {"a": 2}],
+    [{"a": 3.5, "c": [1, 2]}],
+    [{"a": None, "b": "y", "c": []}],
+]
+
+
+def write_day(tmp_path, day):
+    filename = tmp_path / "day{}.jsonl".format(day)
+    filename.write_text("\n".join(json.dumps(x) for x in DAYS[day]))
+    return str(filename)
+
+
+def run(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["json_schema_generator"] + list(args))
+    main()
+
+
+def test_incremental(tmp_path, monkeypatch):
+    state = str(tmp_path / "schema.state")
+    output = str(tmp_path / "schema.json")
+    filenames = []
+    for day in range(len(DAYS)):
+        filenames.append(write_day(tmp_path, day))
+        run(monkeypatch, output, "--state", state, *filenames)
+    with open(output) as infile:
+        incremental = json.load(infile)
+
+    saved = SchemaState.load(state)
+    assert sorted(saved.files) == sorted(os.path.abspath(x)
+                                         for x in filenames)
+    assert saved.new_files(filenames) == []
+
+    run(monkeypatch, output, *filenames)
+    with open(output) as infile:
+        assert json.load(infile) == incremental
+
+
+def test_changed(tmp_path):
+    filename = write_day(tmp_path, 0)
+    state = SchemaState()
+    state.update(state.schema, [filename])
+    with open(filename, "a") as outfile:
+        outfile.write("\n{}")
+    with pytest.raises(ValueError):
+        state.new_files([filename])
+
+
+def test_settings(tmp_path):
+    filename = str(tmp_path / "schema.state")
+    SchemaState(enum_limit=3).save(filename)
+    assert SchemaState.load(filename, enum_limit=3).enum_limit == 3
+    with pytest.raises(ValueError):
+        SchemaState.load(filename, enum_limit=4)
+
+
+def test_settings_depth(tmp_path):
+    filename = str(tmp_path / "schema.state")
+    SchemaState(max_depth=5, count_distinct=True).save(filename)
+    state = SchemaState.load(filename, max_depth=5, count_distinct=True)
+    assert (state.max_depth, state.count_distinct) == (5, True)
+    with pytest.raises(ValueError):
+        SchemaState.load(filename, count_distinct=True)
+    with pytest.raises(ValueError):
+        SchemaState.load(filename, max_depth=5)
+
+
+def test_settings_cli(tmp_path, monkeypatch):
+    state = str(tmp_path / "schema.state")
+    output = str(tmp_path / "schema.json")
+    run(monkeypatch, output, "--state", state, "--max-depth", "3",
+        write_day(tmp_path, 0))
+    with pytest.raises(SystemExit):
+        run(monkeypatch, output, "--state", state, write_day(tmp_path, 1))
@@ -0,0 +1,129 @@
+import random
+
+import json_schema_generator
+from json_schema_generator.stats import FrequencySketch, LeafStats
+
+
+def test_bounds():
+    items = [{"a": i, "b": "x" * i, "c": i / 2} for i in range(1, 10)]
+    schema = json_schema_generator.process_to_schema(items).to_json()
+    assert schema["properties"]["a"]["minimum"] == 1
+    assert schema["properties"]["a"]["maximum"] == 9
+    assert schema["properties"]["b"]["minLength"] == 1
+    assert schema["properties"]["b"]["maxLength"] == 9
+    assert schema["properties"]["c"]["minimum"] == 0.5
+    assert schema["properties"]["c"]["maximum"] == 4.5
+
+
+def test_counts():
+    stats = LeafStats([1, None, "abc", True, None])
+    assert stats.count == 5
+    assert stats.null_count == 2
+    # booleans are not numbers here
+    assert stats.minimum == 1
+    assert stats.maximum == 1
+    assert stats.min_length == 3
+
+
+def test_distinct():
+    stats = LeafStats((str(i) for i in range(10000)), True)
+    assert 9000 < stats.distinct.estimate() < 11000
+
+    stats = LeafStats((str(i % 10) for i in range(10000)), True)
+    assert stats.distinct.estimate() == 10
+
+    stats = LeafStats(range(10000), True)
+    assert 9000 < stats.distinct.estimate() < 11000
+
+    # numbers and constants of different types are different values
+    stats = LeafStats([1, 1.0, True, 0, 0.0, False, None, "1"], True)
+    assert stats.distinct.estimate() == 8
+
+
+def test_distinct_opt_in():
+    items = [{"a": i} for i in range(100)]
+    schema = json_schema_generator.process_to_schema(items).to_json()
+    assert "x-distinct" not in schema["properties"]["a"]
+    schema = json_schema_generator.process_to_schema(
+        items, count_distinct=True).to_json()
+    assert 95 <= schema["properties"]["a"]["x-distinct"] <= 105
+
+
+def test_distinct_merge():
+    counted = LeafStats([1, 2], True)
+    # nothing at all doesn't lose the estimate, but any uncounted values do
+    assert counted.merge(LeafStats()).distinct_estimate() == 2
+    assert LeafStats().merge(counted).distinct_estimate() == 2
+    assert counted.merge(LeafStats([3])).distinct is None
+    assert LeafStats([3]).merge(counted).distinct is None
+
+
+def test_merge_associative():
+    rng = random.Random(42)
+    parts = []
+    for i in range(3):
+        size = rng.randint(1, 500)
+        parts.append(LeafStats(
+            (rng.randint(0, 1000) for j in range(size)), True))
+    a, b, c = parts
+    assert a.merge(b).merge(c) == a.merge(b.merge(c))
+    assert a.merge(b) == b.merge(a)
+    assert a.merge(b).merge(c).count == sum(x.count for x in parts)
+
+
+def test_merge_unchanged():
+    a = LeafStats([1, 2])
+    b = LeafStats([3])
+    a.merge(b)
+    assert a == LeafStats([1, 2])
+
+
+def test_enum_limit():
+    items = [{"a": x} for x in "abcdef"]
+    schema = json_schema_generator.process_to_schema(items).to_json()
+    assert "enum" not in schema["properties"]["a"]
+    schema = json_schema_generator.process_to_schema(
+        items, enum_limit=6).to_json()
+    assert schema["properties"]["a"]["enum"] == list("abcdef")
+
+
+def test_enum_coverage():
+    rng = random.Random(42)
+    items = [{"a": rng.choice("abcdef")} for i in range(10000)]
+    # rare noise values
+    items.extend({"a": "noise{}".format(i)} for i in range(50))
+    rng.shuffle(items)
+
+    schema = json_schema_generator.process_to_schema(
+        items, enum_limit=6).to_json()
+    assert "enum" not in schema["properties"]["a"]
+    schema = json_schema_generator.process_to_schema(
+        items, enum_limit=6, enum_coverage=0.99).to_json()
+    assert schema["properties"]["a"]["enum"] == list("abcdef")
+
+
+def test_sketch_merge():
+    rng = random.Random(42)
+    values = [rng.choice("abc") for i in range(1000)]
+    values.extend(str(i) for i in range(100))
+    rng.shuffle(values)
+    parts = [FrequencySketch(3, 0.9, values[i:i+100])
+             for i in range(0, len(values), 100)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.update(part)
+    assert merged.total == len(values)
+    assert merged.enum_values() == frozenset("abc")
+    # counts are lower bounds, too low by at most the decrement
+    for value in "abc":
+        count = values.count(value)
+        assert count - merged.decrement <= merged.counts[value] <= count
+
+
+def test_sketch_exact():
+    sketch = FrequencySketch(2, values=["a", "b", "a"])
+    assert sketch.enum_values() == frozenset("ab")
+    sketch.add("c")
+    # can never be an enum again, so nothing is kept
+    assert sketch.enum_values() is None
+    assert sketch.counts is None
@@ -0,0 +1,55 @@
+import asyncio
+import concurrent.futures
+
+import pytest
+
+from json_schema_generator import process_to_schema
+from json_schema_generator import process_to_schema_async
+
+ITEMS = [{"a": i, "b": [str(i % 3)], "c": {"d": i % 2 == 0}}
+         for i in range(250)]
+
+
+async def producer(items):
+    # stand-in for records arriving from a socket or queue
+    for item in items:
+        await asyncio.sleep(0)
+        yield item
+
+
+def test_matches_sync():
+    schema = asyncio.run(process_to_schema_async(producer(ITEMS),
+                                                 batch_size=30))
+    assert schema.count == len(ITEMS)
+    assert schema.to_json() == process_to_schema(ITEMS).to_json()
+
+
+def test_snapshots():
+    counts = []
+    changes = []
+
+    async def on_snapshot(schema, snapshot_changes):
+        counts.append(schema.count)
+        changes.append(snapshot_changes)
+
+    items = ITEMS + [{"a": "x", "e": None}]
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        asyncio.run(process_to_schema_async(
+            producer(items), batch_size=40, executor=executor,
+            snapshot_every=100, on_snapshot=on_snapshot))
+    assert counts == [120, 240]
+    # the last record isn't in any snapshot
+    assert changes[1] == []
+
+
+def test_empty():
+    schema = asyncio.run(process_to_schema_async(producer([])))
+    assert schema.root is None
+
+
+def test_process_pool():
+    # workers would only update copies of the accumulator
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+        with pytest.raises(ValueError):
+            asyncio.run(process_to_schema_async(producer(ITEMS),
+                                                executor=executor))